@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import io
 import base64
@@ -7,6 +6,7 @@ import matplotlib.pyplot
 matplotlib.use('Agg')
 from lifelines import CoxPHFitter
 import matplotlib.pyplot as plt
+from utils.data_loader import read_dataframe
 
 
 def cox_regression_analysis(csv_data, covariate_cols, time_col, event_col):
@@ -32,7 +32,7 @@ def cox_regression_analysis(csv_data, covariate_cols, time_col, event_col):
         ValueError: If specified columns don't exist
     """
     # Read CSV data
-    data = pd.read_csv(csv_data)
+    data = read_dataframe(csv_data)
 
     # Check if columns exist
     required_cols = covariate_cols + [time_col, event_col]
@@ -10,6 +10,7 @@ from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score, mean_squared_error
 import seaborn as sns
+from utils.data_loader import read_dataframe
 
 
 def linear_regression_analysis(csv_data, x_var, y_var):
@@ -37,7 +38,7 @@ def linear_regression_analysis(csv_data, x_var, y_var):
         ValueError: If specified columns don't exist
     """
     # Read CSV data
-    data = pd.read_csv(csv_data)
+    data = read_dataframe(csv_data)
 
     # Check if columns exist
     if x_var not in data.columns or y_var not in data.columns:
@@ -157,7 +158,7 @@ def multiple_linear_regression_analysis(csv_data, x_vars, y_var):
         dict: Analysis results with plot and statistics
     """
     # Read CSV data
-    data = pd.read_csv(csv_data)
+    data = read_dataframe(csv_data)
 
     # Check if columns exist
     missing_cols = [col for col in x_vars + [y_var] if col not in data.columns]
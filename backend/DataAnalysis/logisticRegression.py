@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import io
 import base64
@@ -11,6 +10,7 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import seaborn as sns
+from utils.data_loader import read_dataframe
 
 
 def logistic_regression_analysis(csv_data, x_var, y_var):
@@ -36,7 +36,7 @@ def logistic_regression_analysis(csv_data, x_var, y_var):
         ValueError: If specified columns don't exist
     """
     # Read CSV data
-    data = pd.read_csv(csv_data)
+    data = read_dataframe(csv_data)
 
     # Check if columns exist
     if x_var not in data.columns or y_var not in data.columns:
@@ -140,7 +140,7 @@ def multinomial_logistic_regression_analysis(csv_data, x_vars, y_var):
         dict: Analysis results with plot and statistics
     """
     # Read CSV data
-    data = pd.read_csv(csv_data)
+    data = read_dataframe(csv_data)
 
     # Check if columns exist
     missing_cols = [col for col in x_vars + [y_var] if col not in data.columns]
@@ -2,18 +2,18 @@
 条形图生成模块
 用于检查分类变量的频数分布和类别不平衡
 """
-import pandas as pd
 import seaborn as sns
 import io
 import base64
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from utils.data_loader import read_dataframe
 
 # ==================== 全局配置 ====================
 # 配置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
+matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
 # 统一图片尺寸和DPI
 FIGURE_SIZE = (10, 8)  # 英寸
@@ -26,7 +26,7 @@ def generate_barplot(csv_data, column_name, color='#0062FF', title=None, show_pe
     生成条形图并返回base64编码图像
     
     Args:
-        csv_data: CSV文件路径或文件对象
+        csv_data: 已解析的DataFrame，或CSV文件路径、文件对象（含内存中的上传文件）
         column_name: 要统计的分类列名
         color: 条形颜色 (默认: '#0062FF')
         title: 自定义标题。如果为None,则自动生成标题
@@ -45,7 +45,7 @@ def generate_barplot(csv_data, column_name, color='#0062FF', title=None, show_pe
     """
     # 读取CSV数据
     try:
-        df = pd.read_csv(csv_data)
+        df = read_dataframe(csv_data)
     except FileNotFoundError:
         raise FileNotFoundError(f"CSV文件未找到: {csv_data}")
     
@@ -57,7 +57,8 @@ def generate_barplot(csv_data, column_name, color='#0062FF', title=None, show_pe
     value_counts = df[column_name].value_counts().sort_index()
     
     # 创建图形
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    ax = fig.subplots()
     
     # 生成条形图
     bars = sns.barplot(
@@ -95,17 +96,17 @@ def generate_barplot(csv_data, column_name, color='#0062FF', title=None, show_pe
     ax.set_ylabel("频数", fontsize=12)
     
     # 旋转X轴标签以避免重叠
-    plt.xticks(rotation=45, ha='right')
+    for label in ax.get_xticklabels():
+        label.set(rotation=45, ha='right')
     
     # 添加网格
     ax.grid(True, linestyle='--', alpha=0.3, axis='y')
     
     # 转换为base64
     buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
+    fig.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
     buffer.seek(0)
     plot_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close('all')
     
     return {
         "plot": plot_data,
@@ -2,18 +2,19 @@
 箱线图生成模块
 用于检查数据分布、识别异常值和比较不同组的数据范围
 """
-import pandas as pd
 import seaborn as sns
 import io
 import base64
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from utils.data_loader import read_dataframe
+from utils.facets import category_order, facet_figure, facet_groups, facet_title, finish_facet_axes
 
 # ==================== 全局配置 ====================
 # 配置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
+matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
 # 统一图片尺寸和DPI
 FIGURE_SIZE = (10, 8)  # 英寸
@@ -21,22 +22,56 @@ FIGURE_DPI = 100
 SAVE_DPI = 150
 
 
-def generate_boxplot(csv_data, y_column, x_column=None, color='#0062FF', title=None):
+def _draw_boxplot(ax, df, y_column, x_column, color, order=None):
+    """在一个坐标轴上绘制单个或分组箱线图；order 为分组的类别顺序"""
+    flierprops = {'marker': 'o', 'markerfacecolor': 'red', 'markersize': 5, 'alpha': 0.5}
+    if x_column:
+        # 分组箱线图
+        sns.boxplot(
+            data=df,
+            x=x_column,
+            y=y_column,
+            order=order,
+            color=color,
+            ax=ax,
+            showfliers=True,  # 显示异常值
+            flierprops=flierprops
+        )
+        # 旋转X轴标签以避免重叠
+        for label in ax.get_xticklabels():
+            label.set(rotation=45, ha='right')
+    else:
+        # 单个箱线图
+        sns.boxplot(
+            data=df,
+            y=y_column,
+            color=color,
+            ax=ax,
+            showfliers=True,
+            flierprops=flierprops
+        )
+    # 添加网格
+    ax.grid(True, linestyle='--', alpha=0.3, axis='y')
+
+
+def generate_boxplot(csv_data, y_column, x_column=None, color='#0062FF', title=None, facet=None):
     """
     生成箱线图并返回base64编码图像
     
     Args:
-        csv_data: CSV文件路径或文件对象
+        csv_data: 已解析的DataFrame，或CSV文件路径、文件对象（含内存中的上传文件）
         y_column: Y轴数值列名(必需)
         x_column: X轴分组列名(可选)。如果为None,生成单个箱线图
         color: 箱线图颜色 (默认: '#0062FF')
         title: 自定义标题。如果为None,则自动生成标题
+        facet: 分面列名(可选)。指定时按该列的每个取值各画一个子图，分组顺序和Y轴各子图共用
     
     Returns:
         dict: {
             "plot": base64编码的图像字符串,
             "y_column": Y轴列名,
-            "x_column": X轴列名或None
+            "x_column": X轴列名或None,
+            "facets": 各分面的取值（仅分面图）
         }
     
     Raises:
@@ -45,7 +80,7 @@ def generate_boxplot(csv_data, y_column, x_column=None, color='#0062FF', title=N
     """
     # 读取CSV数据
     try:
-        df = pd.read_csv(csv_data)
+        df = read_dataframe(csv_data)
     except FileNotFoundError:
         raise FileNotFoundError(f"CSV文件未找到: {csv_data}")
     
@@ -57,60 +92,47 @@ def generate_boxplot(csv_data, y_column, x_column=None, color='#0062FF', title=N
     if x_column and x_column not in df.columns:
         raise ValueError(f"列 '{x_column}' 在CSV中不存在")
     
-    # 创建图形
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
-    
-    # 生成箱线图
-    if x_column:
-        # 分组箱线图
-        sns.boxplot(
-            data=df,
-            x=x_column,
-            y=y_column,
-            color=color,
-            ax=ax,
-            showfliers=True,  # 显示异常值
-            flierprops={'marker': 'o', 'markerfacecolor': 'red', 'markersize': 5, 'alpha': 0.5}
-        )
-        ax.set_xlabel(x_column, fontsize=12)
-        # 旋转X轴标签以避免重叠
-        plt.xticks(rotation=45, ha='right')
-    else:
-        # 单个箱线图
-        sns.boxplot(
-            data=df,
-            y=y_column,
-            color=color,
-            ax=ax,
-            showfliers=True,
-            flierprops={'marker': 'o', 'markerfacecolor': 'red', 'markersize': 5, 'alpha': 0.5}
-        )
-    
-    # 设置标题和标签
+    # 设置标题
     if x_column:
         chart_title = title if title else f"{y_column} 按 {x_column} 分组的箱线图"
     else:
         chart_title = title if title else f"{y_column} 箱线图"
-    
-    ax.set_title(chart_title, fontsize=14, pad=20)
-    ax.set_ylabel(y_column, fontsize=12)
-    
-    # 添加网格
-    ax.grid(True, linestyle='--', alpha=0.3, axis='y')
+
+    if facet:
+        # 分面图：一次groupby拆分数据，各子图使用整列的分组顺序，同一组在每个子图中位置相同
+        groups = facet_groups(df, facet)
+        order = category_order(df[x_column]) if x_column else None
+        fig, axes = facet_figure(len(groups), FIGURE_DPI, sharex=bool(x_column))
+        for ax, (value, group) in zip(axes, groups):
+            _draw_boxplot(ax, group, y_column, x_column, color, order)
+            ax.set_title(facet_title(facet, value), fontsize=12)
+        finish_facet_axes(axes, x_column or '', y_column, rotate_x_labels=bool(x_column))
+        fig.suptitle(chart_title, fontsize=14)
+    else:
+        # 创建图形
+        fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+        ax = fig.subplots()
+        _draw_boxplot(ax, df, y_column, x_column, color)
+        if x_column:
+            ax.set_xlabel(x_column, fontsize=12)
+        ax.set_title(chart_title, fontsize=14, pad=20)
+        ax.set_ylabel(y_column, fontsize=12)
     
     # 转换为base64
     buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
+    fig.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
     buffer.seek(0)
     plot_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close('all')
     
-    return {
+    result = {
         "plot": plot_data,
         "y_column": y_column,
         "x_column": x_column,
         "chart_type": "boxplot"
     }
+    if facet:
+        result.update(facet=facet, facets=[value for value, _ in groups])
+    return result
 
 
 if __name__ == '__main__':
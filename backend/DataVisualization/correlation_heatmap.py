@@ -2,19 +2,20 @@
 相关性矩阵热图生成模块
 用于探索多个数值变量之间的相关性关系
 """
-import pandas as pd
 import seaborn as sns
 import io
 import base64
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import numpy as np
+from utils.data_loader import read_dataframe
+from utils.correlation import correlation_matrix
 
 # ==================== 全局配置 ====================
 # 配置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
+matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
 # 统一图片尺寸和DPI
 FIGURE_SIZE = (10, 8)  # 英寸
@@ -27,7 +28,7 @@ def generate_correlation_heatmap(csv_data, columns=None, method='pearson', title
     生成相关性矩阵热图并返回base64编码图像
     
     Args:
-        csv_data: CSV文件路径或文件对象
+        csv_data: 已解析的DataFrame，或CSV文件路径、文件对象（含内存中的上传文件）
         columns: 要计算相关性的列名列表。如果为None,使用所有数值列
         method: 相关性计算方法 ('pearson', 'spearman', 'kendall')
         title: 自定义标题。如果为None,则自动生成标题
@@ -45,7 +46,7 @@ def generate_correlation_heatmap(csv_data, columns=None, method='pearson', title
     """
     # 读取CSV数据
     try:
-        df = pd.read_csv(csv_data)
+        df = read_dataframe(csv_data)
     except FileNotFoundError:
         raise FileNotFoundError(f"CSV文件未找到: {csv_data}")
     
@@ -64,11 +65,12 @@ def generate_correlation_heatmap(csv_data, columns=None, method='pearson', title
     if df_selected.shape[1] < 2:
         raise ValueError("需要至少2个数值列来计算相关性")
     
-    # 计算相关性矩阵
-    corr_matrix = df_selected.corr(method=method)
+    # 计算相关性矩阵（每列只排秩一次，列对之间并行）
+    corr_matrix, _ = correlation_matrix(df_selected, method)
     
     # 创建图形
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    ax = fig.subplots()
     
     # 生成热图
     sns.heatmap(
@@ -95,15 +97,15 @@ def generate_correlation_heatmap(csv_data, columns=None, method='pearson', title
     ax.set_title(chart_title, fontsize=14, pad=20)
     
     # 旋转标签
-    plt.xticks(rotation=45, ha='right')
-    plt.yticks(rotation=0)
+    for label in ax.get_xticklabels():
+        label.set(rotation=45, ha='right')
+    ax.tick_params(axis='y', labelrotation=0)
     
     # 转换为base64
     buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
+    fig.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
     buffer.seek(0)
     plot_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close('all')
     
     return {
         "plot": plot_data,
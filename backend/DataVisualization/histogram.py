@@ -2,6 +2,7 @@
 直方图生成模块
 用于生成单变量分布直方图(带KDE曲线)及多变量重叠直方图
 """
+import numpy as np
 import pandas as pd
 import seaborn as sns
 import io
@@ -9,33 +10,113 @@ import base64
 
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from utils.binning import linear_edges
+from utils.data_loader import read_dataframe
+from utils.facets import facet_figure, facet_groups, facet_title, finish_facet_axes
+from utils.kde import kde_fft
 
 # ==================== 全局配置 ====================
 # 配置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
+matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
 # 统一图片尺寸和DPI
 FIGURE_SIZE = (10, 8)  # 英寸
 FIGURE_DPI = 100
 SAVE_DPI = 150
 
+HIST_BINS = 30
+KDE_GRID_SIZE = 200
 
-def generate_histogram(csv_data, column_name=None, color='#0062FF', title=None):
+
+def _bin_edges(df, col):
+    """
+    整列数据上的等宽箱边界（分面时各子图共用，频数可以直接比较）；
+    非数值列或没有有效数据时返回箱数，由seaborn自行分箱
+    """
+    values = df[col].dropna()
+    if not pd.api.types.is_numeric_dtype(values) or values.empty:
+        return HIST_BINS
+    return linear_edges(values.to_numpy(dtype=float), HIST_BINS)
+
+
+def _draw_kde(ax, values, bw_method, bins, **line_kws):
+    """
+    在直方图上叠加KDE曲线（按 样本量 × 箱宽 缩放到频数尺度）
+
+    密度由线性分箱 + FFT卷积计算，耗时与样本量基本无关；
+    替代 seaborn 的 kde=True（逐点计算，数据量大时是直方图的主要耗时）
+    """
+    if not pd.api.types.is_numeric_dtype(values):
+        return
+    values = values.dropna().to_numpy(dtype=float)
+    grid, density = kde_fft(values, KDE_GRID_SIZE, bw_method=bw_method)
+    if grid is None:
+        return
+    bin_width = bins[1] - bins[0] if isinstance(bins, np.ndarray) else (values.max() - values.min()) / bins
+    ax.plot(grid, density * len(values) * bin_width, **line_kws)
+
+
+def _draw_histogram(ax, df, target_cols, color, bw_method, bins, legend=True):
+    """
+    在一个坐标轴上绘制单列直方图（带KDE曲线）或多列重叠直方图
+
+    Args:
+        bins: 列名 -> 箱边界（或箱数）
+        legend: 多列模式下是否显示图例
+    """
+    if len(target_cols) == 1:
+        # 单列模式
+        target_col = target_cols[0]
+        sns.histplot(
+            data=df,
+            x=target_col,
+            color=color,
+            bins=bins[target_col],
+            edgecolor="black",
+            alpha=0.7,
+            ax=ax
+        )
+        _draw_kde(ax, df[target_col], bw_method, bins[target_col], color="black", linewidth=2.5, alpha=0.8)
+        return
+
+    # 多列重叠模式
+    colors = sns.color_palette("husl", len(target_cols))
+    for i, col in enumerate(target_cols):
+        sns.histplot(
+            data=df,
+            x=col,
+            color=colors[i],
+            label=col,
+            bins=bins[col],
+            element="step", # 使用阶梯状以减少遮挡
+            fill=True,
+            alpha=0.5, # 增加透明度
+            ax=ax
+        )
+        _draw_kde(ax, df[col], bw_method, bins[col], color=colors[i])
+    if legend:
+        ax.legend()
+
+
+def generate_histogram(csv_data, column_name=None, color='#0062FF', title=None, bw_method='scott', facet=None):
     """
     生成直方图并返回base64编码图像。支持单列或多列重叠。
     
     Args:
-        csv_data: CSV文件路径或文件对象
+        csv_data: 已解析的DataFrame，或CSV文件路径、文件对象（含内存中的上传文件）
         column_name: 要绘制的列名(str)或列名列表(list)。如果为None,使用第一个数值列
         color: 直方图条形颜色 (默认: '#0062FF')
         title: 自定义标题。如果为None,则自动生成标题
+        bw_method: KDE曲线的带宽规则 ('scott' 或 'silverman')
+        facet: 分面列名(可选)。指定时按该列的每个取值各画一个子图，共用箱边界和坐标轴
     
     Returns:
         dict: {
             "plot": base64编码的图像字符串,
-            "column_used": 使用的列名或列名列表
+            "column_used": 使用的列名或列名列表,
+            "facets": 各分面的取值（仅分面图）
         }
     
     Raises:
@@ -44,7 +125,7 @@ def generate_histogram(csv_data, column_name=None, color='#0062FF', title=None):
     """
     # 读取CSV数据
     try:
-        df = pd.read_csv(csv_data)
+        df = read_dataframe(csv_data)
     except FileNotFoundError:
         raise FileNotFoundError(f"CSV文件未找到: {csv_data}")
     
@@ -67,71 +148,52 @@ def generate_histogram(csv_data, column_name=None, color='#0062FF', title=None):
         if col not in df.columns:
             raise ValueError(f"列 '{col}' 在CSV中不存在")
     
-    # 创建图形
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
-    
-    # 生成直方图
+    bins = {col: _bin_edges(df, col) for col in target_cols}
     if len(target_cols) == 1:
-        # 单列模式
-        target_col = target_cols[0]
-        hist_plot = sns.histplot(
-            data=df,
-            x=target_col,
-            kde=True,
-            color=color,
-            bins=30,
-            edgecolor="black",
-            alpha=0.7,
-            ax=ax
-        )
-        # 设置KDE线样式
-        if len(hist_plot.get_lines()) > 0:
-            kde_line = hist_plot.get_lines()[0]
-            kde_line.set_color("black")
-            kde_line.set_linewidth(2.5)
-            kde_line.set_alpha(0.8)
-            
-        ax.set_xlabel(target_col, fontsize=12)
-        chart_title = title if title else f"{target_col} 分布直方图"
+        x_label = target_cols[0]
+        chart_title = title if title else f"{target_cols[0]} 分布直方图"
     else:
-        # 多列重叠模式
-        colors = sns.color_palette("husl", len(target_cols))
-        for i, col in enumerate(target_cols):
-            sns.histplot(
-                data=df,
-                x=col,
-                kde=True,
-                color=colors[i],
-                label=col,
-                bins=30,
-                element="step", # 使用阶梯状以减少遮挡
-                fill=True,
-                alpha=0.5, # 增加透明度
-                ax=ax
-            )
-        ax.legend()
-        ax.set_xlabel("Value", fontsize=12)
+        x_label = "Value"
         chart_title = title if title else f"多变量分布直方图 ({', '.join(target_cols)})"
 
-    # 设置标题和标签
-    ax.set_title(chart_title, fontsize=14, pad=20)
-    ax.set_ylabel("频次", fontsize=12)
-    
-    # 添加网格
-    ax.grid(True, linestyle='--', alpha=0.3)
+    if facet:
+        # 分面图：一次groupby拆分数据，每个分面一个子图
+        groups = facet_groups(df, facet)
+        fig, axes = facet_figure(len(groups), FIGURE_DPI)
+        for i, (ax, (value, group)) in enumerate(zip(axes, groups)):
+            _draw_histogram(ax, group, target_cols, color, bw_method, bins, legend=i == 0)
+            ax.set_title(facet_title(facet, value), fontsize=12)
+            ax.grid(True, linestyle='--', alpha=0.3)
+        finish_facet_axes(axes, x_label, "频次")
+        fig.suptitle(chart_title, fontsize=14)
+    else:
+        # 创建图形
+        fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+        ax = fig.subplots()
+        _draw_histogram(ax, df, target_cols, color, bw_method, bins)
+
+        # 设置标题和标签
+        ax.set_xlabel(x_label, fontsize=12)
+        ax.set_title(chart_title, fontsize=14, pad=20)
+        ax.set_ylabel("频次", fontsize=12)
+
+        # 添加网格
+        ax.grid(True, linestyle='--', alpha=0.3)
     
     # 转换为base64
     buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
+    fig.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
     buffer.seek(0)
     plot_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close('all')
     
-    return {
+    result = {
         "plot": plot_data,
         "column_used": target_cols if len(target_cols) > 1 else target_cols[0],
         "chart_type": "histogram"
     }
+    if facet:
+        result.update(facet=facet, facets=[value for value, _ in groups])
+    return result
 
 
 if __name__ == '__main__':
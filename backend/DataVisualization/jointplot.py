@@ -2,23 +2,41 @@
 联合分布图生成模块
 用于生成双变量联合分布图(六边形密度图)
 """
-import pandas as pd
+import numpy as np
 import seaborn as sns
 import io
 import base64
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from config import CHART_AGGREGATE_BINS, CHART_AGGREGATE_MIN_POINTS
+from utils.binning import histogram_2d
+from utils.data_loader import read_dataframe
 
 # ==================== 全局配置 ====================
 # 配置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
+matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
 # 统一图片尺寸和DPI
 FIGURE_SIZE = (10, 8)  # 英寸
 FIGURE_DPI = 100
 SAVE_DPI = 150
+# 联合分布图为正方形：主图与边缘图的尺寸比
+JOINT_HEIGHT = 8
+JOINT_RATIO = 5
+
+
+def _hex_bins(values):
+    """Freedman-Diaconis规则计算的箱数（上限50）"""
+    if len(values) < 2:
+        return 1
+    iqr = np.subtract(*np.percentile(values, [75, 25]))
+    width = 2 * iqr / len(values) ** (1 / 3)
+    if width == 0:
+        return min(50, max(1, int(np.sqrt(len(values)))))
+    return min(50, max(1, int(np.ceil((values.max() - values.min()) / width))))
 
 
 def generate_jointplot(csv_data, x_var, y_var, color='#3b82f6', title=None):
@@ -26,7 +44,7 @@ def generate_jointplot(csv_data, x_var, y_var, color='#3b82f6', title=None):
     生成双变量联合分布图(六边形密度图)并返回base64编码图像
     
     Args:
-        csv_data: CSV文件路径或文件对象
+        csv_data: 已解析的DataFrame，或CSV文件路径、文件对象（含内存中的上传文件）
         x_var: X轴变量名
         y_var: Y轴变量名
         color: 十六进制颜色代码 (默认: '#3b82f6')
@@ -45,7 +63,7 @@ def generate_jointplot(csv_data, x_var, y_var, color='#3b82f6', title=None):
     """
     # 读取CSV数据
     try:
-        data = pd.read_csv(csv_data)
+        data = read_dataframe(csv_data)
     except FileNotFoundError:
         raise FileNotFoundError(f"CSV文件未找到: {csv_data}")
     
@@ -55,38 +73,73 @@ def generate_jointplot(csv_data, x_var, y_var, color='#3b82f6', title=None):
     if y_var not in data.columns:
         raise ValueError(f"列 '{y_var}' 在CSV中不存在")
     
-    # 创建图形
-    fig = plt.figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
-    
-    # 生成六边形密度图
-    g = sns.jointplot(
-        data=data,
-        x=x_var,
-        y=y_var,
-        kind="hex",
-        color=color,
-        height=8,
-        ratio=5
-    )
-    
+    # 去除任一变量缺失的观测
+    pairs = data[[x_var, y_var]].dropna()
+    x_values = pairs[x_var].to_numpy()
+    y_values = pairs[y_var].to_numpy()
+
+    # 创建图形（与 sns.jointplot(height=8, ratio=5) 相同的布局，
+    # 直接在Figure对象上构建，不依赖pyplot全局状态）
+    fig = Figure(figsize=(JOINT_HEIGHT, JOINT_HEIGHT), dpi=FIGURE_DPI)
+    grid = fig.add_gridspec(JOINT_RATIO + 1, JOINT_RATIO + 1)
+    ax_joint = fig.add_subplot(grid[1:, :-1])
+    ax_marg_x = fig.add_subplot(grid[0, :-1], sharex=ax_joint)
+    ax_marg_y = fig.add_subplot(grid[1:, -1], sharey=ax_joint)
+    fig.subplots_adjust(hspace=0.2, wspace=0.2)
+
+    cmap = sns.light_palette(color, as_cmap=True)
+    aggregated = len(x_values) > CHART_AGGREGATE_MIN_POINTS
+    if aggregated:
+        # 大数据量模式：一次二维分箱得到频数网格，边缘分布直接取网格的行/列合计
+        counts, x_edges, y_edges = histogram_2d(
+            x_values.astype(float), y_values.astype(float), CHART_AGGREGATE_BINS
+        )
+        ax_joint.pcolormesh(
+            x_edges, y_edges, np.ma.masked_equal(counts.T, 0),
+            cmap=cmap, norm=LogNorm(), shading='flat'
+        )
+        ax_marg_x.stairs(counts.sum(axis=1), x_edges, fill=True, color=color, alpha=0.75)
+        ax_marg_y.stairs(counts.sum(axis=0), y_edges, fill=True, color=color, alpha=0.75,
+                         orientation='horizontal')
+    else:
+        # 生成六边形密度图（网格数与seaborn一致：两变量Freedman-Diaconis箱数的均值，上限50）
+        gridsize = int(np.mean([_hex_bins(x_values), _hex_bins(y_values)]))
+        ax_joint.hexbin(x_values, y_values, gridsize=gridsize, cmap=cmap)
+
+        # 边缘分布直方图
+        sns.histplot(x=x_values, color=color, ax=ax_marg_x)
+        sns.histplot(y=y_values, color=color, ax=ax_marg_y)
+    for ax in (ax_marg_x, ax_marg_y):
+        ax.set_xlabel('')
+        ax.set_ylabel('')
+        ax.tick_params(labelleft=False, labelbottom=False)
+        for side in ('top', 'right'):
+            ax.spines[side].set_visible(False)
+    ax_marg_x.spines['left'].set_visible(False)
+    ax_marg_x.tick_params(left=False)
+    ax_marg_y.spines['bottom'].set_visible(False)
+    ax_marg_y.tick_params(bottom=False)
+
     # 设置标题
     chart_title = title if title else f"{x_var} vs {y_var} 联合分布图"
-    g.fig.suptitle(chart_title, fontsize=14, y=1.02)
-    
+    fig.suptitle(chart_title, fontsize=14, y=1.02)
+
     # 设置轴标签
-    g.set_axis_labels(x_var, y_var, fontsize=12)
-    
+    ax_joint.set_xlabel(x_var, fontsize=12)
+    ax_joint.set_ylabel(y_var, fontsize=12)
+
     # 转换为base64
     buffer = io.BytesIO()
-    g.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
+    fig.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
     buffer.seek(0)
     plot_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close('all')
     
     return {
         "plot": plot_data,
         "x_var": x_var,
         "y_var": y_var,
+        "n_points": int(len(x_values)),
+        "render_mode": "aggregated" if aggregated else "points",
         "chart_type": "jointplot"
     }
 
@@ -8,14 +8,15 @@ import io
 import base64
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import scipy.stats as stats
 import numpy as np
+from utils.data_loader import read_dataframe
 
 # ==================== 全局配置 ====================
 # 配置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
+matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
 # 统一图片尺寸和DPI
 FIGURE_SIZE = (10, 8)  # 英寸
@@ -23,12 +24,163 @@ FIGURE_DPI = 100
 SAVE_DPI = 150
 
 
+# 点数超过该值时按秩等距抽取这么多个次序统计量绘制（保留最小值和最大值）
+QQ_MAX_POINTS = 1000
+# 形状参数的极大似然估计最多使用的次序统计量个数
+QQ_FIT_MAX_POINTS = 5000
+# 逐点置信带的置信水平
+QQ_CONFIDENCE = 0.95
+
+DIST_NAMES = {
+    'norm': '正态分布',
+    't': 't分布',
+    'chi2': '卡方分布',
+    'f': 'F分布',
+    'gamma': 'Gamma分布',
+    'beta': 'Beta分布',
+    'uniform': '均匀分布',
+    'expon': '指数分布'
+}
+# 形状参数的显示名称（默认使用scipy中的参数名）
+SHAPE_LABELS = {'gamma': ('α',)}
+
+
+def _get_distribution(distribution):
+    dist = getattr(stats, distribution, None)
+    if not isinstance(dist, stats.rv_continuous):
+        raise ValueError(f"不支持的参考分布: {distribution}")
+    return dist
+
+
+def _default_shape_params(distribution, sample_size):
+    """极大似然估计失败（如数据为常数）时使用的形状参数"""
+    df_param = sample_size - 1 if sample_size > 1 else 1
+    if distribution in ('t', 'chi2'):
+        return (df_param,)
+    if distribution == 'f':
+        dfn = max(2, df_param // 2)
+        dfd = max(2, df_param - dfn)
+        return (dfn, dfd)
+    if distribution == 'gamma':
+        return (2.0,)
+    if distribution == 'beta':
+        return (2, 2)
+    return ()
+
+
+def order_statistics(values, max_points=QQ_MAX_POINTS):
+    """
+    按秩等距抽取次序统计量
+
+    用 np.partition 只在抽取的秩处做选择，不对全部数据排序。
+
+    Args:
+        values: 一维数值数组（不含NaN）
+        max_points: 最多抽取的个数；数据量不超过该值时返回全部排序后的数据
+
+    Returns:
+        tuple: (秩数组（从0开始）, 对应的次序统计量)
+    """
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n), np.sort(values)
+    ranks = np.unique(np.linspace(0, n - 1, max_points).round().astype(np.intp))
+    return ranks, np.partition(values, ranks)[ranks]
+
+
+def plotting_positions(ranks, sample_size):
+    """次序统计量中位数的Filliben近似（与 scipy.stats.probplot 一致）"""
+    positions = (ranks + 1 - 0.3175) / (sample_size + 0.365)
+    last = 0.5 ** (1 / sample_size)
+    positions[ranks == sample_size - 1] = last
+    positions[ranks == 0] = 1 - last
+    return positions
+
+
+def shape_params(distribution, values):
+    """
+    参考分布的形状参数（scipy.stats.probplot 的 sparams）
+
+    由极大似然估计得到（位置和尺度参数一并估计，但由QQ图参考线吸收，不返回）。
+    数据量大于 QQ_FIT_MAX_POINTS 时在等距抽取的次序统计量上估计。
+    norm、uniform、expon 等没有形状参数的分布返回空元组。
+    """
+    dist = _get_distribution(distribution)
+    if not dist.numargs:
+        return ()
+    _, sample = order_statistics(np.asarray(values, dtype=float), QQ_FIT_MAX_POINTS)
+    try:
+        with np.errstate(all='ignore'):
+            params = dist.fit(sample)[:dist.numargs]
+    except (ValueError, RuntimeError, FloatingPointError):
+        params = ()
+    if len(params) != dist.numargs or not np.all(np.isfinite(params)):
+        return _default_shape_params(distribution, len(values))
+    return tuple(float(param) for param in params)
+
+
+def shape_params_label(distribution, params):
+    """形状参数的显示文本，如 "df=4.85"；没有形状参数时返回空字符串"""
+    if not params:
+        return ''
+    names = SHAPE_LABELS.get(distribution) or tuple(_get_distribution(distribution).shapes.split(', '))
+    return ', '.join(f"{name}={value:.3g}" for name, value in zip(names, params))
+
+
+def qq_points(values, distribution='norm', max_points=QQ_MAX_POINTS):
+    """
+    QQ图的点、参考线和逐点置信带
+
+    置信带由次序统计量的分布解析得到：第i个次序统计量的分布函数值服从 Beta(i, n-i+1)，
+    取其上下分位数经参考分布的分位数函数和参考线变换得到样本分位数的区间。
+
+    Args:
+        values: 一维数值数组（不含NaN），至少2个
+        distribution: 参考分布（scipy.stats中的连续分布名）
+        max_points: 最多返回的点数
+
+    Returns:
+        dict: {
+            "shape_params": 形状参数,
+            "theoretical": 理论分位数,
+            "sample": 样本分位数,
+            "lower" / "upper": 置信带下/上界,
+            "slope" / "intercept" / "r": 参考线（最小二乘拟合）及相关系数
+        }
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    dist = _get_distribution(distribution)
+    sparams = shape_params(distribution, values)
+
+    ranks, sample = order_statistics(values, max_points)
+    theoretical = dist.ppf(plotting_positions(ranks.astype(float), n), *sparams)
+    slope, intercept, r, _, _ = stats.linregress(theoretical, sample)
+
+    alpha = (1 - QQ_CONFIDENCE) / 2
+    order = ranks + 1
+    lower = intercept + slope * dist.ppf(stats.beta.ppf(alpha, order, n - order + 1), *sparams)
+    upper = intercept + slope * dist.ppf(stats.beta.ppf(1 - alpha, order, n - order + 1), *sparams)
+    if slope < 0:
+        lower, upper = upper, lower
+    return {
+        'shape_params': sparams,
+        'theoretical': theoretical,
+        'sample': sample,
+        'lower': lower,
+        'upper': upper,
+        'slope': float(slope),
+        'intercept': float(intercept),
+        'r': float(r),
+    }
+
+
 def generate_qqplot(csv_data, column_name, distribution='norm', color='#0062FF', title=None):
     """
     生成QQ图并返回base64编码图像
     
     Args:
-        csv_data: CSV文件路径或文件对象
+        csv_data: 已解析的DataFrame，或CSV文件路径、文件对象（含内存中的上传文件）
         column_name: 要检验的数值列名
         distribution: 参考分布类型 (默认: 'norm' 正态分布)
         color: 散点颜色 (默认: '#0062FF')
@@ -38,7 +190,9 @@ def generate_qqplot(csv_data, column_name, distribution='norm', color='#0062FF',
         dict: {
             "plot": base64编码的图像字符串,
             "column_name": 列名,
-            "distribution": 参考分布
+            "distribution": 参考分布,
+            "shape_params": 极大似然估计的形状参数,
+            "sample_size": 有效样本量
         }
     
     Raises:
@@ -47,7 +201,7 @@ def generate_qqplot(csv_data, column_name, distribution='norm', color='#0062FF',
     """
     # 读取CSV数据
     try:
-        df = pd.read_csv(csv_data)
+        df = read_dataframe(csv_data)
     except FileNotFoundError:
         raise FileNotFoundError(f"CSV文件未找到: {csv_data}")
     
@@ -62,81 +216,32 @@ def generate_qqplot(csv_data, column_name, distribution='norm', color='#0062FF',
     if not pd.api.types.is_numeric_dtype(data):
         raise ValueError(f"列 '{column_name}' 不是数值类型")
     
-    if len(data) == 0:
-        raise ValueError(f"列 '{column_name}' 没有有效数据")
+    if len(data) < 2:
+        raise ValueError(f"列 '{column_name}' 至少需要2个有效数据")
     
     # 创建图形
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    ax = fig.subplots()
     
-    # 生成QQ图
-    # 某些分布需要额外的形状参数（shape parameters）
-    # 使用样本大小-1作为自由度的默认值
+    # 生成QQ图：数据量大时只绘制等距抽取的次序统计量，图片大小和绘制耗时与样本量无关
     sample_size = len(data)
-    df_param = sample_size - 1 if sample_size > 1 else 1
+    qq = qq_points(data.to_numpy(dtype=float), distribution)
+    theoretical = qq['theoretical']
     
-    if distribution == 't':
-        # Student's T 分布需要自由度参数
-        stats.probplot(data, dist=distribution, sparams=(df_param,), plot=ax)
-    elif distribution == 'chi2':
-        # Chi-Square 分布需要自由度参数
-        stats.probplot(data, dist=distribution, sparams=(df_param,), plot=ax)
-    elif distribution == 'f':
-        # F 分布需要两个自由度参数 (dfn, dfd)
-        dfn = max(2, df_param // 2)
-        dfd = max(2, df_param - dfn)
-        stats.probplot(data, dist=distribution, sparams=(dfn, dfd), plot=ax)
-    elif distribution == 'gamma':
-        # Gamma 分布需要形状参数 (alpha)
-        # 使用简单的矩估计
-        alpha = 2.0  # 默认形状参数
-        stats.probplot(data, dist=distribution, sparams=(alpha,), plot=ax)
-    elif distribution == 'beta':
-        # Beta 分布需要两个形状参数 (a, b)
-        stats.probplot(data, dist=distribution, sparams=(2, 2), plot=ax)
-    else:
-        # 其他分布（norm, uniform, expon等）不需要额外参数
-        stats.probplot(data, dist=distribution, plot=ax)
-    
-    # 获取当前的线条和点
-    line = ax.get_lines()[0]  # 理论分位数线
-    points = ax.get_lines()[1]  # 实际数据点
-    
-    # 自定义样式
-    line.set_color('red')
-    line.set_linewidth(2)
-    line.set_linestyle('--')
-    line.set_label('理论分位数线')
-    
-    points.set_color(color)
-    points.set_markersize(6)
-    points.set_alpha(0.6)
-    points.set_markeredgecolor('black')
-    points.set_markeredgewidth(0.5)
+    ax.fill_between(theoretical, qq['lower'], qq['upper'], color='red', alpha=0.12,
+                    label=f"{QQ_CONFIDENCE:.0%}逐点置信带")
+    ax.plot(theoretical, qq['sample'], 'o', color=color, markersize=6, alpha=0.6,
+            markeredgecolor='black', markeredgewidth=0.5, label='样本分位数')
+    ax.plot(theoretical, qq['intercept'] + qq['slope'] * theoretical,
+            color='red', linewidth=2, linestyle='--', label='理论分位数线')
     
     # 设置标题和标签
-    dist_names = {
-        'norm': '正态分布',
-        't': 't分布',
-        'chi2': '卡方分布',
-        'f': 'F分布',
-        'gamma': 'Gamma分布',
-        'beta': 'Beta分布',
-        'uniform': '均匀分布',
-        'expon': '指数分布'
-    }
-    dist_name = dist_names.get(distribution, distribution)
+    dist_name = DIST_NAMES.get(distribution, distribution)
     
     # 在标题中显示分布参数（如果适用）
-    if distribution == 't':
-        chart_title = title if title else f"{column_name} QQ图 ({dist_name}, df={df_param})"
-    elif distribution == 'chi2':
-        chart_title = title if title else f"{column_name} QQ图 ({dist_name}, df={df_param})"
-    elif distribution == 'f':
-        chart_title = title if title else f"{column_name} QQ图 ({dist_name}, dfn={dfn}, dfd={dfd})"
-    elif distribution == 'gamma':
-        chart_title = title if title else f"{column_name} QQ图 ({dist_name}, α=2.0)"
-    elif distribution == 'beta':
-        chart_title = title if title else f"{column_name} QQ图 ({dist_name}, a=2, b=2)"
+    param_label = shape_params_label(distribution, qq['shape_params'])
+    if param_label:
+        chart_title = title if title else f"{column_name} QQ图 ({dist_name}, {param_label})"
     else:
         chart_title = title if title else f"{column_name} QQ图 ({dist_name})"
     
@@ -152,15 +257,16 @@ def generate_qqplot(csv_data, column_name, distribution='norm', color='#0062FF',
     
     # 转换为base64
     buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
+    fig.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
     buffer.seek(0)
     plot_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close('all')
     
     return {
         "plot": plot_data,
         "column_name": column_name,
         "distribution": distribution,
+        "shape_params": list(qq['shape_params']),
+        "sample_size": sample_size,
         "chart_type": "qqplot"
     }
 
@@ -2,19 +2,26 @@
 散点图生成模块
 用于生成双变量散点图(带回归线)
 """
+import numpy as np
 import pandas as pd
+import scipy.stats as stats
 import seaborn as sns
 import io
 import base64
 import matplotlib
 
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from config import CHART_AGGREGATE_BINS, CHART_AGGREGATE_MIN_POINTS
+from utils.binning import histogram_2d, histogram_2d_grouped
+from utils.data_loader import read_dataframe
+from utils.facets import facet_figure, facet_groups, facet_title, finish_facet_axes
 
 # ==================== 全局配置 ====================
 # 配置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
+matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
 # 统一图片尺寸和DPI
 FIGURE_SIZE = (10, 8)  # 英寸
@@ -22,22 +29,110 @@ FIGURE_DPI = 100
 SAVE_DPI = 150
 
 
-def generate_scatterplot(csv_data, x_column=None, y_column=None, color='#0062FF', title=None):
+def _draw_points(ax, df, x_col, y_col, color):
+    """逐点绘制散点图和带bootstrap置信带的回归线"""
+    # 绘制散点图
+    sns.scatterplot(
+        data=df,
+        x=x_col,
+        y=y_col,
+        color=color,
+        alpha=0.7,
+        edgecolor="black",
+        s=50,
+        ax=ax
+    )
+    
+    # 添加回归线（至少需要2个点）
+    if len(df[[x_col, y_col]].dropna()) < 2:
+        return
+    sns.regplot(
+        data=df,
+        x=x_col,
+        y=y_col,
+        scatter=False,
+        color="black",
+        line_kws={'linewidth': 2.5, 'alpha': 0.8},
+        ax=ax
+    )
+
+
+def _draw_counts(ax, counts, x_edges, y_edges, color, norm):
+    """以频数热图代替逐点散点（频数为0的格子不着色）"""
+    return ax.pcolormesh(
+        x_edges, y_edges, np.ma.masked_equal(counts.T, 0),
+        cmap=sns.light_palette(color, as_cmap=True), norm=norm, shading='flat'
+    )
+
+
+def _draw_regression(ax, x, y, x_edges):
+    """
+    回归线与95%置信带（按解析公式计算；seaborn的regplot对置信带做bootstrap，数据量大时非常慢）
+    """
+    n = len(x)
+    if n < 3:
+        return
+    x_mean = x.mean()
+    sxx = np.sum((x - x_mean) ** 2)
+    if sxx == 0:
+        return
+    slope, intercept = np.polyfit(x, y, 1)
+    residual = y - (slope * x + intercept)
+    s = np.sqrt(np.sum(residual ** 2) / (n - 2))
+    grid = np.linspace(x_edges[0], x_edges[-1], 100)
+    fit = slope * grid + intercept
+    half_width = stats.t.ppf(0.975, n - 2) * s * np.sqrt(1 / n + (grid - x_mean) ** 2 / sxx)
+    ax.plot(grid, fit, color='black', linewidth=2.5, alpha=0.8)
+    ax.fill_between(grid, fit - half_width, fit + half_width, color='black', alpha=0.15, linewidth=0)
+
+
+def _draw_aggregated(ax, fig, x, y, color):
+    """大数据量模式：二维分箱后以频数热图代替逐点散点，并绘制回归线与置信带"""
+    counts, x_edges, y_edges = histogram_2d(x, y, CHART_AGGREGATE_BINS)
+    mesh = _draw_counts(ax, counts, x_edges, y_edges, color, LogNorm())
+    fig.colorbar(mesh, ax=ax, label='点数')
+    _draw_regression(ax, x, y, x_edges)
+
+
+def _draw_facets_aggregated(fig, axes, groups, x_col, y_col, color):
+    """
+    分面的大数据量模式：所有分面共用箱边界，一次bincount得到各分面的频数网格，
+    共用同一对数色标和一个颜色条
+    """
+    arrays = [
+        (group[x_col].to_numpy(dtype=float), group[y_col].to_numpy(dtype=float))
+        for _, group in groups
+    ]
+    codes = np.concatenate([np.full(len(x), i, dtype=np.intp) for i, (x, _) in enumerate(arrays)])
+    counts, x_edges, y_edges = histogram_2d_grouped(
+        np.concatenate([x for x, _ in arrays]), np.concatenate([y for _, y in arrays]),
+        codes, len(groups), CHART_AGGREGATE_BINS
+    )
+    norm = LogNorm(vmin=1, vmax=max(int(counts.max()), 1))
+    for ax, panel_counts, (x, y) in zip(axes, counts, arrays):
+        mesh = _draw_counts(ax, panel_counts, x_edges, y_edges, color, norm)
+        _draw_regression(ax, x, y, x_edges)
+    fig.colorbar(mesh, ax=axes, label='点数')
+
+
+def generate_scatterplot(csv_data, x_column=None, y_column=None, color='#0062FF', title=None, facet=None):
     """
     生成双变量散点图(带回归线)并返回base64编码图像
     
     Args:
-        csv_data: CSV文件路径或文件对象
+        csv_data: 已解析的DataFrame，或CSV文件路径、文件对象（含内存中的上传文件）
         x_column: X轴列名。如果为None,使用第一个数值列
         y_column: Y轴列名。如果为None,使用第二个数值列
         color: 散点颜色 (默认: '#0062FF')
         title: 自定义标题。如果为None,则自动生成标题
+        facet: 分面列名(可选)。指定时按该列的每个取值各画一个子图，坐标轴各子图共用
     
     Returns:
         dict: {
             "plot": base64编码的图像字符串,
             "x_column": X轴列名,
-            "y_column": Y轴列名
+            "y_column": Y轴列名,
+            "facets": 各分面的取值（仅分面图）
         }
     
     Raises:
@@ -46,7 +141,7 @@ def generate_scatterplot(csv_data, x_column=None, y_column=None, color='#0062FF'
     """
     # 读取CSV数据
     try:
-        df = pd.read_csv(csv_data)
+        df = read_dataframe(csv_data)
     except FileNotFoundError:
         raise FileNotFoundError(f"CSV文件未找到: {csv_data}")
     
@@ -63,55 +158,72 @@ def generate_scatterplot(csv_data, x_column=None, y_column=None, color='#0062FF'
         raise ValueError(f"列 '{x_col}' 在CSV中不存在")
     if y_col not in df.columns:
         raise ValueError(f"列 '{y_col}' 在CSV中不存在")
+    if facet and facet not in df.columns:
+        raise ValueError(f"分面列 '{facet}' 在CSV中不存在")
     
-    # 创建图形
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
-    
-    # 绘制散点图
-    scatter_plot = sns.scatterplot(
-        data=df,
-        x=x_col,
-        y=y_col,
-        color=color,
-        alpha=0.7,
-        edgecolor="black",
-        s=50,
-        ax=ax
-    )
-    
-    # 添加回归线
-    sns.regplot(
-        data=df,
-        x=x_col,
-        y=y_col,
-        scatter=False,
-        color="black",
-        line_kws={'linewidth': 2.5, 'alpha': 0.8},
-        ax=ax
+    # 点数超过阈值时分箱聚合后绘制，耗时与行数无关，也避免大量点重叠成一片
+    # （分面图按所有分面的总点数判断，各子图使用同一种绘制方式）
+    pairs = df[[x_col, y_col] + ([facet] if facet and facet not in (x_col, y_col) else [])]
+    pairs = pairs.dropna(subset=[x_col, y_col])
+    aggregated = (
+        len(pairs) > CHART_AGGREGATE_MIN_POINTS
+        and pd.api.types.is_numeric_dtype(pairs[x_col])
+        and pd.api.types.is_numeric_dtype(pairs[y_col])
     )
-    
-    # 设置标题和标签
     chart_title = title if title else f"{x_col} vs {y_col} 散点图"
-    ax.set_title(chart_title, fontsize=14, pad=20)
-    ax.set_xlabel(x_col, fontsize=12)
-    ax.set_ylabel(y_col, fontsize=12)
-    
-    # 添加网格
-    ax.grid(True, linestyle='--', alpha=0.3)
+
+    if facet:
+        # 分面图：一次groupby拆分数据，每个分面一个子图
+        groups = facet_groups(pairs, facet)
+        fig, axes = facet_figure(len(groups), FIGURE_DPI)
+        if aggregated:
+            _draw_facets_aggregated(fig, axes, groups, x_col, y_col, color)
+        else:
+            for ax, (_, group) in zip(axes, groups):
+                _draw_points(ax, group, x_col, y_col, color)
+        for ax, (value, _) in zip(axes, groups):
+            ax.set_title(facet_title(facet, value), fontsize=12)
+            ax.grid(True, linestyle='--', alpha=0.3)
+        finish_facet_axes(axes, x_col, y_col)
+        fig.suptitle(chart_title, fontsize=14)
+    else:
+        # 创建图形
+        fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+        ax = fig.subplots()
+        if aggregated:
+            _draw_aggregated(
+                ax, fig,
+                pairs[x_col].to_numpy(dtype=float), pairs[y_col].to_numpy(dtype=float),
+                color
+            )
+        else:
+            _draw_points(ax, df, x_col, y_col, color)
+
+        # 设置标题和标签
+        ax.set_title(chart_title, fontsize=14, pad=20)
+        ax.set_xlabel(x_col, fontsize=12)
+        ax.set_ylabel(y_col, fontsize=12)
+
+        # 添加网格
+        ax.grid(True, linestyle='--', alpha=0.3)
     
     # 转换为base64
     buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
+    fig.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
     buffer.seek(0)
     plot_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close('all')
     
-    return {
+    result = {
         "plot": plot_data,
         "x_column": x_col,
         "y_column": y_col,
+        "n_points": int(len(pairs)),
+        "render_mode": "aggregated" if aggregated else "points",
         "chart_type": "scatterplot"
     }
+    if facet:
+        result.update(facet=facet, facets=[value for value, _ in groups])
+    return result
 
 
 if __name__ == '__main__':
@@ -2,41 +2,135 @@
 小提琴图生成模块
 用于检查数据分布形状、密度和多峰特征
 """
+import numpy as np
 import pandas as pd
 import seaborn as sns
 import io
 import base64
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from utils.data_loader import read_dataframe
+from utils.facets import facet_figure, facet_groups, facet_title, finish_facet_axes
+from utils.kde import kde_fft
 
 # ==================== 全局配置 ====================
 # 配置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'Microsoft YaHei']
+matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
 # 统一图片尺寸和DPI
 FIGURE_SIZE = (10, 8)  # 英寸
 FIGURE_DPI = 100
 SAVE_DPI = 150
 
+# 小提琴最大宽度（分组间距为1）与密度曲线点数，与 seaborn.violinplot 默认一致
+VIOLIN_WIDTH = 0.8
+KDE_GRID_SIZE = 100
+EDGE_COLOR = '#3f3f3f'
+LINE_WIDTH = 1.5
 
-def generate_violinplot(csv_data, y_column, x_column=None, color='#0062FF', title=None):
+
+def _draw_inner_box(ax, position, values):
+    """小提琴内部的箱线：四分位区间粗线、1.5倍IQR须线、白色中位数点"""
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    whisker_low = values[values >= q1 - 1.5 * iqr].min()
+    whisker_high = values[values <= q3 + 1.5 * iqr].max()
+    ax.plot([position, position], [whisker_low, whisker_high], color=EDGE_COLOR, linewidth=LINE_WIDTH)
+    ax.plot([position, position], [q1, q3], color=EDGE_COLOR, linewidth=LINE_WIDTH * 3, solid_capstyle='butt')
+    ax.scatter([position], [median], s=(LINE_WIDTH * 3) ** 2, color='white', zorder=3)
+
+
+def _draw_violins(ax, groups, color, bw_method, positions=None):
+    """
+    绘制小提琴（cut=0，按面积缩放：各组密度共用同一比例，最高的密度峰占满 VIOLIN_WIDTH）
+
+    密度由线性分箱 + FFT卷积计算，替代 seaborn.violinplot 的逐点KDE，
+    分组多、数据量大时耗时基本只取决于组数
+
+    Args:
+        ax: 绘图坐标轴
+        groups: [(组名, 数值数组), ...]
+        color: 填充颜色
+        bw_method: KDE带宽规则
+        positions: 各组的x坐标，默认第i组画在x=i处
+    """
+    if positions is None:
+        positions = range(len(groups))
+    curves = [kde_fft(values, KDE_GRID_SIZE, bw_method=bw_method) for _, values in groups]
+    peaks = [density.max() for _, density in curves if density is not None]
+    max_density = max(peaks) if peaks else 1.0
+    facecolor = sns.desaturate(color, 0.75)
+
+    for position, (_, values), (grid, density) in zip(positions, groups, curves):
+        if grid is None:
+            # 只有一个观测值或所有值相同时无法估计密度，画一条横线
+            ax.plot([position - VIOLIN_WIDTH / 2, position + VIOLIN_WIDTH / 2], [values[0], values[0]],
+                    color=EDGE_COLOR, linewidth=LINE_WIDTH)
+            continue
+        half_width = density / max_density * (VIOLIN_WIDTH / 2)
+        ax.fill_betweenx(grid, position - half_width, position + half_width,
+                         facecolor=facecolor, edgecolor=EDGE_COLOR, linewidth=LINE_WIDTH)
+        _draw_inner_box(ax, position, values)
+
+
+def _violin_groups(df, y_column, x_column):
+    """按分组列拆分数值列，返回 [(组名, 数值数组), ...]；没有分组列时只有一组"""
+    if not x_column:
+        return [(None, df[y_column].dropna().to_numpy(dtype=float))]
+    data = df[[x_column, y_column]].dropna()
+    return [
+        (name, group.to_numpy(dtype=float))
+        for name, group in data.groupby(x_column, sort=True)[y_column]
+    ]
+
+
+def _draw_panel(ax, df, y_column, x_column, color, bw_method, levels=None):
+    """
+    在一个坐标轴上绘制单个或分组小提琴图
+
+    Args:
+        levels: 分组的类别顺序（分面时各子图共用），默认为本数据中出现的分组
+    """
+    groups = [(name, values) for name, values in _violin_groups(df, y_column, x_column) if len(values)]
+    if not x_column:
+        _draw_violins(ax, groups, color, bw_method)
+        ax.set_xticks([])
+        ax.set_xlim(-0.5, 0.5)
+        return
+    if levels is None:
+        levels = [name for name, _ in groups]
+    position = {level: i for i, level in enumerate(levels)}
+    _draw_violins(ax, groups, color, bw_method, [position[name] for name, _ in groups])
+    ax.set_xlim(-0.5, len(levels) - 0.5)
+    ax.set_xticks(range(len(levels)))
+    ax.set_xticklabels([str(level) for level in levels])
+    # 旋转X轴标签以避免重叠
+    for label in ax.get_xticklabels():
+        label.set(rotation=45, ha='right')
+
+
+def generate_violinplot(csv_data, y_column, x_column=None, color='#0062FF', title=None, bw_method='scott',
+                        facet=None):
     """
     生成小提琴图并返回base64编码图像
     
     Args:
-        csv_data: CSV文件路径或文件对象
+        csv_data: 已解析的DataFrame，或CSV文件路径、文件对象（含内存中的上传文件）
         y_column: Y轴数值列名(必需)
         x_column: X轴分组列名(可选)。如果为None,生成单个小提琴图
         color: 小提琴图颜色 (默认: '#0062FF')
         title: 自定义标题。如果为None,则自动生成标题
+        bw_method: 密度估计的带宽规则 ('scott' 或 'silverman')
+        facet: 分面列名(可选)。指定时按该列的每个取值各画一个子图，分组位置和Y轴各子图共用
     
     Returns:
         dict: {
             "plot": base64编码的图像字符串,
             "y_column": Y轴列名,
-            "x_column": X轴列名或None
+            "x_column": X轴列名或None,
+            "facets": 各分面的取值（仅分面图）
         }
     
     Raises:
@@ -45,7 +139,7 @@ def generate_violinplot(csv_data, y_column, x_column=None, color='#0062FF', titl
     """
     # 读取CSV数据
     try:
-        df = pd.read_csv(csv_data)
+        df = read_dataframe(csv_data)
     except FileNotFoundError:
         raise FileNotFoundError(f"CSV文件未找到: {csv_data}")
     
@@ -56,61 +150,59 @@ def generate_violinplot(csv_data, y_column, x_column=None, color='#0062FF', titl
     # 验证X列是否存在(如果提供)
     if x_column and x_column not in df.columns:
         raise ValueError(f"列 '{x_column}' 在CSV中不存在")
+
+    if not pd.api.types.is_numeric_dtype(df[y_column]):
+        raise ValueError(f"列 '{y_column}' 不是数值类型")
     
-    # 创建图形
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
-    
-    # 生成小提琴图
-    if x_column:
-        # 分组小提琴图
-        sns.violinplot(
-            data=df,
-            x=x_column,
-            y=y_column,
-            color=color,
-            ax=ax,
-            inner='box',  # 内部显示箱线图
-            cut=0  # 不延伸到数据范围之外
-        )
-        ax.set_xlabel(x_column, fontsize=12)
-        # 旋转X轴标签以避免重叠
-        plt.xticks(rotation=45, ha='right')
-    else:
-        # 单个小提琴图
-        sns.violinplot(
-            data=df,
-            y=y_column,
-            color=color,
-            ax=ax,
-            inner='box',
-            cut=0
-        )
-    
-    # 设置标题和标签
+    data = df[[x_column, y_column]].dropna() if x_column else df[[y_column]].dropna()
+    if data.empty:
+        raise ValueError(f"列 '{y_column}' 没有有效数据")
+
+    # 设置标题
     if x_column:
         chart_title = title if title else f"{y_column} 按 {x_column} 分组的小提琴图"
     else:
         chart_title = title if title else f"{y_column} 小提琴图"
-    
-    ax.set_title(chart_title, fontsize=14, pad=20)
-    ax.set_ylabel(y_column, fontsize=12)
-    
-    # 添加网格
-    ax.grid(True, linestyle='--', alpha=0.3, axis='y')
+
+    if facet:
+        # 分面图：一次groupby拆分数据，各子图使用整列的分组顺序，同一组在每个子图中位置相同
+        groups = facet_groups(df, facet)
+        levels = data.groupby(x_column, sort=True).size().index.tolist() if x_column else None
+        fig, axes = facet_figure(len(groups), FIGURE_DPI, sharex=bool(x_column))
+        for ax, (value, group) in zip(axes, groups):
+            _draw_panel(ax, group, y_column, x_column, color, bw_method, levels)
+            ax.set_title(facet_title(facet, value), fontsize=12)
+            ax.grid(True, linestyle='--', alpha=0.3, axis='y')
+        finish_facet_axes(axes, x_column or '', y_column, rotate_x_labels=bool(x_column))
+        fig.suptitle(chart_title, fontsize=14)
+    else:
+        # 创建图形
+        fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+        ax = fig.subplots()
+        _draw_panel(ax, df, y_column, x_column, color, bw_method)
+        if x_column:
+            ax.set_xlabel(x_column, fontsize=12)
+        ax.set_title(chart_title, fontsize=14, pad=20)
+        ax.set_ylabel(y_column, fontsize=12)
+
+        # 添加网格
+        ax.grid(True, linestyle='--', alpha=0.3, axis='y')
     
     # 转换为base64
     buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
+    fig.savefig(buffer, format='png', dpi=SAVE_DPI, bbox_inches='tight')
     buffer.seek(0)
     plot_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close('all')
     
-    return {
+    result = {
         "plot": plot_data,
         "y_column": y_column,
         "x_column": x_column,
         "chart_type": "violinplot"
     }
+    if facet:
+        result.update(facet=facet, facets=[value for value, _ in groups])
+    return result
 
 
 if __name__ == '__main__':
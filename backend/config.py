@@ -1,14 +1,63 @@
 """
 应用配置文件
 """
+import os
+import tempfile
 
 # 文件上传配置
-ALLOWED_EXTENSIONS = {'csv'}
-MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+ALLOWED_EXTENSIONS = {'csv', 'parquet', 'feather', 'arrow'}  # 列式格式需要安装pyarrow
+MAX_FILE_SIZE = 4 * 1024 * 1024 * 1024  # 4GB
+
+# 超过该大小的上传文件按块流式画像，不整体加载到内存
+STREAMING_PROFILE_THRESHOLD = 50 * 1024 * 1024  # 50MB
+STREAMING_PROFILE_CHUNK_ROWS = 100000  # 每块行数
+PROFILE_DISTINCT_LIMIT = 10000  # 每列精确统计取值个数的上限，超过后只保留唯一值个数下界
+
+# 并行CSV解析配置（上传文件按行边界切分后多线程解析）
+PARALLEL_CSV_MIN_BYTES = 8 * 1024 * 1024  # 小于该大小的文件直接单线程解析
+PARALLEL_CSV_WORKERS = min(8, os.cpu_count() or 1)  # 解析线程数
+
+# 图表渲染进程池配置（DataVisualization生成函数在预热的子进程中执行）
+CHART_RENDER_WORKERS = min(4, os.cpu_count() or 1)  # 渲染进程数，0表示在请求线程内直接渲染
+CHART_RENDER_TIMEOUT = 60  # 秒，单个图表的渲染超时时间（含排队时间）
+CHART_BATCH_MAX_CHARTS = 24  # 批量图表接口单次请求最多的图表数
+CHART_BATCH_TIMEOUT = 120  # 秒，批量图表整批的渲染超时时间（含排队时间）
+CHART_AGGREGATE_MIN_POINTS = 20000  # 散点图/联合分布图超过该点数时先分箱聚合再绘制
+CHART_AGGREGATE_BINS = 150  # 聚合模式下每个维度的箱数
+CORRELATION_WORKERS = min(4, os.cpu_count() or 1)  # 相关系数矩阵按列对并行计算的线程数
+FACET_MAX_PANELS = 12  # 分面图最多的分面（子图）数
+FACET_MAX_COLUMNS = 3  # 分面网格每行最多的子图数
+
+# 数据集会话配置（上传一次，按dataset_id复用已解析的数据）
+DATASET_TTL_SECONDS = 30 * 60  # 最后一次访问后保留的时间
+DATASET_MAX_COUNT = 32  # 最多同时缓存的数据集数量
+DATASET_MAX_MEMORY = 2 * 1024 * 1024 * 1024  # 缓存数据集占用内存上限（2GB）
+
+# 上传文件画像磁盘缓存（按文件内容哈希，重复上传同一文件时直接返回）
+PROFILE_CACHE_DIR = os.environ.get(
+    'PROFILE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'nhanes_profile_cache')
+)
+PROFILE_CACHE_MAX_ENTRIES = 64  # 最多保留的画像数量，超出后淘汰最久未使用的
+
+# 图表缓存（按数据内容指纹 + 图表参数缓存渲染结果，内存LRU + 磁盘两级）
+CHART_CACHE_MAX_ENTRIES = 128  # 内存中保留的图表数量
+CHART_CACHE_DIR = os.environ.get(
+    'CHART_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'nhanes_chart_cache')
+)
+CHART_CACHE_DISK_MAX_ENTRIES = 1024  # 磁盘上保留的图表数量，超出后淘汰最久未使用的
+
+# 列类型抽样推断配置（/get_file_columns）
+TYPE_INFERENCE_SAMPLE_ROWS = 2000  # 抽样行数（含文件开头的行）
+TYPE_INFERENCE_HEAD_ROWS = 200  # 其中固定取文件开头的行数
+TYPE_INFERENCE_FULL_READ_BYTES = 1 * 1024 * 1024  # 小于该大小的文件直接完整读取
 
 # CORS配置
 CORS_ORIGINS = '*'
 
+# HTTP缓存配置（指标/死亡数据等只读接口）
+DATA_CACHE_MAX_AGE = 300  # 秒，浏览器/CDN/nginx可直接复用的时间
+DATA_CACHE_STALE_WHILE_REVALIDATE = 600  # 秒，过期后允许先返回旧内容再后台校验
+
 # 应用配置
 DEBUG = False
 HOST = '0.0.0.0'
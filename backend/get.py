@@ -6,43 +6,71 @@ from flask_cors import CORS
 
 # 导入配置
 from config import CORS_ORIGINS, DEBUG, HOST, PORT
+from utils.serialization import FastJSONProvider
+from utils.uploads import UploadRequest
 
-# 导入数据提取功能
-try:
-    from GetNhanes.utils.getMetricsConvenient import get_nhanes_data
+
+def _check_data_extraction():
+    """检查NHANES数据提取功能是否可用（只打印提示，不影响服务启动）"""
     try:
-        from GetNhanes import config
-        base_path = config.get_base_path()
-        print(f"成功导入NHANES数据提取功能，基础路径: {base_path}")
-    except Exception as config_e:
-        print(f"成功导入NHANES数据提取功能，但配置检查失败: {config_e}")
-except Exception as e:
-    print(f"警告: 无法导入NHANES数据提取功能: {e}")
-    print("自定义数据提取功能将不可用")
-
-# 创建Flask应用
-app = Flask(__name__)
-CORS(app, origins=CORS_ORIGINS)
-
-print("Starting the NHANES data processing server...")
-
-# 注册路由蓝图
-from routes.file_operations import file_bp
-from routes.data_visualization import visualization_bp
-from routes.data_analysis import analysis_bp
-from routes.data_extraction import extraction_bp
-
-app.register_blueprint(file_bp)
-app.register_blueprint(visualization_bp)
-app.register_blueprint(analysis_bp)
-app.register_blueprint(extraction_bp)
-
-# 健康检查端点
-@app.route('/health', methods=['GET'])
-def health_check():
-    """健康检查接口"""
-    return {"status": "healthy", "message": "NHANES服务运行正常"}
+        from GetNhanes.utils.getMetricsConvenient import get_nhanes_data
+        try:
+            from GetNhanes import config
+            base_path = config.get_base_path()
+            print(f"成功导入NHANES数据提取功能，基础路径: {base_path}")
+        except Exception as config_e:
+            print(f"成功导入NHANES数据提取功能，但配置检查失败: {config_e}")
+    except Exception as e:
+        print(f"警告: 无法导入NHANES数据提取功能: {e}")
+        print("自定义数据提取功能将不可用")
+
+
+def create_app():
+    """
+    创建Flask应用并注册路由蓝图
+
+    模块导入时不创建应用：图表渲染进程（forkserver/spawn）会重新导入主模块，
+    导入本模块不应构建应用或启动后台任务
+    """
+    _check_data_extraction()
+
+    # 创建Flask应用
+    app = Flask(__name__)
+    # 接收上传文件时同步计算内容哈希（画像缓存、图表缓存的键）
+    app.request_class = UploadRequest
+    # numpy/pandas对象直接编码，NaN/Inf编码为null
+    app.json = FastJSONProvider(app)
+    # 暴露下载文件名等响应头，前端跨域fetch时可读取
+    CORS(app, origins=CORS_ORIGINS, expose_headers=['Content-Disposition', 'X-Suggested-Filename', 'X-Total-Rows'])
+
+    print("Starting the NHANES data processing server...")
+
+    # 注册路由蓝图
+    from routes.file_operations import file_bp
+    from routes.data_visualization import visualization_bp
+    from routes.data_analysis import analysis_bp
+    from routes.data_extraction import extraction_bp
+
+    app.register_blueprint(file_bp)
+    app.register_blueprint(visualization_bp)
+    app.register_blueprint(analysis_bp)
+    app.register_blueprint(extraction_bp)
+
+    # 健康检查端点
+    @app.route('/health', methods=['GET'])
+    def health_check():
+        """健康检查接口"""
+        return {"status": "healthy", "message": "NHANES服务运行正常"}
+
+    return app
+
 
 # 主程序入口
 if __name__ == '__main__':
+    app = create_app()
+    # 预先启动图表渲染进程，并在后台构建变量检索索引
+    from services.chart_renderer import ChartRenderer
+    from routes.data_extraction import warm_up_search_index
+    ChartRenderer.warm_up()
+    warm_up_search_index()
     app.run(host=HOST, port=PORT, debug=DEBUG)
@@ -5,7 +5,8 @@ from flask import Blueprint, request, jsonify
 from DataAnalysis.logisticRegression import logistic_regression_analysis, multinomial_logistic_regression_analysis
 from DataAnalysis.linearRegression import linear_regression_analysis, multiple_linear_regression_analysis
 from DataAnalysis.coxRegression import cox_regression_analysis
-from utils.serialization import convert_to_serializable
+from utils.serialization import convert_to_serializable, array_to_list
+from services.dataset_registry import DatasetInputError, resolve_request_source
 
 analysis_bp = Blueprint('data_analysis', __name__)
 
@@ -13,11 +14,10 @@ analysis_bp = Blueprint('data_analysis', __name__)
 @analysis_bp.route('/logisticRegression', methods=["POST"])
 def logistic_regression():
     """逻辑回归分析"""
-    if 'file' not in request.files:
-        return jsonify({"success": False, "error": "没有上传文件"}), 400
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({"success": False, "error": "没有选择文件"}), 400
+    try:
+        source, _ = resolve_request_source(request)
+    except DatasetInputError as de:
+        return jsonify({"success": False, "error": str(de), "error_code": de.error_code}), de.status
     
     x_var = request.form.get('x_var')
     if not x_var:
@@ -27,14 +27,14 @@ def logistic_regression():
         return jsonify({"success": False, "error": "请选择因变量"}), 400
     
     try:
-        result = logistic_regression_analysis(file, x_var, y_var)
+        result = logistic_regression_analysis(source, x_var, y_var)
         response_data = {
             "success": True,
             "plot": f"data:image/png;base64,{result['plot']}",
             "x_var": str(result['x_var']),
             "y_var": str(result['y_var']),
             "accuracy": convert_to_serializable(result["accuracy"]),
-            "coefficients": [convert_to_serializable(coef) for coef in result["coefficients"]],
+            "coefficients": array_to_list(result["coefficients"]),
             "intercept": convert_to_serializable(result["intercept"]),
             "regression_type": "logistic"
         }
@@ -56,12 +56,10 @@ def multinomial_logistic_regression():
         print("Files:", list(request.files.keys()))
         print("Form data:", dict(request.form))
         
-        if 'file' not in request.files:
-            return jsonify({"success": False, "error": "没有上传文件"}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({"success": False, "error": "没有选择文件"}), 400
+        try:
+            source, _ = resolve_request_source(request)
+        except DatasetInputError as de:
+            return jsonify({"success": False, "error": str(de), "error_code": de.error_code}), de.status
         
         x_vars = request.form.getlist('x_vars')
         y_var = request.form.get('y_var')
@@ -79,7 +77,7 @@ def multinomial_logistic_regression():
         print(f"自变量: {x_vars}")
         print(f"因变量: {y_var}")
         
-        result = multinomial_logistic_regression_analysis(file, x_vars, y_var)
+        result = multinomial_logistic_regression_analysis(source, x_vars, y_var)
         
         response_data = {
             "success": True,
@@ -107,11 +105,10 @@ def multinomial_logistic_regression():
 @analysis_bp.route('/linearRegression', methods=["POST"])
 def linear_regression():
     """线性回归分析"""
-    if 'file' not in request.files:
-        return jsonify({"success": False, "error": "没有上传文件"}), 400
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({"success": False, "error": "没有选择文件"}), 400
+    try:
+        source, _ = resolve_request_source(request)
+    except DatasetInputError as de:
+        return jsonify({"success": False, "error": str(de), "error_code": de.error_code}), de.status
     
     x_var = request.form.get('x_var')
     if not x_var:
@@ -121,14 +118,14 @@ def linear_regression():
         return jsonify({"success": False, "error": "请选择因变量"}), 400
     
     try:
-        result = linear_regression_analysis(file, x_var, y_var)
+        result = linear_regression_analysis(source, x_var, y_var)
         response_data = {
             "success": True,
             "plot": f"data:image/png;base64,{result['plot']}",
             "x_var": str(result['x_var']),
             "y_var": str(result['y_var']),
             "r_squared": convert_to_serializable(result.get("r2_score", result.get("r_squared"))),
-            "coefficients": [convert_to_serializable(coef) for coef in result["coefficients"]],
+            "coefficients": array_to_list(result["coefficients"]),
             "intercept": convert_to_serializable(result["intercept"]),
             "regression_type": "linear"
         }
@@ -146,12 +143,10 @@ def linear_regression():
 def multiple_linear_regression():
     """多元线性回归分析"""
     try:
-        if 'file' not in request.files:
-            return jsonify({"success": False, "error": "没有上传文件"}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({"success": False, "error": "没有选择文件"}), 400
+        try:
+            source, _ = resolve_request_source(request)
+        except DatasetInputError as de:
+            return jsonify({"success": False, "error": str(de), "error_code": de.error_code}), de.status
         
         x_vars = request.form.getlist('x_vars')
         y_var = request.form.get('y_var')
@@ -166,7 +161,7 @@ def multiple_linear_regression():
         if not y_var:
             return jsonify({"success": False, "error": "请选择因变量"}), 400
         
-        result = multiple_linear_regression_analysis(file, x_vars, y_var)
+        result = multiple_linear_regression_analysis(source, x_vars, y_var)
         
         response_data = {
             "success": True,
@@ -175,7 +170,7 @@ def multiple_linear_regression():
             "y_var": y_var,
             "r_squared": convert_to_serializable(result.get("r2_score", result.get("r_squared"))),
             "adjusted_r_squared": convert_to_serializable(result.get("adjusted_r_squared")),
-            "coefficients": {k: convert_to_serializable(v) for k, v in result.get("coefficients", {}).items()} if isinstance(result.get("coefficients"), dict) else [convert_to_serializable(c) for c in result.get("coefficients", [])],
+            "coefficients": result.get("coefficients", {}) if isinstance(result.get("coefficients"), dict) else array_to_list(result.get("coefficients", [])),
             "intercept": convert_to_serializable(result.get("intercept")),
             "regression_type": "multiple_linear"
         }
@@ -195,12 +190,10 @@ def multiple_linear_regression():
 def cox_regression():
     """Cox回归分析"""
     try:
-        if 'file' not in request.files:
-            return jsonify({"success": False, "error": "没有上传文件"}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({"success": False, "error": "没有选择文件"}), 400
+        try:
+            source, _ = resolve_request_source(request)
+        except DatasetInputError as de:
+            return jsonify({"success": False, "error": str(de), "error_code": de.error_code}), de.status
         
         duration_col = request.form.get('duration_col')
         event_col = request.form.get('event_col')
@@ -218,7 +211,7 @@ def cox_regression():
         if not covariates:
             return jsonify({"success": False, "error": "请至少选择一个协变量"}), 400
         
-        result = cox_regression_analysis(file, duration_col, event_col, covariates)
+        result = cox_regression_analysis(source, duration_col, event_col, covariates)
         
         response_data = {
             "success": True,
@@ -226,9 +219,10 @@ def cox_regression():
             "duration_col": duration_col,
             "event_col": event_col,
             "covariates": covariates,
-            "coefficients": {k: convert_to_serializable(v) for k, v in result.get("coefficients", {}).items()},
-            "hazard_ratios": {k: convert_to_serializable(v) for k, v in result.get("hazard_ratios", {}).items()},
-            "p_values": {k: convert_to_serializable(v) for k, v in result.get("p_values", {}).items()},
+            # 字典中的numpy数值和NaN由JSON provider直接编码
+            "coefficients": result.get("coefficients", {}),
+            "hazard_ratios": result.get("hazard_ratios", {}),
+            "p_values": result.get("p_values", {}),
             "concordance_index": convert_to_serializable(result.get("concordance_index")),
             "regression_type": "cox"
         }
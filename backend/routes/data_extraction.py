@@ -1,13 +1,19 @@
 """
 数据提取相关路由
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 import os
 import sys
-import json
 import math
 import pandas as pd
-import numpy as np
+from utils.http_cache import conditional_response, directory_fingerprint, file_fingerprint, make_etag
+from services.result_data_service import ResultDataService
+from services.variable_search import VariableSearchIndex
+from utils.serialization import frame_to_records
+from utils.file_utils import dataframe_csv_response, dataframe_columnar_response
+from utils.columnar import columnar_available
+from services.dataset_registry import DatasetRegistry
+from config import DATASET_TTL_SECONDS
 
 # 尝试加载NHANES数据提取核心函数
 try:
@@ -26,6 +32,13 @@ _RESULT_DATA_DIR = os.path.join(_BACKEND_ROOT, 'Dataresource', 'ResultData')
 _MORT_DATA_DIR = os.path.join(_BACKEND_ROOT, 'Dataresource', 'MortData')
 _DEFAULT_PAGE_SIZE = 10
 _NHANES_SEARCH_DIRS = ["Laboratory", "Questionnaire", "Examination", "Dietary", "Demographics"]
+_VAR_LABEL_PATH = os.path.join(_BACKEND_ROOT, 'varLabel.json')
+_SEARCH_RESULT_LIMIT = 100
+
+
+def warm_up_search_index():
+    """服务启动时在后台预先构建变量检索索引（不在导入时执行，渲染进程导入路由模块时不会重复构建）"""
+    VariableSearchIndex.warm_up(_VAR_LABEL_PATH)
 
 
 def _get_available_indicators():
@@ -50,6 +63,103 @@ def _get_available_mortality_years():
     return sorted(years)
 
 
+def _parse_pagination_args():
+    """解析并规范化分页参数，返回 (page, limit, export_all)"""
+    page = int(request.args.get('page', 1) or 1)
+    limit = request.args.get('limit', _DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        limit = _DEFAULT_PAGE_SIZE
+    export_all = request.args.get('export_all', 'false').lower() == 'true'
+
+    if page < 1:
+        page = 1
+    if limit <= 0:
+        limit = _DEFAULT_PAGE_SIZE
+    elif limit > 1000:
+        limit = 1000
+    return page, limit, export_all
+
+
+def _paginate(df, page, limit, export_all):
+    """按分页参数截取数据，返回 (page_data, pagination_info)"""
+    if export_all:
+        return df, {
+            'total': len(df),
+            'page': 1,
+            'limit': len(df),
+            'total_pages': 1,
+            'has_next': False,
+            'has_prev': False
+        }
+
+    total_records = len(df)
+    total_pages = max(1, math.ceil(total_records / limit)) if total_records else 1
+    start_idx = (page - 1) * limit
+    end_idx = start_idx + limit
+    return df.iloc[start_idx:end_idx], {
+        'total': total_records,
+        'page': page,
+        'limit': limit,
+        'total_pages': total_pages,
+        'has_next': page < total_pages,
+        'has_prev': page > 1
+    }
+
+
+_RESPONSE_MODES = ('json', 'csv', 'handle', 'feather', 'parquet')
+
+
+def _parse_response_mode(data):
+    """
+    解析提取结果的返回方式
+
+    - json（默认）：CSV文本内嵌在JSON中（兼容旧前端）
+    - csv：直接以流式 text/csv 响应返回，CSV只传输一次且无需JSON转义
+    - handle：JSON只含元信息和下载地址，结果注册为数据集会话，可下载也可直接用于图表/分析
+    - feather / parquet：以列式二进制文件返回，保留列类型（需要pyarrow）
+
+    Returns:
+        str: 返回方式，不支持或当前不可用时返回None
+    """
+    mode = str(data.get('response_mode', 'json') or 'json').strip().lower()
+    if mode in ('feather', 'parquet') and not columnar_available():
+        return None
+    return mode if mode in _RESPONSE_MODES else None
+
+
+def _response_mode_error():
+    """返回方式参数错误的响应"""
+    modes = [mode for mode in _RESPONSE_MODES if mode not in ('feather', 'parquet') or columnar_available()]
+    return jsonify({
+        'success': False,
+        'error': f"response_mode 只支持: {', '.join(modes)}"
+    }), 400
+
+
+def _extraction_file_response(df, response_mode, suggested_filename):
+    """csv/feather/parquet 返回方式：直接返回文件内容"""
+    if response_mode == 'csv':
+        return dataframe_csv_response(df, suggested_filename)
+    return dataframe_columnar_response(df, response_mode, suggested_filename)
+
+
+def _extraction_handle_response(df, suggested_filename, extra=None):
+    """注册提取结果为数据集会话，返回只含元信息的JSON"""
+    dataset_id = DatasetRegistry.register(df, suggested_filename, None, {"source": "extraction"})
+    return jsonify({
+        'success': True,
+        'dataset_id': dataset_id,
+        'dataset_expires_in': DATASET_TTL_SECONDS,
+        'download_url': f"/datasets/{dataset_id}/csv",
+        'suggested_filename': suggested_filename,
+        'total_rows': int(len(df)),
+        'columns': [str(col) for col in df.columns],
+        **(extra or {})
+    })
+
+
 def _normalize_features(indicator_str):
     """去重并统一特征字段格式，全部转为小写并确保seqn位于首位"""
     if not indicator_str:
@@ -124,12 +234,15 @@ def process_nhanes():
 
         data = request.json
         items = data.get('items', [])
+        response_mode = _parse_response_mode(data)
 
         if not items:
             return jsonify({
                 'success': False,
                 'error': '没有提供要处理的数据项'
             }), 400
+        if response_mode is None:
+            return _response_mode_error()
 
         years = [str(item['year']).strip() for item in items if 'year' in item and str(item['year']).strip()]
         if not years:
@@ -177,6 +290,25 @@ def process_nhanes():
             print(f"[调试] 生成预览失败: {preview_error}")
             sys.stdout.flush()
 
+        # 生成建议文件名
+        try:
+            start_year = min(int(str(y).split('-')[0]) for y in years)
+            end_year = max(int(str(y).split('-')[-1]) for y in years)
+            suggested_filename = f"{start_year}-{end_year}_{metricName}.csv"
+        except Exception:
+            suggested_filename = f"{metricName}.csv"
+
+        if response_mode != 'json' and isinstance(result, pd.DataFrame):
+            print(f"成功处理(合并): years={years}, file={metricName}, 返回方式={response_mode}")
+            sys.stdout.flush()
+            if response_mode != 'handle':
+                return _extraction_file_response(result, response_mode, suggested_filename)
+            return _extraction_handle_response(result, suggested_filename, {
+                'years': years,
+                'file': metricName,
+                'indicator': normalized_indicator_str,
+            })
+
         # Convert result to CSV
         if hasattr(result, 'to_csv'):
             csv_data = result.to_csv(index=False)
@@ -191,14 +323,6 @@ def process_nhanes():
         print(f"成功处理(合并): years={years}, file={metricName}")
         sys.stdout.flush()
 
-        # 生成建议文件名
-        try:
-            start_year = min(int(str(y).split('-')[0]) for y in years)
-            end_year = max(int(str(y).split('-')[-1]) for y in years)
-            suggested_filename = f"{start_year}-{end_year}_{metricName}.csv"
-        except Exception:
-            suggested_filename = f"{metricName}.csv"
-
         return jsonify({
             'success': True,
             'results': [{
@@ -243,6 +367,9 @@ def process_nhanes_batch_merge():
 
         data = request.json or {}
         items = data.get('items', [])
+        response_mode = _parse_response_mode(data)
+        if response_mode is None:
+            return _response_mode_error()
         if not items:
             print("[调试][batch] items 为空，返回 400")
             sys.stdout.flush()
@@ -339,7 +466,6 @@ def process_nhanes_batch_merge():
             sys.stdout.flush()
             return jsonify({'success': False, 'error': '无法生成合并数据，请检查输入'}), 400
 
-        csv_data = merged_df.to_csv(index=False)
         try:
             start_year = min(int(y.split('-')[0]) for y in all_years if y)
             end_year = max(int(y.split('-')[-1]) for y in all_years if y)
@@ -347,6 +473,15 @@ def process_nhanes_batch_merge():
         except Exception:
             suggested_filename = "merged.csv"
 
+        if response_mode in ('csv', 'feather', 'parquet'):
+            return _extraction_file_response(merged_df, response_mode, suggested_filename)
+        if response_mode == 'handle':
+            return _extraction_handle_response(merged_df, suggested_filename, {
+                'merged_columns': list(merged_df.columns)
+            })
+
+        csv_data = merged_df.to_csv(index=False)
+
         return jsonify({
             'success': True,
             'csv_data': csv_data,
@@ -375,39 +510,22 @@ def search_variables():
             }), 400
 
         # Path to varLabel.json
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        json_path = os.path.join(os.path.dirname(current_dir), 'varLabel.json')
-        
-        if not os.path.exists(json_path):
+        if not os.path.exists(_VAR_LABEL_PATH):
              return jsonify({
                 'success': False,
-                'error': f'Variable definition file not found at {json_path}'
+                'error': f'Variable definition file not found at {_VAR_LABEL_PATH}'
             }), 500
 
-        # Read the JSON file
+        # 索引只在首次请求或文件变化时构建
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                all_variables = json.load(f)
+            index = VariableSearchIndex.load(_VAR_LABEL_PATH)
         except Exception as e:
             return jsonify({
                 'success': False,
                 'error': f'Failed to read variable definition file: {str(e)}'
             }), 500
 
-        # Filter data
-        results = []
-        count = 0
-        
-        for item in all_variables:
-            if (query in (item.get('variable') or '').lower() or 
-                query in (item.get('label') or '').lower() or 
-                query in (item.get('description') or '').lower()):
-                
-                results.append(item)
-                count += 1
-                
-                if count >= 100:
-                    break
+        results = index.search(query, limit=_SEARCH_RESULT_LIMIT)
         
         return jsonify({
             'success': True,
@@ -425,24 +543,163 @@ def search_variables():
         }), 500
 
 
-@extraction_bp.route('/api/indicators/<indicator_name>', methods=['GET'])
-def get_indicator_data(indicator_name):
-    """获取指定指标的数据列表"""
+@extraction_bp.route('/autocomplete_variables', methods=['GET'])
+def autocomplete_variables():
+    """
+    变量名/文件名前缀补全接口
+
+    查询参数:
+    - q: 输入前缀（必需）
+    - type: variable / file / all（默认 all）
+    - limit: 每种类型最多返回条数（默认10，最大50）
+    """
     try:
-        page = int(request.args.get('page', 1) or 1)
-        limit = request.args.get('limit', _DEFAULT_PAGE_SIZE)
+        prefix = request.args.get('q', '').strip()
+        kind = request.args.get('type', 'all').lower()
         try:
-            limit = int(limit)
+            limit = min(max(int(request.args.get('limit', 10)), 1), 50)
         except (TypeError, ValueError):
-            limit = _DEFAULT_PAGE_SIZE
-        export_all = request.args.get('export_all', 'false').lower() == 'true'
+            limit = 10
+
+        if not prefix:
+            return jsonify({'success': False, 'error': 'Prefix (q) is required'}), 400
+        if kind not in ('variable', 'file', 'all'):
+            return jsonify({'success': False, 'error': f'Unsupported completion type: {kind}'}), 400
+        if not os.path.exists(_VAR_LABEL_PATH):
+            return jsonify({
+                'success': False,
+                'error': f'Variable definition file not found at {_VAR_LABEL_PATH}'
+            }), 500
+
+        try:
+            index = VariableSearchIndex.load(_VAR_LABEL_PATH)
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'Failed to read variable definition file: {str(e)}'
+            }), 500
+
+        results = index.complete(prefix, kind=kind, limit=limit)
+        return jsonify({
+            'success': True,
+            'query': prefix,
+            'results': results,
+            'count': len(results)
+        })
+    except Exception as e:
+        import traceback
+        print(f"Error completing variables: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def _parse_cycle_year(value):
+    """解析周期参数，支持 1999 或 1999-2000 两种写法，返回起始年份"""
+    if value is None or str(value).strip() == '':
+        return None
+    return int(str(value).strip().split('-')[0])
+
+
+@extraction_bp.route('/api/indicators/join', methods=['GET'])
+def join_indicators_with_mortality():
+    """
+    服务端连接指标结果与关联死亡数据
+
+    查询参数:
+    - indicators: 指标名，多个用逗号分隔（必需）
+    - start_year / end_year: 周期范围，如 1999 或 1999-2000（可选）
+    - columns: 投影列，逗号分隔（可选，默认全部）
+    - eligible_only: 是否只保留 eligstat==1 的参与者（默认 true）
+    - how: 与死亡数据的连接方式 inner/left（默认 inner）
+    - format: json（分页）或 csv（完整下载），默认 json
+    """
+    try:
+        names = [name.strip() for name in request.args.get('indicators', '').split(',') if name.strip()]
+        if not names:
+            return jsonify({'success': False, 'error': '未提供指标名(indicators)'}), 400
+        names = list(dict.fromkeys(names))
+
+        try:
+            start_year = _parse_cycle_year(request.args.get('start_year'))
+            end_year = _parse_cycle_year(request.args.get('end_year'))
+        except ValueError:
+            return jsonify({'success': False, 'error': '周期范围格式错误，应为 1999 或 1999-2000'}), 400
 
-        if page < 1:
-            page = 1
-        if limit <= 0:
-            limit = _DEFAULT_PAGE_SIZE
-        elif limit > 1000:
-            limit = 1000
+        columns = [col.strip() for col in request.args.get('columns', '').split(',') if col.strip()] or None
+        eligible_only = request.args.get('eligible_only', 'true').lower() == 'true'
+        how = request.args.get('how', 'inner').lower()
+        output_format = request.args.get('format', 'json').lower()
+        page, limit, export_all = _parse_pagination_args()
+
+        if not os.path.exists(_MORT_DATA_DIR):
+            return jsonify({
+                'success': False,
+                'error': '死亡数据目录不存在，请先上传或生成死亡数据文件'
+            }), 500
+
+        indicator_paths = {}
+        for name in names:
+            file_path = os.path.join(_RESULT_DATA_DIR, f'{name}_results.csv')
+            if not os.path.exists(file_path):
+                return jsonify({
+                    'success': False,
+                    'error': f'指标文件不存在: {name}',
+                    'available_indicators': _get_available_indicators()
+                }), 404
+            indicator_paths[name] = file_path
+
+        def build_response():
+            try:
+                joined = ResultDataService.join_with_mortality(
+                    indicator_paths, _MORT_DATA_DIR,
+                    start_year=start_year, end_year=end_year,
+                    columns=columns, eligible_only=eligible_only, how=how
+                )
+            except ValueError as ve:
+                return jsonify({'success': False, 'error': str(ve)}), 400
+
+            if output_format == 'csv':
+                response = Response(joined.to_csv(index=False), mimetype='text/csv')
+                response.headers['Content-Disposition'] = (
+                    f"attachment; filename={'_'.join(names)}_mortality.csv"
+                )
+                return response
+
+            page_data, pagination_info = _paginate(joined, page, limit, export_all)
+            return jsonify({
+                'success': True,
+                'indicators': names,
+                'columns': [{'field': col, 'title': col, 'width': 'auto'} for col in joined.columns],
+                'records': frame_to_records(page_data),
+                'pagination': pagination_info
+            })
+
+        etag = make_etag(
+            'join',
+            *(file_fingerprint(path) for path in indicator_paths.values()),
+            directory_fingerprint(_MORT_DATA_DIR, '_mort.csv'),
+            start_year, end_year, columns, eligible_only, how, output_format,
+            page, limit, export_all
+        )
+        return conditional_response(etag, build_response)
+    except Exception as e:
+        import traceback
+        print("指标与死亡数据连接失败:")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': f'连接数据失败: {str(e)}'
+        }), 500
+
+
+@extraction_bp.route('/api/indicators/<indicator_name>', methods=['GET'])
+def get_indicator_data(indicator_name):
+    """获取指定指标的数据列表（支持ETag条件请求）"""
+    try:
+        page, limit, export_all = _parse_pagination_args()
 
         if not os.path.exists(_RESULT_DATA_DIR):
             return jsonify({
@@ -458,43 +715,21 @@ def get_indicator_data(indicator_name):
                 'available_indicators': _get_available_indicators()
             }), 404
 
-        df = pd.read_csv(file_path)
-
-        if export_all:
-            page_data = df
-            pagination_info = {
-                'total': len(df),
-                'page': 1,
-                'limit': len(df),
-                'total_pages': 1,
-                'has_next': False,
-                'has_prev': False
-            }
-        else:
-            total_records = len(df)
-            total_pages = max(1, math.ceil(total_records / limit)) if total_records else 1
-            start_idx = (page - 1) * limit
-            end_idx = start_idx + limit
-            page_data = df.iloc[start_idx:end_idx]
-            pagination_info = {
-                'total': total_records,
-                'page': page,
-                'limit': limit,
-                'total_pages': total_pages,
-                'has_next': page < total_pages,
-                'has_prev': page > 1
-            }
-
-        cleaned_page = page_data.replace([np.nan, pd.NaT], None)
-        columns = [{'field': col, 'title': col, 'width': 'auto'} for col in df.columns]
+        def build_response():
+            df = ResultDataService.load_frame(file_path)
+            page_data, pagination_info = _paginate(df, page, limit, export_all)
+            columns = [{'field': col, 'title': col, 'width': 'auto'} for col in df.columns]
 
-        return jsonify({
-            'success': True,
-            'indicator': indicator_name,
-            'columns': columns,
-            'records': cleaned_page.to_dict(orient='records'),
-            'pagination': pagination_info
-        })
+            return jsonify({
+                'success': True,
+                'indicator': indicator_name,
+                'columns': columns,
+                'records': frame_to_records(page_data),
+                'pagination': pagination_info
+            })
+
+        etag = make_etag('indicator', file_fingerprint(file_path), page, limit, export_all)
+        return conditional_response(etag, build_response)
     except Exception as e:
         import traceback
         print("获取指标数据失败:")
@@ -505,16 +740,57 @@ def get_indicator_data(indicator_name):
         }), 500
 
 
+@extraction_bp.route('/api/indicators/<indicator_name>/summary', methods=['GET'])
+def get_indicator_summary(indicator_name):
+    """获取指定指标按周期的预计算摘要统计（计数、缺失、均值、标准差、分位数、直方图）"""
+    try:
+        if not os.path.exists(_RESULT_DATA_DIR):
+            return jsonify({
+                'success': False,
+                'error': '指标结果目录不存在，请先生成结果文件'
+            }), 500
+
+        file_path = os.path.join(_RESULT_DATA_DIR, f'{indicator_name}_results.csv')
+        if not os.path.exists(file_path):
+            return jsonify({
+                'success': False,
+                'error': f'指标文件不存在: {indicator_name}',
+                'available_indicators': _get_available_indicators()
+            }), 404
+
+        def build_response():
+            return jsonify({
+                'success': True,
+                'indicator': indicator_name,
+                **ResultDataService.indicator_summary(file_path)
+            })
+
+        etag = make_etag('indicator_summary', file_fingerprint(file_path))
+        return conditional_response(etag, build_response)
+    except Exception as e:
+        import traceback
+        print("获取指标摘要统计失败:")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': f'读取摘要统计失败: {str(e)}'
+        }), 500
+
+
 @extraction_bp.route('/api/indicators', methods=['GET'])
 def list_available_indicators():
-    """列出所有可用指标"""
+    """列出所有可用指标（支持ETag条件请求）"""
     try:
-        indicators = _get_available_indicators()
-        return jsonify({
-            'success': True,
-            'indicators': indicators,
-            'count': len(indicators)
-        })
+        def build_response():
+            indicators = _get_available_indicators()
+            return jsonify({
+                'success': True,
+                'indicators': indicators,
+                'count': len(indicators)
+            })
+
+        etag = make_etag('indicators', directory_fingerprint(_RESULT_DATA_DIR, '_results.csv'))
+        return conditional_response(etag, build_response)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -524,22 +800,9 @@ def list_available_indicators():
 
 @extraction_bp.route('/api/mortality/<mortality_year>', methods=['GET'])
 def get_mortality_data(mortality_year):
-    """获取死亡数据"""
+    """获取死亡数据（支持ETag条件请求）"""
     try:
-        page = int(request.args.get('page', 1) or 1)
-        limit = request.args.get('limit', _DEFAULT_PAGE_SIZE)
-        try:
-            limit = int(limit)
-        except (TypeError, ValueError):
-            limit = _DEFAULT_PAGE_SIZE
-        export_all = request.args.get('export_all', 'false').lower() == 'true'
-
-        if page < 1:
-            page = 1
-        if limit <= 0:
-            limit = _DEFAULT_PAGE_SIZE
-        elif limit > 1000:
-            limit = 1000
+        page, limit, export_all = _parse_pagination_args()
 
         if not os.path.exists(_MORT_DATA_DIR):
             return jsonify({
@@ -555,47 +818,25 @@ def get_mortality_data(mortality_year):
                 'available_years': _get_available_mortality_years()
             }), 404
 
-        df = pd.read_csv(file_path)
-
-        if export_all:
-            page_data = df
-            pagination_info = {
-                'total': len(df),
-                'page': 1,
-                'limit': len(df),
-                'total_pages': 1,
-                'has_next': False,
-                'has_prev': False
-            }
-        else:
-            total_records = len(df)
-            total_pages = max(1, math.ceil(total_records / limit)) if total_records else 1
-            start_idx = (page - 1) * limit
-            end_idx = start_idx + limit
-            page_data = df.iloc[start_idx:end_idx]
-            pagination_info = {
-                'total': total_records,
-                'page': page,
-                'limit': limit,
-                'total_pages': total_pages,
-                'has_next': page < total_pages,
-                'has_prev': page > 1
-            }
-
-        cleaned_page = page_data.replace([np.nan, pd.NaT], None)
-        columns = [{
-            'field': col,
-            'title': col.upper(),
-            'width': 'auto'
-        } for col in df.columns]
+        def build_response():
+            df = pd.read_csv(file_path)
+            page_data, pagination_info = _paginate(df, page, limit, export_all)
+            columns = [{
+                'field': col,
+                'title': col.upper(),
+                'width': 'auto'
+            } for col in df.columns]
 
-        return jsonify({
-            'success': True,
-            'year': mortality_year,
-            'columns': columns,
-            'records': cleaned_page.to_dict(orient='records'),
-            'pagination': pagination_info
-        })
+            return jsonify({
+                'success': True,
+                'year': mortality_year,
+                'columns': columns,
+                'records': frame_to_records(page_data),
+                'pagination': pagination_info
+            })
+
+        etag = make_etag('mortality', file_fingerprint(file_path), page, limit, export_all)
+        return conditional_response(etag, build_response)
     except Exception as e:
         import traceback
         print("获取死亡数据失败:")
@@ -2,20 +2,191 @@
 数据可视化相关路由
 """
 from flask import Blueprint, request, jsonify
-import os
-import tempfile
-from DataVisualization.histogram import generate_histogram
-from DataVisualization.jointplot import generate_jointplot
-from DataVisualization.scatterplot import generate_scatterplot
-from DataVisualization.boxplot import generate_boxplot
-from DataVisualization.violinplot import generate_violinplot
-from DataVisualization.barplot import generate_barplot
-from DataVisualization.correlation_heatmap import generate_correlation_heatmap
-from DataVisualization.qqplot import generate_qqplot
+import json
+import pandas as pd
+from config import CHART_BATCH_MAX_CHARTS, CHART_BATCH_TIMEOUT
+from services.chart_cache import ChartCache
+from services.chart_data_service import ChartDataService
+from services.chart_renderer import ChartRenderTimeout, ChartRenderer
+from services.dataset_registry import DatasetInputError, resolve_request_source, source_fingerprint
+from utils.data_loader import read_dataframe
 
 visualization_bp = Blueprint('data_visualization', __name__)
 
 
+def _render_input(source):
+    """
+    图表的数据输入：数据集会话直接使用缓存的DataFrame，上传文件在内存中解析为DataFrame
+
+    不再把上传文件写入临时文件后由渲染进程重新读取；渲染进程只接收图表用到的列
+    """
+    if isinstance(source, pd.DataFrame):
+        return source
+    return read_dataframe(source)
+
+
+def _render_chart(chart_type, source, fingerprint, *args, columns=None):
+    """
+    渲染图表，命中图表缓存时直接返回缓存的结果（上传文件也无需解析）
+
+    Args:
+        chart_type: 图表类型
+        source: resolve_request_source 返回的数据来源
+        fingerprint: 数据内容指纹
+        *args: 生成函数除数据外的参数
+        columns: 图表用到的列
+
+    Returns:
+        tuple: (生成函数的结果, 是否命中缓存)
+    """
+    key = ChartCache.make_key(fingerprint, chart_type, args)
+    result = ChartCache.get(key)
+    if result is not None:
+        return result, True
+
+    result = ChartRenderer.render(chart_type, _render_input(source), *args, columns=columns)
+    ChartCache.put(key, result)
+    return result, False
+
+
+def _chart_params(values):
+    """
+    读取图表参数
+
+    Args:
+        values: 请求表单，或批量请求中单个图表的配置字典（columns可为逗号分隔字符串或列表）
+
+    Returns:
+        dict: 规范化的图表参数
+    """
+    columns = values.get('columns') or ''
+    if isinstance(columns, str):
+        columns = columns.split(',')
+    return {
+        'chart_type': values.get('chart_type', 'histogram'),
+        'x_var': values.get('x_var'),
+        'y_var': values.get('y_var'),
+        'color': values.get('color', '#0062FF'),
+        'title': values.get('title', ''),
+        # 相关性热图的额外参数
+        'method': values.get('method', 'pearson'),
+        'columns': [str(col).strip() for col in columns if str(col).strip()] or None,
+        # QQ图的额外参数
+        'distribution': values.get('distribution', 'norm'),
+        # 直方图/小提琴图KDE的带宽规则
+        'bandwidth': values.get('bandwidth', 'scott'),
+        # 直方图/箱线图/小提琴图/散点图的分面列（按该列的每个取值各画一个子图）
+        'facet': values.get('facet') or None,
+        # 条形图的额外参数
+        'show_percentage': str(values.get('show_percentage', 'true')).lower() == 'true',
+    }
+
+
+# 图表类型 -> (必需的参数, 缺少时的错误信息, 错误码)
+_CHART_REQUIRED = {
+    'histogram': (('x_var|columns',), "直方图需要选择至少一个数值变量", "MISSING_VAR"),
+    'jointplot': (('x_var', 'y_var'), "联合分布图需要选择X轴和Y轴变量", "MISSING_VARS"),
+    'scatter': (('x_var', 'y_var'), "散点图需要选择X轴和Y轴变量", "MISSING_VARS"),
+    'boxplot': (('y_var',), "箱线图需要选择一个数值变量", "MISSING_Y_VAR"),
+    'violinplot': (('y_var',), "小提琴图需要选择一个数值变量", "MISSING_Y_VAR"),
+    'barplot': (('x_var',), "条形图需要选择一个分类变量", "MISSING_X_VAR"),
+    'correlation_heatmap': ((), None, None),
+    'qqplot': (('x_var',), "QQ图需要选择一个数值变量", "MISSING_X_VAR"),
+}
+
+
+def _facet_columns(p):
+    return [p['facet']] if p['facet'] else []
+
+
+# 图表类型 -> 参数取值函数，返回 (生成函数除数据外的参数, 图表用到的列)
+_CHART_RENDER_ARGS = {
+    'histogram': lambda p: (
+        (p['columns'] or p['x_var'], p['color'], p['title'] or None, p['bandwidth'], p['facet']),
+        (p['columns'] or [p['x_var']]) + _facet_columns(p)
+    ),
+    'jointplot': lambda p: ((p['x_var'], p['y_var'], p['color'], p['title'] or None), [p['x_var'], p['y_var']]),
+    'scatter': lambda p: (
+        (p['x_var'], p['y_var'], p['color'], p['title'] or None, p['facet']),
+        [p['x_var'], p['y_var']] + _facet_columns(p)
+    ),
+    'boxplot': lambda p: (
+        (p['y_var'], p['x_var'] or None, p['color'], p['title'] or None, p['facet']),
+        ([p['y_var'], p['x_var']] if p['x_var'] else [p['y_var']]) + _facet_columns(p)
+    ),
+    'violinplot': lambda p: (
+        (p['y_var'], p['x_var'] or None, p['color'], p['title'] or None, p['bandwidth'], p['facet']),
+        ([p['y_var'], p['x_var']] if p['x_var'] else [p['y_var']]) + _facet_columns(p)
+    ),
+    'barplot': lambda p: ((p['x_var'], p['color'], p['title'] or None, p['show_percentage']), [p['x_var']]),
+    'correlation_heatmap': lambda p: ((p['columns'], p['method'], p['title'] or None), p['columns']),
+    'qqplot': lambda p: ((p['x_var'], p['distribution'], p['color'], p['title'] or None), [p['x_var']]),
+}
+
+
+def _chart_param_error(params, supported):
+    """
+    检查图表类型和必需参数
+
+    Returns:
+        dict 或 None: 参数有误时返回错误响应体
+    """
+    chart_type = params['chart_type']
+    if chart_type not in supported:
+        return {
+            "success": False,
+            "error": f"不支持的图表类型: {chart_type}",
+            "error_code": "UNSUPPORTED_CHART_TYPE",
+            "supported_types": list(supported)
+        }
+    required, message, error_code = _CHART_REQUIRED[chart_type]
+    if any(not any(params[name] for name in names.split('|')) for names in required):
+        return {
+            "success": False,
+            "error": message,
+            "error_code": error_code
+        }
+    return None
+
+
+def _chart_error(error):
+    """
+    图表生成异常 -> (错误响应体, HTTP状态码)
+    """
+    if isinstance(error, ChartRenderTimeout):
+        return {"success": False, "error": str(error), "error_code": "RENDER_TIMEOUT"}, 504
+    if isinstance(error, ValueError):
+        return {"success": False, "error": str(error), "error_code": "VALIDATION_ERROR"}, 400
+    if isinstance(error, FileNotFoundError):
+        return {"success": False, "error": str(error), "error_code": "FILE_NOT_FOUND"}, 404
+    import traceback
+    print("可视化生成错误:")
+    traceback.print_exception(type(error), error, error.__traceback__)
+    return {"success": False, "error": f"图表生成失败: {str(error)}", "error_code": "GENERATION_ERROR"}, 500
+
+
+def _chart_response(params, result, cached, filename):
+    """图表生成成功时的统一返回格式"""
+    chart_type = params['chart_type']
+    return {
+        "success": True,
+        "chart_type": chart_type,
+        "plot": f"data:image/png;base64,{result['plot']}",
+        "filename": filename,
+        "variables_used": {
+            "x_var": params['x_var'],
+            "y_var": params['y_var']
+        },
+        "chart_config": {
+            "color": params['color'],
+            "title": params['title']
+        },
+        "chart_info": result,
+        "chart_cached": cached,
+        "message": f"成功生成{chart_type}图表"
+    }
+
+
 @visualization_bp.route('/generate_visualization', methods=['POST'])
 def generate_visualization():
     """
@@ -28,179 +199,272 @@ def generate_visualization():
     - barplot: 条形图
     - correlation_heatmap: 相关性矩阵热图
     - qqplot: QQ图
+
+    数据来源：上传的file，或 /get_csvfile 返回的dataset_id（复用已解析的数据，无需重新上传）
     """
-    if 'file' not in request.files:
+    try:
+        source, filename = resolve_request_source(request)
+    except DatasetInputError as de:
         return jsonify({
             "success": False,
-            "error": "没有上传文件",
-            "error_code": "NO_FILE"
-        }), 400
+            "error": str(de),
+            "error_code": de.error_code
+        }), de.status
+
+    # 获取图表配置参数
+    params = _chart_params(request.form)
+    param_error = _chart_param_error(params, _CHART_RENDER_ARGS)
+    if param_error:
+        return jsonify(param_error), 400
+
+    try:
+        # 相同数据内容 + 相同参数的图表直接从缓存返回
+        fingerprint = source_fingerprint(request, source)
+        chart_type = params['chart_type']
+        args, columns = _CHART_RENDER_ARGS[chart_type](params)
+        result, cached = _render_chart(chart_type, source, fingerprint, *args, columns=columns)
+        return jsonify(_chart_response(params, result, cached, filename))
+
+    except Exception as e:
+        body, status = _chart_error(e)
+        return jsonify(body), status
 
-    file = request.files['file']
-    if file.filename == '':
+
+@visualization_bp.route('/batch_visualization', methods=['POST'])
+def batch_visualization():
+    """
+    批量图表接口：一次请求生成多个图表（如探索性分析面板）
+
+    - charts: JSON数组，每项为一个图表的配置，字段与 /generate_visualization 的表单参数相同
+    - 上传文件只解析一次，全部图表共用同一个DataFrame，各图表只取用到的列
+    - 参数完全相同的图表只渲染一次；未命中缓存的图表一起提交到渲染进程池并行渲染
+    - 单个图表失败不影响其他图表，results 中对应项为该图表的错误信息
+
+    数据来源：上传的file，或 /get_csvfile 返回的dataset_id
+    """
+    try:
+        source, filename = resolve_request_source(request)
+    except DatasetInputError as de:
         return jsonify({
             "success": False,
-            "error": "没有选择文件",
-            "error_code": "NO_FILENAME"
+            "error": str(de),
+            "error_code": de.error_code
+        }), de.status
+
+    try:
+        specs = json.loads(request.form.get('charts') or '[]')
+    except ValueError:
+        specs = None
+    if not isinstance(specs, list) or not specs or not all(isinstance(spec, dict) for spec in specs):
+        return jsonify({
+            "success": False,
+            "error": "charts 需要是非空的图表配置JSON数组",
+            "error_code": "INVALID_CHARTS"
+        }), 400
+    if len(specs) > CHART_BATCH_MAX_CHARTS:
+        return jsonify({
+            "success": False,
+            "error": f"单次最多生成 {CHART_BATCH_MAX_CHARTS} 个图表",
+            "error_code": "TOO_MANY_CHARTS"
         }), 400
 
-    # 获取图表配置参数
-    chart_type = request.form.get('chart_type', 'histogram')
-    x_var = request.form.get('x_var')
-    y_var = request.form.get('y_var')
-    color = request.form.get('color', '#0062FF')
-    title = request.form.get('title', '')
-    
-    # 相关性热图的额外参数
-    method = request.form.get('method', 'pearson')
-    columns_str = request.form.get('columns', '')
-    
-    # QQ图的额外参数
-    distribution = request.form.get('distribution', 'norm')
-    
-    # 条形图的额外参数
-    show_percentage = request.form.get('show_percentage', 'true').lower() == 'true'
+    try:
+        fingerprint = source_fingerprint(request, source)
+        results = [None] * len(specs)
+        # 缓存键 -> (图表类型, 生成函数参数, 用到的列)，以及使用该结果的图表 [(序号, 参数), ...]
+        pending = {}
+        waiting = {}
+        for index, spec in enumerate(specs):
+            params = _chart_params(spec)
+            param_error = _chart_param_error(params, _CHART_RENDER_ARGS)
+            if param_error:
+                results[index] = param_error
+                continue
+            chart_type = params['chart_type']
+            args, columns = _CHART_RENDER_ARGS[chart_type](params)
+            key = ChartCache.make_key(fingerprint, chart_type, args)
+            result = ChartCache.get(key)
+            if result is not None:
+                results[index] = _chart_response(params, result, True, filename)
+                continue
+            pending.setdefault(key, (chart_type, args, columns))
+            waiting.setdefault(key, []).append((index, params))
+
+        if pending:
+            # 上传文件解析一次，渲染进程直接接收各图表用到的列
+            df = _render_input(source)
+            tasks = [(chart_type, df, args, columns) for chart_type, args, columns in pending.values()]
+            rendered = ChartRenderer.render_many(tasks, timeout=CHART_BATCH_TIMEOUT)
+            for key, result in zip(pending, rendered):
+                if isinstance(result, Exception):
+                    body, _ = _chart_error(result)
+                    for index, params in waiting[key]:
+                        results[index] = {**body, "chart_type": params['chart_type']}
+                    continue
+                ChartCache.put(key, result)
+                for index, params in waiting[key]:
+                    results[index] = _chart_response(params, result, False, filename)
+
+        succeeded = sum(1 for result in results if result['success'])
+        return jsonify({
+            "success": True,
+            "filename": filename,
+            "results": [{"index": index, **result} for index, result in enumerate(results)],
+            "summary": {
+                "total": len(results),
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded,
+                "rendered": len(pending)
+            }
+        })
 
+    except Exception as e:
+        body, status = _chart_error(e)
+        return jsonify(body), status
+
+
+# 图表数据接口：图表类型 -> (计算函数, 参数取值函数)
+_CHART_DATA_HANDLERS = {
+    'histogram': (ChartDataService.histogram, lambda p: (p['columns'] or [p['x_var']], p['bandwidth'], p['facet'])),
+    'jointplot': (ChartDataService.jointplot, lambda p: (p['x_var'], p['y_var'], p['bandwidth'])),
+    'scatter': (ChartDataService.scatter, lambda p: (p['x_var'], p['y_var'], p['facet'])),
+    'boxplot': (ChartDataService.boxplot, lambda p: (p['y_var'], p['x_var'] or None, p['facet'])),
+    'violinplot': (
+        ChartDataService.violinplot, lambda p: (p['y_var'], p['x_var'] or None, p['bandwidth'], p['facet'])
+    ),
+    'barplot': (ChartDataService.barplot, lambda p: (p['x_var'],)),
+    'correlation_heatmap': (ChartDataService.correlation, lambda p: (p['columns'], p['method'])),
+    'qqplot': (ChartDataService.qqplot, lambda p: (p['x_var'], p['distribution'])),
+}
+
+
+def _compute_chart_data(chart_type, source, args):
+    """
+    计算图表聚合数据（相同数据内容 + 相同参数时从缓存返回）
+
+    Returns:
+        tuple: (聚合数据, 是否命中缓存)
+    """
+    compute, _ = _CHART_DATA_HANDLERS[chart_type]
+    key = ChartCache.make_key(source_fingerprint(request, source), f"data:{chart_type}", args)
+    data = ChartCache.get(key)
+    if data is not None:
+        return data, True
+    data = compute(_render_input(source), *args)
+    ChartCache.put(key, data)
+    return data, False
+
+
+@visualization_bp.route('/chart_data', methods=['POST'])
+def chart_data():
+    """
+    图表数据接口：返回图表的聚合数据（JSON）而不是PNG，由前端绘制
+
+    图表类型和参数与 /generate_visualization 相同（color、title等绘图参数不需要）：
+    - histogram: 每列的分箱频数与KDE曲线
+    - boxplot: 每组的五数概括、须线与异常值
+    - violinplot: 每组的密度曲线与四分位数
+    - qqplot: 理论/样本分位数对与参考线
+    - correlation_heatmap: 相关性矩阵
+    - barplot: 各类别频数与百分比
+    - scatter / jointplot: 数据点或二维频数网格（大数据量时），jointplot另含边缘KDE曲线
+
+    histogram / violinplot / jointplot 的KDE带宽规则由 bandwidth 参数指定（scott / silverman，默认scott）
+    histogram / boxplot / violinplot / scatter 可用 facet 参数指定分面列，
+    返回 {facet_column, panels: [{facet: 取值, ...该分面的图表数据}]}，各分面共用箱边界
+
+    数据来源：上传的file，或 /get_csvfile 返回的dataset_id
+    """
     try:
-        # 保存文件到临时位置
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp_file:
-            file.save(tmp_file.name)
-            temp_path = tmp_file.name
-        
-        result = None
-        
-        # 根据图表类型调用相应的生成函数
-        if chart_type == 'histogram':
-            columns_list = None
-            if columns_str:
-                columns_list = [col.strip() for col in columns_str.split(',') if col.strip()]
-            
-            target_var = columns_list if columns_list else x_var
-            
-            if not target_var:
-                return jsonify({
-                    "success": False,
-                    "error": "直方图需要选择至少一个数值变量",
-                    "error_code": "MISSING_VAR"
-                }), 400
-            result = generate_histogram(temp_path, target_var, color, title or None)
-            
-        elif chart_type == 'jointplot':
-            if not x_var or not y_var:
-                return jsonify({
-                    "success": False,
-                    "error": "联合分布图需要选择X轴和Y轴变量",
-                    "error_code": "MISSING_VARS"
-                }), 400
-            result = generate_jointplot(temp_path, x_var, y_var, color, title or None)
-            
-        elif chart_type == 'scatter':
-            if not x_var or not y_var:
-                return jsonify({
-                    "success": False,
-                    "error": "散点图需要选择X轴和Y轴变量",
-                    "error_code": "MISSING_VARS"
-                }), 400
-            result = generate_scatterplot(temp_path, x_var, y_var, color, title or None)
-            
-        elif chart_type == 'boxplot':
-            if not y_var:
-                return jsonify({
-                    "success": False,
-                    "error": "箱线图需要选择一个数值变量",
-                    "error_code": "MISSING_Y_VAR"
-                }), 400
-            result = generate_boxplot(temp_path, y_var, x_var or None, color, title or None)
-            
-        elif chart_type == 'violinplot':
-            if not y_var:
-                return jsonify({
-                    "success": False,
-                    "error": "小提琴图需要选择一个数值变量",
-                    "error_code": "MISSING_Y_VAR"
-                }), 400
-            result = generate_violinplot(temp_path, y_var, x_var or None, color, title or None)
-            
-        elif chart_type == 'barplot':
-            if not x_var:
-                return jsonify({
-                    "success": False,
-                    "error": "条形图需要选择一个分类变量",
-                    "error_code": "MISSING_X_VAR"
-                }), 400
-            result = generate_barplot(temp_path, x_var, color, title or None, show_percentage)
-            
-        elif chart_type == 'correlation_heatmap':
-            columns_list = None
-            if columns_str:
-                columns_list = [col.strip() for col in columns_str.split(',') if col.strip()]
-            result = generate_correlation_heatmap(temp_path, columns_list, method, title or None)
-            
-        elif chart_type == 'qqplot':
-            if not x_var:
-                return jsonify({
-                    "success": False,
-                    "error": "QQ图需要选择一个数值变量",
-                    "error_code": "MISSING_X_VAR"
-                }), 400
-            result = generate_qqplot(temp_path, x_var, distribution, color, title or None)
-            
-        else:
-            return jsonify({
-                "success": False,
-                "error": f"不支持的图表类型: {chart_type}",
-                "error_code": "UNSUPPORTED_CHART_TYPE",
-                "supported_types": [
-                    "histogram", "jointplot", "scatter", "boxplot", 
-                    "violinplot", "barplot", "correlation_heatmap", "qqplot"
-                ]
-            }), 400
+        source, filename = resolve_request_source(request)
+    except DatasetInputError as de:
+        return jsonify({
+            "success": False,
+            "error": str(de),
+            "error_code": de.error_code
+        }), de.status
 
-        # 清理临时文件
-        try:
-            os.unlink(temp_path)
-        except:
-            pass
+    params = _chart_params(request.form)
+    param_error = _chart_param_error(params, _CHART_DATA_HANDLERS)
+    if param_error:
+        return jsonify(param_error), 400
+    chart_type = params['chart_type']
 
-        # 统一返回格式
-        response_data = {
+    try:
+        _, get_args = _CHART_DATA_HANDLERS[chart_type]
+        data, cached = _compute_chart_data(chart_type, source, get_args(params))
+        return jsonify({
             "success": True,
             "chart_type": chart_type,
-            "plot": f"data:image/png;base64,{result['plot']}",
-            "filename": file.filename,
-            "variables_used": {
-                "x_var": x_var,
-                "y_var": y_var
-            },
-            "chart_config": {
-                "color": color,
-                "title": title
-            },
-            "chart_info": result,
-            "message": f"成功生成{chart_type}图表"
-        }
-        
-        return jsonify(response_data)
-        
+            "filename": filename,
+            "data": data,
+            "chart_cached": cached
+        })
+
     except ValueError as ve:
         return jsonify({
             "success": False,
             "error": str(ve),
             "error_code": "VALIDATION_ERROR"
         }), 400
-    except FileNotFoundError as fe:
+    except Exception as e:
+        import traceback
+        print("图表数据计算错误:")
+        traceback.print_exc()
+        return jsonify({
+            "success": False,
+            "error": f"图表数据计算失败: {str(e)}",
+            "error_code": "GENERATION_ERROR"
+        }), 500
+
+
+@visualization_bp.route('/correlation_matrix', methods=['POST'])
+def correlation_matrix_data():
+    """
+    相关系数矩阵接口：只返回矩阵数据（JSON），不绘制热图
+
+    参数：
+    - columns: 逗号分隔的列名，默认使用全部数值列
+    - method: pearson / spearman / kendall（默认pearson）
+
+    缺失值按成对完整观测处理，counts 为每个列对实际使用的观测数。
+    数据来源：上传的file，或 /get_csvfile 返回的dataset_id
+    """
+    try:
+        source, filename = resolve_request_source(request)
+    except DatasetInputError as de:
         return jsonify({
             "success": False,
-            "error": str(fe),
-            "error_code": "FILE_NOT_FOUND"
-        }), 404
+            "error": str(de),
+            "error_code": de.error_code
+        }), de.status
+
+    columns_str = request.form.get('columns', '')
+    columns = [col.strip() for col in columns_str.split(',') if col.strip()] or None
+    method = request.form.get('method', 'pearson')
+
+    try:
+        data, cached = _compute_chart_data('correlation_heatmap', source, (columns, method))
+        return jsonify({
+            "success": True,
+            "filename": filename,
+            **data,
+            "cached": cached
+        })
+
+    except ValueError as ve:
+        return jsonify({
+            "success": False,
+            "error": str(ve),
+            "error_code": "VALIDATION_ERROR"
+        }), 400
     except Exception as e:
         import traceback
-        print("可视化生成错误:")
+        print("相关系数矩阵计算错误:")
         traceback.print_exc()
         return jsonify({
             "success": False,
-            "error": f"图表生成失败: {str(e)}",
+            "error": f"相关系数矩阵计算失败: {str(e)}",
             "error_code": "GENERATION_ERROR"
         }), 500
 
@@ -209,28 +473,21 @@ def generate_visualization():
 @visualization_bp.route('/draw_boxplot', methods=['POST'])
 def draw_boxplot():
     """生成箱型图（向后兼容）"""
-    import pandas as pd
-    import matplotlib.pyplot as plt
     import seaborn as sns
     import io
     import base64
     from matplotlib import rcParams
+    from matplotlib.figure import Figure
     from utils.serialization import convert_to_serializable
     
-    if 'file' not in request.files:
-        return jsonify({
-            "success": False,
-            "error": "没有上传文件",
-            "error_code": "NO_FILE"
-        }), 400
-
-    file = request.files['file']
-    if file.filename == '':
+    try:
+        source, _ = resolve_request_source(request)
+    except DatasetInputError as de:
         return jsonify({
             "success": False,
-            "error": "没有选择文件",
-            "error_code": "NO_FILENAME"
-        }), 400
+            "error": str(de),
+            "error_code": de.error_code
+        }), de.status
 
     column = request.form.get('column')
     group_by = request.form.get('group_by')
@@ -246,7 +503,7 @@ def draw_boxplot():
         rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
         rcParams['axes.unicode_minus'] = False
         
-        df = pd.read_csv(file)
+        df = read_dataframe(source)
         
         if column not in df.columns:
             return jsonify({
@@ -262,24 +519,24 @@ def draw_boxplot():
                 "error_code": "NON_NUMERIC_COLUMN"
             }), 400
         
-        plt.figure(figsize=(10, 6))
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
         
         if group_by and group_by in df.columns:
-            sns.boxplot(data=df, x=group_by, y=column)
-            plt.title(f'{column} 按 {group_by} 分组的箱型图')
-            plt.xticks(rotation=45)
+            sns.boxplot(data=df, x=group_by, y=column, ax=ax)
+            ax.set_title(f'{column} 按 {group_by} 分组的箱型图')
+            ax.tick_params(axis='x', labelrotation=45)
         else:
-            sns.boxplot(y=df[column])
-            plt.title(f'{column} 的箱型图')
+            sns.boxplot(y=df[column], ax=ax)
+            ax.set_title(f'{column} 的箱型图')
         
-        plt.ylabel(column)
-        plt.tight_layout()
+        ax.set_ylabel(column)
+        fig.tight_layout()
         
         img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
+        fig.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
         img_buffer.seek(0)
         img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
-        plt.close()
         
         stats = {
             "count": convert_to_serializable(df[column].count()),
@@ -315,25 +572,26 @@ def draw_boxplot():
 @visualization_bp.route('/draw_histogram', methods=['POST'])
 def draw_histogram():
     """生成直方图（向后兼容）"""
-    if 'file' not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
-
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({"error": "No file selected"}), 400
+    try:
+        source, _ = resolve_request_source(request)
+    except DatasetInputError as de:
+        return jsonify({"error": str(de)}), de.status
 
     column = request.form.get('column')
     if not column:
         return jsonify({"error": "No column selected"}), 400
 
     try:
-        result = generate_histogram(file, column)
+        fingerprint = source_fingerprint(request, source)
+        result, _ = _render_chart('histogram', source, fingerprint, column, columns=[column])
         response_data = {
             "success": True,
             "plot": f"data:image/png;base64,{result['plot']}",
             "column_used": str(result['column_used'])
         }
         return jsonify(response_data)
+    except ChartRenderTimeout as e:
+        return jsonify({"error": str(e)}), 504
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -345,12 +603,10 @@ def draw_heatmap():
     """生成热图（向后兼容）"""
     from DataVisualization.heatmap import generate_heatmap
     
-    if 'file' not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
-
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({"error": "No file selected"}), 400
+    try:
+        source, _ = resolve_request_source(request)
+    except DatasetInputError as de:
+        return jsonify({"error": str(de)}), de.status
 
     x_var = request.form.get('x_var')
     if not x_var:
@@ -361,7 +617,7 @@ def draw_heatmap():
 
     try:
         color = request.form.get('color', '#3b82f6')
-        result = generate_heatmap(file, x_var, y_var, color)
+        result = generate_heatmap(source, x_var, y_var, color)
         response_data = {
             "success": True,
             "plot": f"data:image/png;base64,{result['plot']}",
@@ -378,12 +634,10 @@ def draw_heatmap():
 @visualization_bp.route('/draw_scatterplot', methods=['POST'])
 def draw_scatterplot():
     """生成散点图（向后兼容）"""
-    if 'file' not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
-
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({"error": "No file selected"}), 400
+    try:
+        source, _ = resolve_request_source(request)
+    except DatasetInputError as de:
+        return jsonify({"error": str(de)}), de.status
 
     x_var = request.form.get('x_var')
     if not x_var:
@@ -393,7 +647,8 @@ def draw_scatterplot():
         return jsonify({"error": "No y column selected"}), 400
 
     try:
-        result = generate_scatterplot(file, x_var, y_var)
+        fingerprint = source_fingerprint(request, source)
+        result, _ = _render_chart('scatter', source, fingerprint, x_var, y_var, columns=[x_var, y_var])
         response_data = {
             "success": True,
             "plot": f"data:image/png;base64,{result['plot']}",
@@ -401,6 +656,8 @@ def draw_scatterplot():
             "y_var": str(result['y_column'])
         }
         return jsonify(response_data)
+    except ChartRenderTimeout as e:
+        return jsonify({"error": str(e)}), 504
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -3,9 +3,17 @@
 """
 from flask import Blueprint, request, jsonify
 import os
-from utils.file_utils import allowed_file, download_file
+import pandas as pd
+from utils.file_utils import (
+    allowed_file, supported_formats, download_file, dataframe_csv_response, dataframe_columnar_response
+)
+from utils.columnar import columnar_format, columnar_available, read_columnar
 from services.csv_service import CSVService
-from config import MAX_FILE_SIZE
+from services.type_inference import SampledTypeInference
+from services.dataset_registry import DatasetRegistry, DatasetInputError, resolve_request_source
+from services.profile_cache import ProfileCache
+from utils.uploads import retain_upload
+from config import MAX_FILE_SIZE, DATASET_TTL_SECONDS, STREAMING_PROFILE_THRESHOLD
 
 file_bp = Blueprint('file_operations', __name__)
 
@@ -25,6 +33,9 @@ def get_csvfile():
     """
     CSV文件上传和解析接口
     支持文件上传、格式验证、大小检查、数据解析和统计分析
+
+    也接受Feather/Arrow/Parquet列式文件（需要pyarrow）：列类型随文件保留，无需文本解析；
+    文件元数据中带有列类型划分时跳过类型检测
     """
     if 'file' not in request.files:
         return jsonify({
@@ -45,9 +56,9 @@ def get_csvfile():
     if not allowed_file(file.filename):
         return jsonify({
             "success": False,
-            "error": "只支持CSV文件格式",
+            "error": f"只支持以下文件格式: {', '.join(supported_formats())}",
             "error_code": "INVALID_FORMAT",
-            "allowed_formats": ["csv"]
+            "allowed_formats": supported_formats()
         }), 400
 
     # Check file size
@@ -57,20 +68,72 @@ def get_csvfile():
     if file_length > MAX_FILE_SIZE:
         return jsonify({
             "success": False,
-            "error": f"文件大小超过限制，最大支持{MAX_FILE_SIZE / (1024 * 1024):.0f}MB",
+            "error": f"文件大小超过限制，最大支持{MAX_FILE_SIZE / (1024 * 1024 * 1024):.0f}GB",
             "error_code": "FILE_TOO_LARGE",
             "file_size": file_length,
             "max_size": MAX_FILE_SIZE
         }), 400
 
+    # profile_mode: auto（默认，按文件大小选择）/ approximate（草图近似画像）
+    approximate = request.form.get('profile_mode', 'auto') == 'approximate'
+
     try:
-        result = CSVService.parse_csv_file(file, file_length)
-        
+        # 同一文件反复上传时，按内容哈希直接返回磁盘缓存的画像（哈希在接收上传时已算好）
+        content_hash = ProfileCache.hash_upload(file)
+        fmt = columnar_format(file.filename)
+        streaming = fmt is None and (approximate or file_length > STREAMING_PROFILE_THRESHOLD)
+        cache_mode = 'approximate' if approximate else ('streaming' if streaming else 'full')
+        result = ProfileCache.get(content_hash, cache_mode)
+        cached = result is not None
+
+        if streaming:
+            # 大文件按块流式画像，不整体加载，因此不注册数据集会话
+            if not cached:
+                result = CSVService.parse_csv_file(file, file_length, approximate=approximate)
+            session = {}
+        else:
+            # 内容相同的数据集仍在内存中时直接共享
+            df = DatasetRegistry.find_frame(content_hash)
+            upload = retain_upload(file) if cached and df is None else None
+            if upload is None:
+                column_roles = None
+                if df is None and fmt:
+                    df, column_roles = read_columnar(file, fmt)
+                elif df is None:
+                    df = CSVService.read_csv_file(file)
+                if not cached:
+                    result = CSVService.profile_dataframe(df, file_length, column_roles=column_roles)
+
+            # 注册为数据集会话，后续图表/分析接口传dataset_id即可复用，无需重新上传
+            metadata = {
+                "numeric_columns": result["numeric_columns"],
+                "categorical_columns": result["categorical_columns"],
+                "datetime_columns": result["datetime_columns"],
+            }
+            if upload is not None:
+                # 画像已缓存：直接返回画像，保留上传文件，首次通过dataset_id使用时才解析
+                loader = ((lambda: read_columnar(upload, fmt)[0]) if fmt
+                          else (lambda: CSVService.read_csv_file(upload)))
+                dataset_id = DatasetRegistry.register_lazy(
+                    upload, loader, file.filename, file_length, metadata, content_hash=content_hash
+                )
+            else:
+                dataset_id = DatasetRegistry.register(
+                    df, file.filename, file_length, metadata, content_hash=content_hash
+                )
+            session = {"dataset_id": dataset_id, "dataset_expires_in": DATASET_TTL_SECONDS}
+
+        if not cached:
+            ProfileCache.put(content_hash, cache_mode, result)
+
         return jsonify({
             "success": True,
             "filename": file.filename,
+            "content_hash": content_hash,
+            "profile_cached": cached,
+            **session,
             **result,
-            "message": f"成功解析CSV文件，包含{result['total_rows']}行数据，{result['total_columns']}列"
+            "message": f"成功解析{fmt.capitalize() if fmt else 'CSV'}文件，包含{result['total_rows']}行数据，{result['total_columns']}列"
         })
         
     except ValueError as ve:
@@ -149,24 +212,33 @@ def get_csv_info():
 
 @file_bp.route('/get_file_columns', methods=['POST'])
 def get_file_columns():
-    """获取已上传CSV文件的列信息，用于前端变量选择下拉框"""
-    if 'file' not in request.files:
-        return jsonify({
-            "success": False,
-            "error": "没有上传文件",
-            "error_code": "NO_FILE"
-        }), 400
+    """
+    获取已上传CSV文件（或dataset_id对应数据集）的列信息，用于前端变量选择下拉框
 
-    file = request.files['file']
-    if file.filename == '':
+    上传文件默认按抽样行快速推断列类型（mode=sample），并在后台完整校验，
+    校验后的结果通过 GET /get_file_columns/<profile_token> 获取；mode=full 时读取完整文件。
+    """
+    try:
+        source, _ = resolve_request_source(request)
+    except DatasetInputError as de:
         return jsonify({
             "success": False,
-            "error": "没有选择文件",
-            "error_code": "NO_FILENAME"
-        }), 400
+            "error": str(de),
+            "error_code": de.error_code
+        }), de.status
 
     try:
-        result = CSVService.get_file_columns(file)
+        fmt = None if isinstance(source, pd.DataFrame) else columnar_format(source.filename)
+        if isinstance(source, pd.DataFrame):
+            result = CSVService.get_dataframe_columns(source)
+        elif fmt:
+            # 列式文件读取无需解析，直接使用完整数据和文件中保存的列类型划分
+            df, column_roles = read_columnar(source, fmt)
+            result = CSVService.get_dataframe_columns(df, column_roles=column_roles)
+        elif request.form.get('mode', 'sample') == 'full':
+            result = CSVService.get_file_columns(source)
+        else:
+            result = SampledTypeInference.infer_columns(source)
         return jsonify({
             "success": True,
             **result
@@ -178,3 +250,86 @@ def get_file_columns():
             "error": f"获取列信息失败：{str(e)}",
             "error_code": "COLUMN_INFO_ERROR"
         }), 500
+
+
+@file_bp.route('/get_file_columns/<profile_token>', methods=['GET'])
+def get_file_columns_profile(profile_token):
+    """获取抽样推断的列信息；后台完整校验完成后返回校验后的结果"""
+    result = SampledTypeInference.get_profile(profile_token)
+    if result is None:
+        return jsonify({
+            "success": False,
+            "error": "列信息不存在或已过期",
+            "error_code": "PROFILE_NOT_FOUND"
+        }), 404
+    return jsonify({
+        "success": True,
+        **result
+    })
+
+
+@file_bp.route('/datasets/<dataset_id>', methods=['GET'])
+def get_dataset(dataset_id):
+    """获取数据集会话的元信息，同时刷新其过期时间"""
+    info = DatasetRegistry.describe(dataset_id)
+    if info is None:
+        return jsonify({
+            "success": False,
+            "error": "数据集不存在或已过期，请重新上传文件",
+            "error_code": "DATASET_NOT_FOUND"
+        }), 404
+    return jsonify({
+        "success": True,
+        **info
+    })
+
+
+@file_bp.route('/datasets/<dataset_id>/csv', methods=['GET'])
+def download_dataset_csv(dataset_id):
+    """以流式CSV下载数据集（如 response_mode=handle 的提取结果）"""
+    df, filename = DatasetRegistry.get(dataset_id)
+    if df is None:
+        return jsonify({
+            "success": False,
+            "error": "数据集不存在或已过期，请重新提取或上传",
+            "error_code": "DATASET_NOT_FOUND"
+        }), 404
+    return dataframe_csv_response(df, filename or f"{dataset_id}.csv")
+
+
+@file_bp.route('/datasets/<dataset_id>/<any(feather, parquet):fmt>', methods=['GET'])
+def download_dataset_columnar(dataset_id, fmt):
+    """以Feather/Parquet格式下载数据集，保留列类型和列类型划分"""
+    if not columnar_available():
+        return jsonify({
+            "success": False,
+            "error": "服务器未安装pyarrow，暂不支持Feather/Parquet格式",
+            "error_code": "FORMAT_UNAVAILABLE"
+        }), 400
+    info = DatasetRegistry.describe(dataset_id)
+    df, filename = DatasetRegistry.get(dataset_id)
+    if df is None or info is None:
+        return jsonify({
+            "success": False,
+            "error": "数据集不存在或已过期，请重新提取或上传",
+            "error_code": "DATASET_NOT_FOUND"
+        }), 404
+    column_roles = info if all(key in info for key in ("numeric_columns", "categorical_columns",
+                                                       "datetime_columns")) else None
+    return dataframe_columnar_response(df, fmt, filename or f"{dataset_id}.{fmt}", column_roles)
+
+
+@file_bp.route('/datasets/<dataset_id>', methods=['DELETE'])
+def delete_dataset(dataset_id):
+    """释放数据集会话"""
+    if not DatasetRegistry.remove(dataset_id):
+        return jsonify({
+            "success": False,
+            "error": "数据集不存在或已过期",
+            "error_code": "DATASET_NOT_FOUND"
+        }), 404
+    return jsonify({
+        "success": True,
+        "dataset_id": dataset_id,
+        "message": "数据集已释放"
+    })
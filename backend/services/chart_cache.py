@@ -0,0 +1,145 @@
+"""
+图表缓存服务
+按 数据内容指纹 + 图表类型 + 规范化的图表参数 缓存渲染结果，重复请求同一图表（如切换标签页）时无需重新渲染
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from config import CHART_CACHE_DIR, CHART_CACHE_DISK_MAX_ENTRIES, CHART_CACHE_MAX_ENTRIES
+from utils.serialization import dumps_bytes
+
+
+def _normalize(value):
+    """规范化参数：字符串去除首尾空白，颜色等十六进制值统一小写，空字符串视为未设置"""
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith('#'):
+            value = value.lower()
+        return value or None
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+class ChartCache:
+    """
+    两级图表缓存
+
+    - 内存：按最近使用顺序保留 CHART_CACHE_MAX_ENTRIES 个结果
+    - 磁盘：每个结果保存为一个JSON文件，进程重启后仍可命中，按修改时间淘汰
+    - 生成函数的绘图逻辑变化时递增 VERSION，使旧结果失效
+    """
+
+    # 图表绘制逻辑变化时递增
+    VERSION = 6
+
+    _lock = threading.Lock()
+    _memory = OrderedDict()  # key -> 渲染结果
+
+    @staticmethod
+    def make_key(fingerprint, chart_type, params):
+        """
+        生成缓存键
+
+        Args:
+            fingerprint: 数据内容指纹（见 source_fingerprint）
+            chart_type: 图表类型
+            params: 传给生成函数的参数（不含数据）
+
+        Returns:
+            str: 缓存键（十六进制）
+        """
+        payload = json.dumps(
+            [ChartCache.VERSION, fingerprint, chart_type, _normalize(list(params))],
+            ensure_ascii=False, default=str
+        )
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+    @staticmethod
+    def _path(key):
+        return os.path.join(CHART_CACHE_DIR, f"{key}.json")
+
+    @staticmethod
+    def _remember(key, result):
+        """写入内存层并淘汰最久未使用的结果"""
+        with ChartCache._lock:
+            ChartCache._memory[key] = result
+            ChartCache._memory.move_to_end(key)
+            while len(ChartCache._memory) > CHART_CACHE_MAX_ENTRIES:
+                ChartCache._memory.popitem(last=False)
+
+    @staticmethod
+    def get(key):
+        """
+        读取缓存的渲染结果（磁盘命中时同时放入内存层）
+
+        Returns:
+            dict 或 None
+        """
+        with ChartCache._lock:
+            result = ChartCache._memory.get(key)
+            if result is not None:
+                ChartCache._memory.move_to_end(key)
+                return result
+
+        path = ChartCache._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as cache_file:
+                result = json.load(cache_file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        ChartCache._remember(key, result)
+        return result
+
+    @staticmethod
+    def put(key, result):
+        """
+        保存渲染结果（磁盘写入失败只打印日志，不影响接口返回）
+
+        Args:
+            key: make_key 生成的缓存键
+            result: 生成函数返回的结果字典
+        """
+        ChartCache._remember(key, result)
+
+        temp_path = None
+        try:
+            os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=CHART_CACHE_DIR, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as cache_file:
+                cache_file.write(dumps_bytes(result))
+            os.replace(temp_path, ChartCache._path(key))
+            temp_path = None
+            ChartCache._evict_disk()
+        except (OSError, TypeError, ValueError) as e:
+            print(f"图表缓存写入失败: {e}")
+        finally:
+            if temp_path is not None:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _evict_disk():
+        """按修改时间淘汰超出数量上限的磁盘缓存"""
+        entries = []
+        for filename in os.listdir(CHART_CACHE_DIR):
+            if filename.endswith('.json'):
+                path = os.path.join(CHART_CACHE_DIR, filename)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+        if len(entries) <= CHART_CACHE_DISK_MAX_ENTRIES:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - CHART_CACHE_DISK_MAX_ENTRIES]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
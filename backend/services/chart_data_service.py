@@ -0,0 +1,327 @@
+"""
+图表数据服务
+计算各类图表所需的聚合数据（直方图分箱、五数概括、密度曲线、分位数对、相关矩阵、频数等），
+以JSON返回由前端绘制，服务端不再渲染PNG；
+直方图、箱线图、小提琴图和散点图可按分面列拆分，返回每个分面的数据
+"""
+import numpy as np
+import pandas as pd
+from config import CHART_AGGREGATE_BINS, CHART_AGGREGATE_MIN_POINTS
+from DataVisualization.qqplot import qq_points
+from utils.binning import histogram_1d, histogram_2d, histogram_2d_grouped, linear_edges
+from utils.correlation import correlation_matrix
+from utils.facets import facet_groups
+from utils.kde import kde_fft
+
+# 与图表生成函数保持一致的参数
+HISTOGRAM_BINS = 30
+KDE_GRID_SIZE = 200
+# 箱线图每组最多返回的异常值个数
+BOXPLOT_MAX_OUTLIERS = 500
+
+
+class ChartDataService:
+    """图表聚合数据计算服务类"""
+
+    @staticmethod
+    def _require_columns(df, columns):
+        for col in columns:
+            if col not in df.columns:
+                raise ValueError(f"列 '{col}' 在CSV中不存在")
+
+    @staticmethod
+    def _numeric_values(df, column):
+        """取数值列的非缺失值（float数组）"""
+        series = df[column]
+        if not pd.api.types.is_numeric_dtype(series):
+            raise ValueError(f"列 '{column}' 不是数值类型")
+        return series.dropna().to_numpy(dtype=float)
+
+    @staticmethod
+    def _groups(df, y_column, x_column):
+        """按分组列拆分数值列，返回 [(组名, 数值数组), ...]；没有分组列时只有一组"""
+        values = df[y_column]
+        if not pd.api.types.is_numeric_dtype(values):
+            raise ValueError(f"列 '{y_column}' 不是数值类型")
+        if not x_column:
+            return [(None, values.dropna().to_numpy(dtype=float))]
+        data = df[[x_column, y_column]].dropna()
+        return [
+            (name, group.to_numpy(dtype=float))
+            for name, group in data.groupby(x_column, sort=True)[y_column]
+        ]
+
+    @staticmethod
+    def _facet_panels(df, facet, panel):
+        """
+        分面数据：按分面列一次groupby拆分，每个分面调用 panel(子DataFrame) 计算该分面的数据
+
+        Returns:
+            dict: {'facet_column': 分面列名, 'panels': [{'facet': 分面取值, ...}, ...]}
+        """
+        return {
+            'facet_column': facet,
+            'panels': [{'facet': value, **panel(group)} for value, group in facet_groups(df, facet)],
+        }
+
+    @staticmethod
+    def _histogram_series(col, values, edges, bw_method):
+        counts, edges = histogram_1d(values, HISTOGRAM_BINS, edges)
+        grid, density = kde_fft(values, KDE_GRID_SIZE, bw_method=bw_method)
+        return {
+            'column': col,
+            'count': int(len(values)),
+            'bin_edges': edges,
+            'counts': counts,
+            'kde': None if grid is None else {'x': grid, 'density': density},
+            'kde_scale': float(len(values) * (edges[1] - edges[0])),
+        }
+
+    @staticmethod
+    def histogram(df, columns, bw_method='scott', facet=None):
+        """
+        直方图：每列30个等宽箱的频数与KDE曲线
+
+        KDE曲线为概率密度，乘以 kde_scale（样本量 × 箱宽）即与频数同一尺度；
+        bw_method 为KDE带宽规则（scott / silverman）；
+        指定 facet 时返回每个分面的 series，箱边界取自整列数据，各分面共用
+        """
+        ChartDataService._require_columns(df, columns)
+        edges = {}
+        for col in columns:
+            values = ChartDataService._numeric_values(df, col)
+            if len(values) == 0:
+                raise ValueError(f"列 '{col}' 没有有效数据")
+            edges[col] = linear_edges(values, HISTOGRAM_BINS)
+
+        def panel(data):
+            return {'series': [
+                ChartDataService._histogram_series(
+                    col, data[col].dropna().to_numpy(dtype=float), edges[col], bw_method
+                )
+                for col in columns
+            ]}
+
+        if facet:
+            return ChartDataService._facet_panels(df, facet, panel)
+        return panel(df)
+
+    @staticmethod
+    def _five_numbers(values):
+        """五数概括与1.5倍IQR须线、异常值"""
+        q1, median, q3 = np.percentile(values, [25, 50, 75])
+        iqr = q3 - q1
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        outliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+        if len(outliers) > BOXPLOT_MAX_OUTLIERS:
+            # 异常值过多时保留两端最极端的部分
+            outliers = np.sort(outliers)
+            half = BOXPLOT_MAX_OUTLIERS // 2
+            outliers = np.concatenate([outliers[:half], outliers[-half:]])
+        return {
+            'count': int(len(values)),
+            'mean': float(values.mean()),
+            'min': float(values.min()),
+            'q1': float(q1),
+            'median': float(median),
+            'q3': float(q3),
+            'max': float(values.max()),
+            'whisker_low': float(inside.min()),
+            'whisker_high': float(inside.max()),
+            'outliers': outliers,
+            'outlier_count': int(((values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)).sum()),
+        }
+
+    @staticmethod
+    def boxplot(df, y_column, x_column=None, facet=None):
+        """箱线图：每组的五数概括、须线和异常值；指定 facet 时返回每个分面的分组"""
+        ChartDataService._require_columns(df, [y_column] + ([x_column] if x_column else []))
+
+        def panel(data):
+            return {'groups': [
+                {'group': name, **ChartDataService._five_numbers(values)}
+                for name, values in ChartDataService._groups(data, y_column, x_column)
+                if len(values)
+            ]}
+
+        result = {'y_column': y_column, 'x_column': x_column}
+        if facet:
+            return {**result, **ChartDataService._facet_panels(df, facet, panel)}
+        return {**result, **panel(df)}
+
+    @staticmethod
+    def _violin_group(name, values, bw_method):
+        grid, density = kde_fft(values, KDE_GRID_SIZE, bw_method=bw_method)
+        q1, median, q3 = np.percentile(values, [25, 50, 75])
+        return {
+            'group': name,
+            'count': int(len(values)),
+            'y': grid,
+            'density': density,
+            'q1': float(q1),
+            'median': float(median),
+            'q3': float(q3),
+            'min': float(values.min()),
+            'max': float(values.max()),
+        }
+
+    @staticmethod
+    def violinplot(df, y_column, x_column=None, bw_method='scott', facet=None):
+        """
+        小提琴图：每组在数据范围内（cut=0）的密度曲线与四分位数，bw_method 为KDE带宽规则；
+        指定 facet 时返回每个分面的分组
+        """
+        ChartDataService._require_columns(df, [y_column] + ([x_column] if x_column else []))
+
+        def panel(data):
+            return {'groups': [
+                ChartDataService._violin_group(name, values, bw_method)
+                for name, values in ChartDataService._groups(data, y_column, x_column)
+                if len(values)
+            ]}
+
+        result = {'y_column': y_column, 'x_column': x_column}
+        if facet:
+            return {**result, **ChartDataService._facet_panels(df, facet, panel)}
+        return {**result, **panel(df)}
+
+    @staticmethod
+    def qqplot(df, column, distribution='norm'):
+        """QQ图：理论分位数与样本分位数对（按秩等距抽取）、参考线及逐点置信带"""
+        ChartDataService._require_columns(df, [column])
+        values = ChartDataService._numeric_values(df, column)
+        if len(values) < 2:
+            raise ValueError(f"列 '{column}' 至少需要2个有效数据")
+        qq = qq_points(values, distribution)
+        return {
+            'column': column,
+            'distribution': distribution,
+            'shape_params': list(qq['shape_params']),
+            'count': int(len(values)),
+            'theoretical': qq['theoretical'],
+            'sample': qq['sample'],
+            'band': {'lower': qq['lower'], 'upper': qq['upper']},
+            'line': {'slope': qq['slope'], 'intercept': qq['intercept'], 'r': qq['r']},
+        }
+
+    @staticmethod
+    def correlation(df, columns=None, method='pearson'):
+        """相关性矩阵及各列对的成对完整观测数（列选择规则与相关性热图一致）"""
+        if columns:
+            missing_cols = [col for col in columns if col not in df.columns]
+            if missing_cols:
+                raise ValueError(f"以下列在CSV中不存在: {missing_cols}")
+            selected = df[columns]
+        else:
+            selected = df.select_dtypes(include=['number'])
+        if selected.shape[1] < 2:
+            raise ValueError("需要至少2个数值列来计算相关性")
+        matrix, counts = correlation_matrix(selected, method)
+        return {
+            'method': method,
+            'columns': matrix.columns.tolist(),
+            'matrix': matrix.to_numpy(),
+            'counts': counts.to_numpy(),
+        }
+
+    @staticmethod
+    def barplot(df, column):
+        """条形图：各类别的频数与百分比（按类别排序）"""
+        ChartDataService._require_columns(df, [column])
+        value_counts = df[column].value_counts().sort_index()
+        total = int(value_counts.sum())
+        return {
+            'column': column,
+            'categories': value_counts.index.astype(str).tolist(),
+            'counts': value_counts.to_numpy(),
+            'percentages': value_counts.to_numpy() / total * 100 if total else [],
+            'total': total,
+        }
+
+    @staticmethod
+    def _pairs(df, x_column, y_column):
+        ChartDataService._require_columns(df, [x_column, y_column])
+        pairs = df[[x_column, y_column]].dropna()
+        for col in (x_column, y_column):
+            if not pd.api.types.is_numeric_dtype(pairs[col]):
+                raise ValueError(f"列 '{col}' 不是数值类型")
+        return pairs[x_column].to_numpy(dtype=float), pairs[y_column].to_numpy(dtype=float)
+
+    @staticmethod
+    def _regression(x, y):
+        if len(x) >= 2 and np.ptp(x) > 0:
+            slope, intercept = np.polyfit(x, y, 1)
+            return {'slope': float(slope), 'intercept': float(intercept)}
+        return None
+
+    @staticmethod
+    def scatter(df, x_column, y_column, facet=None):
+        """
+        散点图：点数不超过 CHART_AGGREGATE_MIN_POINTS 时返回全部点，否则返回二维频数网格；
+        同时返回最小二乘回归线
+
+        指定 facet 时按所有分面的总点数选择模式，panels 中为每个分面的点或频数网格与回归线；
+        频数网格模式下各分面共用 x_edges / y_edges，所有分面的频数一次bincount得到
+        """
+        x, y = ChartDataService._pairs(df, x_column, y_column)
+        result = {'x_column': x_column, 'y_column': y_column, 'count': int(len(x))}
+        aggregated = len(x) > CHART_AGGREGATE_MIN_POINTS
+
+        if facet:
+            pairs = df[list(dict.fromkeys([x_column, y_column, facet]))].dropna(subset=[x_column, y_column])
+            groups = facet_groups(pairs, facet)
+            arrays = [
+                (group[x_column].to_numpy(dtype=float), group[y_column].to_numpy(dtype=float))
+                for _, group in groups
+            ]
+            panels = [
+                {'facet': value, 'count': int(len(px)), 'regression': ChartDataService._regression(px, py)}
+                for (value, _), (px, py) in zip(groups, arrays)
+            ]
+            if aggregated:
+                codes = np.concatenate([np.full(len(px), i, dtype=np.intp) for i, (px, _) in enumerate(arrays)])
+                counts, x_edges, y_edges = histogram_2d_grouped(
+                    np.concatenate([px for px, _ in arrays]), np.concatenate([py for _, py in arrays]),
+                    codes, len(groups), CHART_AGGREGATE_BINS
+                )
+                for panel, panel_counts in zip(panels, counts):
+                    panel['counts'] = panel_counts
+                result.update(mode='aggregated', x_edges=x_edges, y_edges=y_edges)
+            else:
+                for panel, (px, py) in zip(panels, arrays):
+                    panel.update(x=px, y=py)
+                result['mode'] = 'points'
+            result.update(facet_column=facet, panels=panels)
+            return result
+
+        if aggregated:
+            counts, x_edges, y_edges = histogram_2d(x, y, CHART_AGGREGATE_BINS)
+            result.update(mode='aggregated', x_edges=x_edges, y_edges=y_edges, counts=counts)
+        else:
+            result.update(mode='points', x=x, y=y)
+        regression = ChartDataService._regression(x, y)
+        if regression:
+            result['regression'] = regression
+        return result
+
+    @staticmethod
+    def jointplot(df, x_column, y_column, bw_method='scott'):
+        """联合分布图：二维频数网格，边缘分布为网格的行/列合计及各变量的KDE曲线"""
+        x, y = ChartDataService._pairs(df, x_column, y_column)
+        if len(x) == 0:
+            raise ValueError("没有同时包含两个变量的有效数据")
+        counts, x_edges, y_edges = histogram_2d(x, y, CHART_AGGREGATE_BINS)
+        x_grid, x_density = kde_fft(x, KDE_GRID_SIZE, bw_method=bw_method)
+        y_grid, y_density = kde_fft(y, KDE_GRID_SIZE, bw_method=bw_method)
+        return {
+            'x_column': x_column,
+            'y_column': y_column,
+            'count': int(len(x)),
+            'x_edges': x_edges,
+            'y_edges': y_edges,
+            'counts': counts,
+            'x_marginal': counts.sum(axis=1),
+            'y_marginal': counts.sum(axis=0),
+            'x_kde': None if x_grid is None else {'x': x_grid, 'density': x_density},
+            'y_kde': None if y_grid is None else {'x': y_grid, 'density': y_density},
+        }
@@ -0,0 +1,206 @@
+"""
+图表渲染服务
+在预热的子进程池中执行 DataVisualization 的生成函数：
+请求线程只负责提交任务并等待结果，多个图表可在多核上并行渲染，单个图表超时不会一直占用请求线程
+"""
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from config import CHART_RENDER_TIMEOUT, CHART_RENDER_WORKERS
+
+# 图表类型 -> (模块, 生成函数)
+CHART_GENERATORS = {
+    'histogram': ('DataVisualization.histogram', 'generate_histogram'),
+    'jointplot': ('DataVisualization.jointplot', 'generate_jointplot'),
+    'scatter': ('DataVisualization.scatterplot', 'generate_scatterplot'),
+    'boxplot': ('DataVisualization.boxplot', 'generate_boxplot'),
+    'violinplot': ('DataVisualization.violinplot', 'generate_violinplot'),
+    'barplot': ('DataVisualization.barplot', 'generate_barplot'),
+    'correlation_heatmap': ('DataVisualization.correlation_heatmap', 'generate_correlation_heatmap'),
+    'qqplot': ('DataVisualization.qqplot', 'generate_qqplot'),
+}
+
+
+class ChartRenderTimeout(Exception):
+    """图表渲染超时"""
+
+
+def _load_generator(chart_type):
+    module_name, func_name = CHART_GENERATORS[chart_type]
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _exit_with_parent(parent):
+    parent.join()
+    os._exit(0)
+
+
+def _warm_worker():
+    """渲染进程初始化：导入绘图库与全部生成模块，并预先加载字体"""
+    # 服务进程被强制结束（如SIGTERM）时渲染进程随之退出，不残留孤儿进程
+    parent = multiprocessing.parent_process()
+    if parent is not None:
+        threading.Thread(target=_exit_with_parent, args=(parent,), daemon=True).start()
+
+    import matplotlib
+    from matplotlib import font_manager
+    for chart_type in CHART_GENERATORS:
+        _load_generator(chart_type)
+    font_manager.findfont(font_manager.FontProperties(family=matplotlib.rcParams['font.sans-serif']))
+
+
+def _render(chart_type, args):
+    """在渲染进程中生成图表"""
+    return _load_generator(chart_type)(*args)
+
+
+def _ping():
+    return True
+
+
+def _mp_context():
+    """
+    进程启动方式：支持时使用forkserver（渲染进程由预先导入了绘图库的服务进程fork得到，
+    新建或替换进程池时无需重新导入matplotlib/seaborn），否则使用spawn
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(sorted({module for module, _ in CHART_GENERATORS.values()}))
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+class ChartRenderer:
+    """
+    图表渲染进程池
+
+    - 生成函数使用面向对象的Figure API，不共享pyplot全局状态，可在多个进程中独立渲染
+    - 任务按提交顺序排队，等待时间计入超时
+    - 渲染超时或进程异常退出时替换进程池，后续请求不会排在卡住的任务之后
+    - render_many 一次提交多个图表，在多个渲染进程中并行执行
+    - CHART_RENDER_WORKERS 为0时在请求线程内直接渲染
+    """
+
+    _pool = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _get_pool():
+        with ChartRenderer._lock:
+            if ChartRenderer._pool is None:
+                ChartRenderer._pool = ProcessPoolExecutor(
+                    max_workers=CHART_RENDER_WORKERS,
+                    mp_context=_mp_context(),
+                    initializer=_warm_worker
+                )
+            return ChartRenderer._pool
+
+    @staticmethod
+    def _replace_pool(pool):
+        """丢弃进程池（已提交的任务执行完后进程自行退出），下次渲染时重新创建"""
+        with ChartRenderer._lock:
+            if ChartRenderer._pool is pool:
+                ChartRenderer._pool = None
+        pool.shutdown(wait=False)
+
+    @staticmethod
+    def warm_up():
+        """启动全部渲染进程（不等待完成），避免第一批图表请求承担进程启动和导入开销"""
+        if CHART_RENDER_WORKERS <= 0:
+            return
+        pool = ChartRenderer._get_pool()
+        for _ in range(CHART_RENDER_WORKERS):
+            pool.submit(_ping)
+
+    @staticmethod
+    def render(chart_type, data_input, *args, columns=None, timeout=None):
+        """
+        渲染图表
+
+        Args:
+            chart_type: 图表类型（CHART_GENERATORS的键）
+            data_input: DataFrame或数据文件路径
+            *args: 生成函数的其余参数
+            columns: 图表用到的列；data_input为DataFrame时只把这些列传给渲染进程
+            timeout: 超时时间（秒），默认 CHART_RENDER_TIMEOUT
+
+        Returns:
+            dict: 生成函数的返回值
+
+        Raises:
+            ChartRenderTimeout: 渲染超时
+            ValueError / FileNotFoundError: 生成函数抛出的异常原样抛出
+        """
+        result = ChartRenderer.render_many([(chart_type, data_input, args, columns)], timeout=timeout)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    @staticmethod
+    def render_many(tasks, timeout=None):
+        """
+        并行渲染多个图表：全部提交到进程池后再依次等待结果
+
+        Args:
+            tasks: [(图表类型, 数据输入, 生成函数其余参数的元组, 用到的列), ...]，含义同 render
+            timeout: 整批的超时时间（秒，从提交时起算，含排队时间），默认 CHART_RENDER_TIMEOUT
+
+        Returns:
+            list: 与tasks一一对应，成功为生成函数的返回值，失败为异常对象（ChartRenderTimeout、ValueError等）
+        """
+        results = [None] * len(tasks)
+        calls = []  # [(任务序号, 图表类型, 生成函数参数), ...]
+        for index, (chart_type, data_input, args, columns) in enumerate(tasks):
+            if isinstance(data_input, pd.DataFrame) and columns:
+                # 只传输需要的列，减少进程间序列化的数据量；
+                # 投影前先检查列是否存在，否则生成函数看不到缺失的列，报出的错误不对
+                columns = list(dict.fromkeys(col for col in columns if col))
+                missing = [col for col in columns if col not in data_input.columns]
+                if missing:
+                    results[index] = ValueError(f"列 '{missing[0]}' 在CSV中不存在")
+                    continue
+                if columns:
+                    data_input = data_input[columns]
+            calls.append((index, chart_type, (data_input,) + tuple(args)))
+
+        if CHART_RENDER_WORKERS <= 0:
+            for index, chart_type, call_args in calls:
+                try:
+                    results[index] = _render(chart_type, call_args)
+                except Exception as e:
+                    results[index] = e
+            return results
+
+        pool = ChartRenderer._get_pool()
+        timeout = CHART_RENDER_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        try:
+            futures = [pool.submit(_render, chart_type, call_args) for _, chart_type, call_args in calls]
+        except (BrokenProcessPool, RuntimeError):
+            # 进程池已损坏或已被替换，重新创建后再提交一次
+            ChartRenderer._replace_pool(pool)
+            pool = ChartRenderer._get_pool()
+            futures = [pool.submit(_render, chart_type, call_args) for _, chart_type, call_args in calls]
+
+        replace = False
+        for (index, _, _), future in zip(calls, futures):
+            try:
+                results[index] = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                if not future.cancel():
+                    # 任务已在执行，渲染进程被占用
+                    replace = True
+                results[index] = ChartRenderTimeout(f"图表渲染超过{timeout}秒，请减少数据量或变量后重试")
+            except BrokenProcessPool:
+                replace = True
+                results[index] = RuntimeError("图表渲染进程异常退出")
+            except Exception as e:
+                results[index] = e
+        if replace:
+            ChartRenderer._replace_pool(pool)
+        return results
@@ -0,0 +1,276 @@
+"""
+列画像服务
+一次向量化扫描计算所有列的统计信息，并据此判断列类型
+"""
+import warnings
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+
+
+# 分类型强提示词（这些词几乎肯定是分类）
+STRONG_CATEGORICAL_KEYWORDS = [
+    'gender', 'sex', 'race', 'ethnicity',
+    'marital', 'status', 'type', 'category',
+    'flag', 'indicator', 'binary', 'is_', 'has_'
+]
+
+# 浮点数能精确转换为int64的范围
+_INT64_LOWER = -2.0 ** 63
+_INT64_UPPER = 2.0 ** 63
+
+
+class ColumnProfiler:
+    """
+    列画像与类型判断
+
+    同一dtype的数值列合并为一个二维数组，非空计数、最小/最大值、整数判断、
+    均值和标准差都按块向量化计算；小范围整数列的唯一值个数用一次bincount得到。
+    object/category/bool/datetime列各自做一次value_counts。
+    """
+
+    TOP_VALUES = 5
+
+    @staticmethod
+    def _dtype_class(dtype):
+        """按类型判断规则划分dtype：categorical / datetime / numeric"""
+        if dtype in ['object', 'category', 'bool']:
+            return 'categorical'
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return 'datetime'
+        if pd.api.types.is_numeric_dtype(dtype):
+            return 'numeric'
+        return 'categorical'
+
+    @staticmethod
+    def profile(df):
+        """
+        计算所有列的画像
+
+        Args:
+            df: pd.DataFrame
+
+        Returns:
+            dict: 列名 -> 画像，包含 dtype、dtype_class、count、null_count、unique_count，
+                  数值列另含 min、max、mean、std、is_integer，
+                  非数值列另含 top_values（前5个高频值的 (值, 次数) 列表）
+        """
+        profiles = {}
+        numeric_blocks = defaultdict(list)
+        for col, dtype in df.dtypes.items():
+            dtype_class = ColumnProfiler._dtype_class(dtype)
+            if dtype_class == 'numeric' and isinstance(dtype, np.dtype) and dtype.kind in 'iuf':
+                numeric_blocks[dtype].append(col)
+            else:
+                profiles[col] = ColumnProfiler._profile_series(df[col], dtype_class)
+
+        for dtype, cols in numeric_blocks.items():
+            profiles.update(ColumnProfiler._profile_numeric_block(df, cols, dtype))
+
+        return {col: profiles[col] for col in df.columns}
+
+    @staticmethod
+    def _profile_numeric_block(df, cols, dtype):
+        """对同一dtype的一组数值列做整体向量化统计"""
+        # 转置为 (列数, 行数)，每列在内存中连续
+        values = np.ascontiguousarray(df[cols].to_numpy(dtype=dtype).T)
+        column_count, row_count = values.shape
+        is_float = dtype.kind == 'f'
+
+        with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            if is_float:
+                valid = ~np.isnan(values)
+                counts = valid.sum(axis=1)
+                mins = np.nanmin(values, axis=1) if row_count else np.full(column_count, np.nan)
+                maxs = np.nanmax(values, axis=1) if row_count else np.full(column_count, np.nan)
+                integral = (values == np.floor(values)) & (values >= _INT64_LOWER) & (values < _INT64_UPPER)
+                is_integer = (integral | ~valid).all(axis=1)
+                means = np.nanmean(values, axis=1)
+                stds = np.nanstd(values, axis=1, ddof=1)
+            else:
+                valid = None
+                counts = np.full(column_count, row_count)
+                mins = values.min(axis=1) if row_count else np.zeros(column_count, dtype=dtype)
+                maxs = values.max(axis=1) if row_count else np.zeros(column_count, dtype=dtype)
+                is_integer = np.ones(column_count, dtype=bool)
+                means = values.mean(axis=1)
+                stds = values.std(axis=1, ddof=1) if row_count > 1 else np.full(column_count, np.nan)
+
+        uniques = ColumnProfiler._unique_counts(values, valid, counts, mins, maxs, is_integer)
+
+        profiles = {}
+        for i, col in enumerate(cols):
+            count = int(counts[i])
+            has_values = count > 0
+            profiles[col] = {
+                "dtype": dtype,
+                "dtype_class": "numeric",
+                "count": count,
+                "null_count": row_count - count,
+                "unique_count": int(uniques[i]),
+                "min": mins[i] if has_values else np.nan,
+                "max": maxs[i] if has_values else np.nan,
+                "mean": means[i] if has_values else np.nan,
+                "std": stds[i] if count > 1 else np.nan,
+                "is_integer": bool(is_integer[i]),
+            }
+        return profiles
+
+    # 值范围不超过该宽度的整数列，用计数数组统计唯一值
+    _DENSE_RANGE_LIMIT = 1 << 12
+    # 每次计数的单元上限，控制临时数组大小
+    _DENSE_CHUNK_CELLS = 1 << 22
+
+    @staticmethod
+    def _unique_counts(values, valid, counts, mins, maxs, is_integer):
+        """
+        统计每列唯一值个数（不含缺失值）
+
+        NHANES中大量列是小范围整数编码：这些列平移到从0开始后，按块拼接偏移量
+        做一次 np.bincount，非零桶个数即唯一值个数；其余列逐列哈希去重。
+        """
+        column_count, row_count = values.shape
+        uniques = np.zeros(column_count, dtype=np.int64)
+        if row_count == 0:
+            return uniques
+
+        with np.errstate(invalid='ignore', over='ignore'):
+            widths = np.where(counts > 0, maxs - mins, -1)
+        dense = is_integer & (counts > 0) & (widths >= 0) & (widths < ColumnProfiler._DENSE_RANGE_LIMIT)
+        dense_ids = np.flatnonzero(dense)
+
+        rows_per_chunk = max(1, ColumnProfiler._DENSE_CHUNK_CELLS // row_count)
+        for start in range(0, len(dense_ids), rows_per_chunk):
+            ids = dense_ids[start:start + rows_per_chunk]
+            sizes = widths[ids].astype(np.int64) + 1
+            offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            block = values[ids]
+            codes = (block - mins[ids][:, None])
+            if valid is not None:
+                codes = np.where(valid[ids], codes, 0)
+            codes = codes.astype(np.int64) + offsets[:, None]
+            if valid is not None:
+                codes = codes[valid[ids]]
+            occupied = np.bincount(codes.ravel(), minlength=int(sizes.sum())) > 0
+            uniques[ids] = np.add.reduceat(occupied, offsets)
+
+        for i in np.flatnonzero(~dense & (counts > 0)):
+            column = values[i] if valid is None else values[i][valid[i]]
+            uniques[i] = len(pd.unique(column))
+        return uniques
+
+    @staticmethod
+    def _profile_series(series, dtype_class):
+        """非numpy数值列（object/category/bool/datetime/扩展类型）的逐列画像"""
+        count = int(series.count())
+        profile = {
+            "dtype": series.dtype,
+            "dtype_class": dtype_class,
+            "count": count,
+            "null_count": int(len(series) - count),
+        }
+
+        if dtype_class == 'numeric':
+            # 可空整数等扩展数值类型，按原有方式逐列计算
+            non_null_values = series.dropna()
+            is_integer = pd.api.types.is_integer_dtype(series.dtype)
+            if not is_integer and pd.api.types.is_float_dtype(series.dtype) and count:
+                is_integer = bool((non_null_values == non_null_values.astype(int)).all())
+            profile.update({
+                "unique_count": int(series.nunique(dropna=True)),
+                "min": non_null_values.min() if count else np.nan,
+                "max": non_null_values.max() if count else np.nan,
+                "mean": series.mean(),
+                "std": series.std(),
+                "is_integer": bool(is_integer),
+            })
+            return profile
+
+        value_counts = series.value_counts()
+        profile.update({
+            "unique_count": int(len(value_counts)),
+            "top_values": list(value_counts.head(ColumnProfiler.TOP_VALUES).items()),
+        })
+        return profile
+
+    @staticmethod
+    def classify_column(name, profile):
+        """
+        根据列名和画像判断列类型 - 基于数据值的实际特征
+
+        判断规则：
+        1. 非数值型 (object/category) → 分类型
+        2. datetime → 日期时间型
+        3. 数值型进一步分析：
+           - 小范围的离散整数 (如1-10的性别、年龄组) → 分类型
+           - 大范围的数值 (如薪水、ID) → 数值型
+           - 浮点数且不是整数伪装 → 数值型
+
+        Args:
+            name: 列名
+            profile: ColumnProfiler.profile 返回的单列画像
+
+        Returns:
+            str: 'numeric'、'categorical' 或 'datetime'
+        """
+        if profile["dtype_class"] != 'numeric':
+            return profile["dtype_class"]
+
+        col_lower = name.lower()
+        total_count = profile["count"]
+        if total_count == 0:
+            return 'categorical'
+
+        unique_count = profile["unique_count"]
+        is_integer_type = profile["is_integer"]
+        min_val = profile["min"]
+        max_val = profile["max"]
+        value_range = max_val - min_val
+
+        is_categorical = False
+
+        # 强分类关键词优先（包括ID类列）
+        if any(keyword in col_lower for keyword in STRONG_CATEGORICAL_KEYWORDS):
+            if unique_count <= 100:  # 关键词暗示分类，且唯一值不太多
+                is_categorical = True
+        # 特殊检查：列名包含'id'且唯一值数量很高（可能是标识符）
+        elif 'id' in col_lower and unique_count >= total_count * 0.8:
+            # 如果80%以上的值都是唯一的，这很可能是ID列
+            is_categorical = True
+
+        # 基于数据值特征判断
+        elif is_integer_type:
+            # 规则1: 二分类 (0/1)，两个不同的整数值恰为0和1
+            if unique_count == 2:
+                if min_val == 0 and max_val == 1:
+                    is_categorical = True
+
+            # 规则2: 唯一值很少 (<=5)，几乎肯定是分类
+            elif unique_count <= 5:
+                is_categorical = True
+
+            # 规则3: 唯一值6-10个，检查值的范围
+            elif unique_count <= 10:
+                # 每个值都不同时：连续序列（可能是序号/编号）为分类，否则为真正的数值
+                if unique_count == total_count:
+                    is_categorical = value_range == unique_count - 1
+                # 如果值都在小范围内（如1-10），是分类
+                elif value_range < 20 and min_val >= 0:
+                    is_categorical = True
+                # 如果最小值很大（>100），即使唯一值少，也可能是数值（如部门代码101,102,103）
+                elif min_val > 100:
+                    is_categorical = False
+
+            # 规则4: 唯一值占比很小 (<2%)，且唯一值不超过50；值范围很大时可能是编码，归为数值
+            elif unique_count <= 50 and (unique_count / total_count) < 0.02:
+                if value_range < 200:
+                    is_categorical = True
+
+        else:
+            # 浮点数：只有很少几个特定值（如0.0, 0.5, 1.0的评分等级）时为分类
+            if unique_count <= 10:
+                if value_range <= 10:
+                    is_categorical = True
+
+        return 'categorical' if is_categorical else 'numeric'
@@ -1,23 +1,25 @@
 """
 CSV文件处理服务
 """
-import pandas as pd
-import numpy as np
-from utils.serialization import convert_to_serializable
-from config import MAX_FILE_SIZE
+from utils.serialization import convert_to_serializable, frame_to_records
+from utils.data_loader import read_csv_fast
+from services.column_profiler import ColumnProfiler
+from services.streaming_profiler import StreamingProfiler
+from config import STREAMING_PROFILE_THRESHOLD
 
 
 class CSVService:
     """CSV文件处理服务类"""
     
     @staticmethod
-    def parse_csv_file(file, file_length):
+    def parse_csv_file(file, file_length, approximate=False):
         """
         解析CSV文件并返回详细信息
         
         Args:
             file: Flask FileStorage对象
             file_length: 文件大小（字节）
+            approximate: 近似画像，唯一值个数、分位数和高频值由可合并草图给出
             
         Returns:
             dict: 包含文件统计信息、列信息、预览数据等
@@ -27,15 +29,53 @@ class CSVService:
             pd.errors.ParserError: CSV解析错误
             UnicodeDecodeError: 编码错误
         """
+        if approximate or file_length > STREAMING_PROFILE_THRESHOLD:
+            # 大文件按块流式画像，内存占用与文件大小无关
+            return StreamingProfiler.profile_csv(file, file_length, approximate=approximate)
+        df = CSVService.read_csv_file(file)
+        return CSVService.profile_dataframe(df, file_length)
+
+    @staticmethod
+    def read_csv_file(file):
+        """
+        将上传的CSV文件读取为DataFrame
+
+        Args:
+            file: Flask FileStorage对象或文件路径
+
+        Returns:
+            pd.DataFrame
+        """
         # Read the CSV file into a DataFrame while preserving NA values
-        df = pd.read_csv(file, keep_default_na=True)
-        
+        return read_csv_fast(file, keep_default_na=True)
+
+    @staticmethod
+    def profile_dataframe(df, file_length, column_roles=None):
+        """
+        对已解析的DataFrame生成文件统计、列信息和预览数据
+
+        Args:
+            df: 已解析的DataFrame
+            file_length: 文件大小（字节）
+            column_roles: 已知的列类型划分（如列式文件元数据中保存的），给出时跳过类型检测
+
+        Returns:
+            dict: 同 parse_csv_file
+
+        Raises:
+            ValueError: 数据为空
+        """
         # 基本信息检查
         if df.empty:
             raise ValueError("CSV文件为空")
         
+        # 一次扫描计算所有列的画像，供类型检测和列信息共用
+        profiles = ColumnProfiler.profile(df)
+        
         # 使用智能类型检测
-        numeric_columns, categorical_columns, datetime_columns = CSVService._intelligent_type_detection(df)
+        numeric_columns, categorical_columns, datetime_columns = CSVService._resolve_column_roles(
+            df, profiles, column_roles
+        )
         
         # 计算基本统计信息
         file_stats = {
@@ -44,25 +84,19 @@ class CSVService:
             "numeric_columns_count": int(len(numeric_columns)),
             "categorical_columns_count": int(len(categorical_columns)),
             "datetime_columns_count": int(len(datetime_columns)),
-            "missing_values_total": int(df.isnull().sum().sum()),
+            "missing_values_total": int(sum(profile["null_count"] for profile in profiles.values())),
             "file_size": int(file_length)
         }
         
         # 列信息详细分析
-        columns_info = CSVService._get_columns_info(df, numeric_columns, categorical_columns, datetime_columns)
+        columns_info = CSVService._get_columns_info(
+            df, numeric_columns, categorical_columns, datetime_columns, profiles
+        )
         
-        # 数据预览（前100行）
-        preview_df = df.head(100)
-        cleaned_preview_df = preview_df.replace([np.nan, pd.NaT], None)
-        
-        # 如果数据量太大，只返回预览数据
-        if len(df) > 1000:
-            full_df = df.head(1000)
-            cleaned_full_df = full_df.replace([np.nan, pd.NaT], None)
-            data_truncated = True
-        else:
-            cleaned_full_df = df.replace([np.nan, pd.NaT], None)
-            data_truncated = False
+        # 数据预览（前100行）；数据量太大时只返回前1000行
+        full_df = df.head(1000)
+        full_data = frame_to_records(full_df)
+        data_truncated = len(df) > 1000
         
         return {
             "file_stats": file_stats,
@@ -71,186 +105,87 @@ class CSVService:
             "numeric_columns": numeric_columns,
             "categorical_columns": categorical_columns,
             "datetime_columns": datetime_columns,
-            "preview_data": cleaned_preview_df.to_dict(orient='records'),
-            "full_data": cleaned_full_df.to_dict(orient='records'),
+            "preview_data": full_data[:100],
+            "full_data": full_data,
             "data_truncated": data_truncated,
             "total_rows": len(df),
             "total_columns": len(df.columns)
         }
     
     @staticmethod
-    def _intelligent_type_detection(df):
+    def _intelligent_type_detection(df, profiles=None):
         """
         智能检测列的数据类型 - 基于数据值的实际特征
         
-        核心思想：分析数据值本身的特征，而不仅仅依赖统计和关键词
+        判断规则见 ColumnProfiler.classify_column，所需统计量由 ColumnProfiler.profile
+        一次向量化扫描得到。
         
-        判断规则：
-        1. 非数值型 (object/category) → 分类型
-        2. datetime → 日期时间型
-        3. 数值型进一步分析：
-           - 检查数据值的实际范围和分布
-           - 小范围的离散整数 (如1-10的性别、年龄组) → 分类型
-           - 大范围的数值 (如薪水、ID) → 数值型
-           - 浮点数且不是整数伪装 → 数值型
+        Args:
+            df: pd.DataFrame
+            profiles: 已计算的列画像，为None时重新计算
         
         Returns:
             tuple: (numeric_columns, categorical_columns, datetime_columns)
         """
+        if profiles is None:
+            profiles = ColumnProfiler.profile(df)
+        
         numeric_columns = []
         categorical_columns = []
         datetime_columns = []
         
-        # 分类型强提示词（这些词几乎肯定是分类）
-        strong_categorical_keywords = [
-            'gender', 'sex', 'race', 'ethnicity', 
-            'marital', 'status', 'type', 'category',
-            'flag', 'indicator', 'binary', 'is_', 'has_'
-        ]
-        
         for col in df.columns:
-            col_dtype = df[col].dtype
-            col_lower = col.lower()
-            
-            # 1. 明确的分类型
-            if col_dtype in ['object', 'category', 'bool']:
-                categorical_columns.append(col)
-                continue
-            
-            # 2. 日期时间型
-            if pd.api.types.is_datetime64_any_dtype(col_dtype):
+            col_type = ColumnProfiler.classify_column(col, profiles[col])
+            if col_type == 'numeric':
+                numeric_columns.append(col)
+            elif col_type == 'datetime':
                 datetime_columns.append(col)
-                continue
-            
-            # 3. 数值型需要基于数据值特征判断
-            if pd.api.types.is_numeric_dtype(col_dtype):
-                non_null_values = df[col].dropna()
-                
-                if len(non_null_values) == 0:
-                    categorical_columns.append(col)
-                    continue
-                
-                unique_count = df[col].nunique(dropna=True)
-                total_count = len(non_null_values)
-                
-                # 检查是否全是整数
-                is_integer_type = pd.api.types.is_integer_dtype(col_dtype)
-                if not is_integer_type and pd.api.types.is_float_dtype(col_dtype):
-                    # float类型检查是否实际上都是整数值
-                    is_integer_type = (non_null_values == non_null_values.astype(int)).all()
-                
-                # 获取数据范围
-                min_val = non_null_values.min()
-                max_val = non_null_values.max()
-                value_range = max_val - min_val
-                
-                # 判断逻辑
-                is_categorical = False
-                
-                # 强分类关键词优先（包括ID类列）
-                if any(keyword in col_lower for keyword in strong_categorical_keywords):
-                    if unique_count <= 100:  # 关键词暗示分类，且唯一值不太多
-                        is_categorical = True
-                # 特殊检查：列名包含'id'且唯一值数量很高（可能是标识符）
-                elif 'id' in col_lower and unique_count >= total_count * 0.8:
-                    # 如果80%以上的值都是唯一的，这很可能是ID列
-                    is_categorical = True
-                
-                # 基于数据值特征判断
-                elif is_integer_type:
-                    # 整数类型的判断
-                    
-                    # 规则1: 二分类 (0/1)
-                    if unique_count == 2:
-                        unique_vals = set(non_null_values.unique())
-                        if unique_vals.issubset({0, 1}):
-                            is_categorical = True
-                    
-                    # 规则2: 唯一值很少 (<=5)，几乎肯定是分类
-                    elif unique_count <= 5:
-                        is_categorical = True
-                    
-                    # 规则3: 唯一值6-10个，检查值的范围
-                    elif unique_count <= 10:
-                        # 特殊情况：如果唯一值数量等于总行数（每个值都不同），这通常是数值型
-                        # 例如小数据集中的age列
-                        # 但排除值范围很小的情况（可能是序号或编号）
-                        if unique_count == total_count:
-                            # 如果值范围很大（相对于唯一值数量），是数值型
-                            # 如果值看起来像连续的序号（如1,2,3...或1001,1002,1003...），是分类
-                            if value_range == unique_count - 1:
-                                # 连续序列，可能是ID
-                                is_categorical = True
-                            else:
-                                # 非连续，是真正的数值
-                                is_categorical = False
-                        # 如果值都在小范围内（如1-10），是分类
-                        # 如果值很大（如1001-1010），可能是ID，归为数值
-                        elif value_range < 20 and min_val >= 0:
-                            is_categorical = True
-                        # 如果最小值很大（>100），即使唯一值少，也可能是数值（如部门代码101,102,103）
-                        elif min_val > 100:
-                            is_categorical = False
-                    
-                    # 规则4: 唯一值占比很小 (<2%)，且唯一值不超过50
-                    elif unique_count <= 50 and (unique_count / total_count) < 0.02:
-                        # 大数据集中的少量唯一值，可能是分类
-                        # 但如果值范围很大，可能是ID或编码，归为数值
-                        if value_range < 200:
-                            is_categorical = True
-                
-                else:
-                    # 浮点数类型
-                    # 如果真的有小数（不是伪装的整数），通常是数值型
-                    # 唯一例外：只有很少几个特定值（如0.0, 0.5, 1.0）
-                    if unique_count <= 10:
-                        # 检查是否是特定的离散值（可能是评分等级）
-                        if value_range <= 10:
-                            is_categorical = True
-                
-                if is_categorical:
-                    categorical_columns.append(col)
-                else:
-                    numeric_columns.append(col)
             else:
-                # 其他类型归为分类型
                 categorical_columns.append(col)
         
         return numeric_columns, categorical_columns, datetime_columns
     
     @staticmethod
-    def _get_columns_info(df, numeric_columns, categorical_columns, datetime_columns):
+    def _get_columns_info(df, numeric_columns, categorical_columns, datetime_columns, profiles=None):
         """获取列的详细信息"""
+        if profiles is None:
+            profiles = ColumnProfiler.profile(df)
+        numeric_set = set(numeric_columns)
+        categorical_set = set(categorical_columns)
+        datetime_set = set(datetime_columns)
+        
         columns_info = []
         for col in df.columns:
+            profile = profiles[col]
             col_info = {
                 "name": col,
-                "type": str(df[col].dtype),
-                "non_null_count": int(df[col].count()),
-                "null_count": int(df[col].isnull().sum()),
-                "unique_count": int(df[col].nunique()),
+                "type": str(profile["dtype"]),
+                "non_null_count": profile["count"],
+                "null_count": profile["null_count"],
+                "unique_count": profile["unique_count"],
             }
             
             # 如果是数值列，添加统计信息
-            if col in numeric_columns:
+            if col in numeric_set:
                 col_info.update({
                     "data_type": "numeric",
-                    "min_value": convert_to_serializable(df[col].min()),
-                    "max_value": convert_to_serializable(df[col].max()),
-                    "mean_value": convert_to_serializable(df[col].mean()),
-                    "std_value": convert_to_serializable(df[col].std()),
+                    "min_value": convert_to_serializable(profile["min"]),
+                    "max_value": convert_to_serializable(profile["max"]),
+                    "mean_value": convert_to_serializable(profile["mean"]),
+                    "std_value": convert_to_serializable(profile["std"]),
                 })
-            elif col in categorical_columns:
-                top_values_dict = {}
-                if not df[col].empty:
-                    value_counts = df[col].value_counts().head(5)
-                    top_values_dict = {str(k): convert_to_serializable(v) for k, v in value_counts.items()}
+            elif col in categorical_set:
+                top_values = profile.get("top_values")
+                if top_values is None:
+                    # 被判为分类的数值列（如0/1编码），唯一值很少，单独统计高频值
+                    top_values = df[col].value_counts().head(ColumnProfiler.TOP_VALUES).items()
+                top_values_dict = {str(k): convert_to_serializable(v) for k, v in top_values}
                 
                 col_info.update({
                     "data_type": "categorical",
                     "top_values": top_values_dict
                 })
-            elif col in datetime_columns:
+            elif col in datetime_set:
                 col_info.update({
                     "data_type": "datetime"
                 })
@@ -275,10 +210,34 @@ class CSVService:
             dict: 包含列名、类型等信息
         """
         # 读取完整数据以准确判断类型
-        df = pd.read_csv(file)
-        
+        df = read_csv_fast(file)
+        return CSVService.get_dataframe_columns(df)
+
+    @staticmethod
+    def _resolve_column_roles(df, profiles=None, column_roles=None):
+        """使用已知的列类型划分，没有时进行智能类型检测"""
+        if column_roles:
+            return (list(column_roles["numeric_columns"]), list(column_roles["categorical_columns"]),
+                    list(column_roles["datetime_columns"]))
+        return CSVService._intelligent_type_detection(df, profiles)
+
+    @staticmethod
+    def get_dataframe_columns(df, profiles=None, column_roles=None):
+        """
+        获取已解析DataFrame的列信息，返回格式同 get_file_columns
+
+        Args:
+            df: 已解析的DataFrame
+            profiles: 已计算的列画像，为None时重新计算
+            column_roles: 已知的列类型划分，给出时跳过类型检测
+
+        Returns:
+            dict: 包含列名、类型等信息
+        """
         # 使用智能类型检测
-        numeric_columns, categorical_columns, datetime_columns = CSVService._intelligent_type_detection(df)
+        numeric_columns, categorical_columns, datetime_columns = CSVService._resolve_column_roles(
+            df, profiles, column_roles
+        )
         all_columns = df.columns.tolist()
         
         # 为前端下拉框准备选项格式
@@ -319,7 +278,7 @@ class CSVService:
         Returns:
             dict: 简化的文件信息
         """
-        df = pd.read_csv(file)
+        df = read_csv_fast(file)
         
         if df.empty:
             raise ValueError("CSV文件为空")
@@ -0,0 +1,301 @@
+"""
+数据集会话服务
+上传的CSV只解析一次，以dataset_id在内存中缓存，供可视化和分析接口复用
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import pandas as pd
+from config import DATASET_TTL_SECONDS, DATASET_MAX_COUNT, DATASET_MAX_MEMORY
+from services.profile_cache import ProfileCache
+
+
+class DatasetInputError(ValueError):
+    """请求中没有可用的数据来源（未上传文件、文件名为空或数据集已过期）"""
+
+    def __init__(self, message, error_code, status=400):
+        super().__init__(message)
+        self.error_code = error_code
+        self.status = status
+
+
+class DatasetRegistry:
+    """
+    已解析数据集的内存注册表
+
+    - 按最后访问时间计算过期（滑动TTL）
+    - 超过数量或内存上限时，淘汰最久未使用的数据集
+    - 数据集只读共享，取出的DataFrame是浅拷贝，调用方增删列不会影响缓存
+    - 延迟注册的数据集（画像已缓存的重复上传）在首次使用时才解析
+    """
+
+    _lock = threading.Lock()
+    _datasets = OrderedDict()  # dataset_id -> entry dict
+
+    @staticmethod
+    def _memory_usage(df):
+        """估算DataFrame占用的内存（不深入统计object列的字符串）"""
+        return int(df.memory_usage(index=True, deep=False).sum())
+
+    @staticmethod
+    def _evict_locked(now):
+        """清理过期数据集，并按LRU淘汰超出数量/内存上限的数据集（调用方需持有锁）"""
+        datasets = DatasetRegistry._datasets
+        for dataset_id in [key for key, entry in datasets.items()
+                           if now - entry['last_access'] > DATASET_TTL_SECONDS]:
+            DatasetRegistry._discard(datasets.pop(dataset_id))
+
+        total_memory = sum(entry['memory'] for entry in datasets.values())
+        while datasets and (len(datasets) > DATASET_MAX_COUNT or total_memory > DATASET_MAX_MEMORY):
+            _, entry = datasets.popitem(last=False)
+            total_memory -= entry['memory']
+            DatasetRegistry._discard(entry)
+
+    @staticmethod
+    def _discard(entry):
+        """释放尚未解析的数据集保留的上传文件（正在解析时由解析线程在完成后释放）"""
+        upload = entry.get('upload')
+        if upload is None or not entry['load_lock'].acquire(blocking=False):
+            return
+        try:
+            if entry['frame'] is None:
+                upload.release()
+        finally:
+            entry['load_lock'].release()
+
+    @staticmethod
+    def register(df, filename, file_size=None, metadata=None, content_hash=None):
+        """
+        注册一个已解析的数据集
+
+        Args:
+            df: 解析后的DataFrame
+            filename: 原始文件名
+            file_size: 原始文件大小（字节）
+            metadata: 附加信息，如列类型划分
+            content_hash: 原始文件内容哈希，相同内容再次上传时可复用已解析的DataFrame
+
+        Returns:
+            str: dataset_id
+        """
+        dataset_id = uuid.uuid4().hex
+        now = time.time()
+        entry = {
+            'frame': df,
+            'filename': filename,
+            'file_size': file_size,
+            'metadata': metadata or {},
+            'content_hash': content_hash,
+            'memory': DatasetRegistry._memory_usage(df),
+            'created_at': now,
+            'last_access': now,
+        }
+        with DatasetRegistry._lock:
+            DatasetRegistry._datasets[dataset_id] = entry
+            DatasetRegistry._evict_locked(now)
+        return dataset_id
+
+    @staticmethod
+    def register_lazy(upload, loader, filename, file_size=None, metadata=None, content_hash=None):
+        """
+        注册一个延迟解析的数据集：保留上传文件，首次通过dataset_id使用时才调用loader解析
+
+        Args:
+            upload: 保留的上传文件（见 utils.uploads.retain_upload），解析完成或被淘汰时释放
+            loader: 无参函数，从上传文件解析出DataFrame
+            其余参数同 register
+
+        Returns:
+            str: dataset_id
+        """
+        dataset_id = uuid.uuid4().hex
+        now = time.time()
+        entry = {
+            'frame': None,
+            'upload': upload,
+            'loader': loader,
+            'load_lock': threading.Lock(),
+            'filename': filename,
+            'file_size': file_size,
+            'metadata': metadata or {},
+            'content_hash': content_hash,
+            # 解析前按文件大小估算内存占用
+            'memory': int(file_size or 0),
+            'created_at': now,
+            'last_access': now,
+        }
+        with DatasetRegistry._lock:
+            DatasetRegistry._datasets[dataset_id] = entry
+            DatasetRegistry._evict_locked(now)
+        return dataset_id
+
+    @staticmethod
+    def _frame(entry):
+        """取出条目的DataFrame，延迟注册的数据集在此时解析（同一数据集只解析一次）"""
+        if entry['frame'] is not None:
+            return entry['frame']
+        with entry['load_lock']:
+            if entry['frame'] is None:
+                upload = entry['upload']
+                try:
+                    upload.seek(0)
+                    df = entry['loader']()
+                except Exception:
+                    # 解析失败的数据集移除，之后按数据集不存在处理
+                    with DatasetRegistry._lock:
+                        for dataset_id, value in list(DatasetRegistry._datasets.items()):
+                            if value is entry:
+                                del DatasetRegistry._datasets[dataset_id]
+                    raise
+                finally:
+                    upload.release()
+                with DatasetRegistry._lock:
+                    entry['memory'] = DatasetRegistry._memory_usage(df)
+                    entry['frame'] = df
+                    entry['loader'] = entry['upload'] = None
+        return entry['frame']
+
+    @staticmethod
+    def find_frame(content_hash):
+        """
+        查找内容相同的已注册数据集
+
+        Args:
+            content_hash: 文件内容哈希
+
+        Returns:
+            pd.DataFrame 或 None：共享的只读DataFrame，可直接用于注册新的数据集会话
+        """
+        now = time.time()
+        with DatasetRegistry._lock:
+            DatasetRegistry._evict_locked(now)
+            for entry in reversed(DatasetRegistry._datasets.values()):
+                # 尚未解析的数据集跳过
+                if content_hash and entry['content_hash'] == content_hash and entry['frame'] is not None:
+                    return entry['frame']
+        return None
+
+    @staticmethod
+    def _touch(dataset_id):
+        """取出数据集条目并刷新访问时间，不存在或已过期时返回None"""
+        now = time.time()
+        with DatasetRegistry._lock:
+            DatasetRegistry._evict_locked(now)
+            entry = DatasetRegistry._datasets.get(dataset_id)
+            if entry is None:
+                return None
+            entry['last_access'] = now
+            DatasetRegistry._datasets.move_to_end(dataset_id)
+            return entry
+
+    @staticmethod
+    def get(dataset_id):
+        """
+        获取数据集的DataFrame（浅拷贝）
+
+        Returns:
+            tuple: (DataFrame, 原始文件名)，不存在或已过期时返回 (None, None)
+        """
+        entry = DatasetRegistry._touch(dataset_id)
+        if entry is None:
+            return None, None
+        return DatasetRegistry._frame(entry).copy(deep=False), entry['filename']
+
+    @staticmethod
+    def content_hash(dataset_id):
+        """
+        获取数据集的原始文件内容哈希
+
+        Returns:
+            str 或 None：不存在、已过期或注册时没有提供哈希（如数据提取结果）时返回None
+        """
+        entry = DatasetRegistry._touch(dataset_id)
+        return entry['content_hash'] if entry is not None else None
+
+    @staticmethod
+    def describe(dataset_id):
+        """
+        获取数据集的元信息
+
+        Returns:
+            dict 或 None
+        """
+        entry = DatasetRegistry._touch(dataset_id)
+        if entry is None:
+            return None
+        df = DatasetRegistry._frame(entry)
+        return {
+            'dataset_id': dataset_id,
+            'filename': entry['filename'],
+            'file_size': entry['file_size'],
+            'total_rows': int(len(df)),
+            'total_columns': int(len(df.columns)),
+            'columns': df.columns.tolist(),
+            'memory_bytes': entry['memory'],
+            'created_at': entry['created_at'],
+            'expires_in': DATASET_TTL_SECONDS,
+            **entry['metadata'],
+        }
+
+    @staticmethod
+    def remove(dataset_id):
+        """
+        删除数据集
+
+        Returns:
+            bool: 是否存在并已删除
+        """
+        with DatasetRegistry._lock:
+            entry = DatasetRegistry._datasets.pop(dataset_id, None)
+            if entry is not None:
+                DatasetRegistry._discard(entry)
+            return entry is not None
+
+
+def resolve_request_source(req):
+    """
+    解析请求的数据来源：优先使用表单/查询参数中的dataset_id，否则使用上传的file
+
+    Args:
+        req: Flask request
+
+    Returns:
+        tuple: (数据来源, 文件名)，数据来源为DataFrame（dataset_id）或上传的文件对象
+
+    Raises:
+        DatasetInputError: 没有可用的数据来源
+    """
+    dataset_id = (req.form.get('dataset_id') or req.args.get('dataset_id') or '').strip()
+    if dataset_id:
+        df, filename = DatasetRegistry.get(dataset_id)
+        if df is None:
+            raise DatasetInputError("数据集不存在或已过期，请重新上传文件", "DATASET_NOT_FOUND", 404)
+        return df, filename
+
+    if 'file' not in req.files:
+        raise DatasetInputError("没有上传文件", "NO_FILE")
+    file = req.files['file']
+    if file.filename == '':
+        raise DatasetInputError("没有选择文件", "NO_FILENAME")
+    return file, file.filename
+
+
+def source_fingerprint(req, source):
+    """
+    数据来源的内容指纹，用作图表等结果缓存的键
+
+    上传文件为文件内容哈希；数据集会话为注册时的内容哈希，没有哈希时使用dataset_id
+    （已注册的数据集只读，dataset_id在其生命周期内对应固定内容）
+
+    Args:
+        req: Flask request
+        source: resolve_request_source 返回的数据来源
+
+    Returns:
+        str
+    """
+    if isinstance(source, pd.DataFrame):
+        dataset_id = (req.form.get('dataset_id') or req.args.get('dataset_id') or '').strip()
+        return DatasetRegistry.content_hash(dataset_id) or f"dataset-{dataset_id}"
+    return ProfileCache.hash_upload(source)
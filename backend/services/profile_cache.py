@@ -0,0 +1,126 @@
+"""
+上传文件画像缓存服务
+按文件内容哈希把 /get_csvfile 的画像结果保存到磁盘，重复上传同一文件时无需重新解析
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from config import PROFILE_CACHE_DIR, PROFILE_CACHE_MAX_ENTRIES
+from utils.serialization import dumps_bytes
+from utils.uploads import upload_content_hash
+
+
+class ProfileCache:
+    """
+    内容哈希键控的画像磁盘缓存
+
+    - 键为 文件内容哈希 + 画像模式 + 缓存格式版本，画像逻辑变化时递增版本即可使旧缓存失效
+    - 每个画像保存为一个JSON文件，先写临时文件再原子替换，多进程并发写入安全
+    - 命中时刷新文件修改时间，超出数量上限时按修改时间淘汰最久未使用的画像
+    """
+
+    # 画像结构或类型判断规则变化时递增
+    VERSION = 1
+    # 计算哈希时每次读取的字节数
+    _READ_BLOCK = 1024 * 1024
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def hash_upload(file):
+        """
+        计算上传文件内容的哈希（读取后把流复位到开头）
+
+        由 UploadRequest 接收的上传文件在写入时已计算哈希，直接返回，不再读取文件
+
+        Args:
+            file: Flask FileStorage对象或二进制文件对象
+
+        Returns:
+            str: 内容哈希（十六进制）
+        """
+        content_hash = upload_content_hash(file)
+        if content_hash is not None:
+            return content_hash
+        stream = getattr(file, 'stream', file)
+        stream.seek(0)
+        digest = hashlib.blake2b(digest_size=20)
+        for block in iter(lambda: stream.read(ProfileCache._READ_BLOCK), b''):
+            digest.update(block)
+        stream.seek(0)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _path(content_hash, mode):
+        return os.path.join(PROFILE_CACHE_DIR, f"v{ProfileCache.VERSION}-{mode}-{content_hash}.json")
+
+    @staticmethod
+    def get(content_hash, mode):
+        """
+        读取缓存的画像
+
+        Args:
+            content_hash: 文件内容哈希
+            mode: 画像模式（full/streaming/approximate）
+
+        Returns:
+            dict 或 None
+        """
+        path = ProfileCache._path(content_hash, mode)
+        try:
+            with open(path, 'r', encoding='utf-8') as cache_file:
+                result = json.load(cache_file)
+            os.utime(path)
+            return result
+        except (OSError, ValueError):
+            # 不存在、已被淘汰或内容损坏，按未命中处理
+            return None
+
+    @staticmethod
+    def put(content_hash, mode, result):
+        """
+        保存画像（写入失败只打印日志，不影响接口返回）
+
+        Args:
+            content_hash: 文件内容哈希
+            mode: 画像模式
+            result: 画像结果字典
+        """
+        temp_path = None
+        try:
+            os.makedirs(PROFILE_CACHE_DIR, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=PROFILE_CACHE_DIR, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as cache_file:
+                cache_file.write(dumps_bytes(result))
+            os.replace(temp_path, ProfileCache._path(content_hash, mode))
+            temp_path = None
+            ProfileCache._evict()
+        except (OSError, TypeError, ValueError) as e:
+            print(f"画像缓存写入失败: {e}")
+        finally:
+            if temp_path is not None:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _evict():
+        """按修改时间淘汰超出数量上限的画像"""
+        with ProfileCache._lock:
+            entries = []
+            for filename in os.listdir(PROFILE_CACHE_DIR):
+                if filename.endswith('.json'):
+                    path = os.path.join(PROFILE_CACHE_DIR, filename)
+                    try:
+                        entries.append((os.path.getmtime(path), path))
+                    except OSError:
+                        continue
+            entries.sort()
+            for _, path in entries[:max(0, len(entries) - PROFILE_CACHE_MAX_ENTRIES)]:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
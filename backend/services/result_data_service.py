@@ -0,0 +1,293 @@
+"""
+指标结果与死亡数据服务
+负责结果文件的缓存读取、死亡数据seqn索引以及服务端连接
+"""
+import os
+import threading
+from collections import OrderedDict, defaultdict
+import numpy as np
+import pandas as pd
+from utils.http_cache import file_fingerprint, directory_fingerprint
+from utils.serialization import convert_to_serializable, array_to_list
+
+
+class ResultDataService:
+    """指标结果/死亡数据处理服务类"""
+
+    # 最多缓存的结果文件数量（单个结果文件约2-5MB）
+    _FRAME_CACHE_SIZE = 32
+
+    # 摘要统计的分位数与直方图分箱数
+    SUMMARY_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+    SUMMARY_HISTOGRAM_BINS = 20
+
+    _lock = threading.Lock()
+    _frame_cache = OrderedDict()  # file_path -> (fingerprint, DataFrame)
+    _mortality_cache = {}  # mort_dir -> (fingerprint, DataFrame indexed by seqn)
+    _summary_cache = {}  # file_path -> (fingerprint, summary dict)
+
+    @staticmethod
+    def load_frame(file_path):
+        """
+        读取CSV结果文件，按文件指纹缓存，文件未变化时直接返回缓存的DataFrame
+
+        调用方不应原地修改返回的DataFrame。
+
+        Args:
+            file_path: CSV文件路径
+
+        Returns:
+            pd.DataFrame
+        """
+        fingerprint = file_fingerprint(file_path)
+        with ResultDataService._lock:
+            cached = ResultDataService._frame_cache.get(file_path)
+            if cached and cached[0] == fingerprint:
+                ResultDataService._frame_cache.move_to_end(file_path)
+                return cached[1]
+
+        df = pd.read_csv(file_path)
+
+        with ResultDataService._lock:
+            ResultDataService._frame_cache[file_path] = (fingerprint, df)
+            ResultDataService._frame_cache.move_to_end(file_path)
+            while len(ResultDataService._frame_cache) > ResultDataService._FRAME_CACHE_SIZE:
+                ResultDataService._frame_cache.popitem(last=False)
+        return df
+
+    @staticmethod
+    def mortality_index(mort_dir):
+        """
+        获取合并后的死亡数据，以seqn为索引（pandas哈希索引），目录内文件变化时自动重建
+
+        Args:
+            mort_dir: 死亡数据目录，包含 *_mort.csv 文件
+
+        Returns:
+            pd.DataFrame: 以seqn为索引、包含cycle列的合并死亡数据
+        """
+        fingerprint = directory_fingerprint(mort_dir, '_mort.csv')
+        with ResultDataService._lock:
+            cached = ResultDataService._mortality_cache.get(mort_dir)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+
+        frames = []
+        for filename in sorted(os.listdir(mort_dir)):
+            if not filename.endswith('_mort.csv'):
+                continue
+            df = pd.read_csv(os.path.join(mort_dir, filename))
+            df['cycle'] = filename.replace('_mort.csv', '')
+            frames.append(df)
+        if not frames:
+            raise FileNotFoundError(f"死亡数据目录中没有 *_mort.csv 文件: {mort_dir}")
+
+        combined = pd.concat(frames, ignore_index=True)
+        combined = combined.drop_duplicates(subset='seqn', keep='last').set_index('seqn')
+        # 预先触发哈希索引构建，后续join直接按键查找
+        if len(combined):
+            combined.index.get_loc(combined.index[0])
+
+        with ResultDataService._lock:
+            ResultDataService._mortality_cache[mort_dir] = (fingerprint, combined)
+        return combined
+
+    @staticmethod
+    def cycle_start_years(seqn):
+        """从 '<seqn>_<起始年份>' 格式的seqn中解析周期起始年份"""
+        return pd.to_numeric(seqn.astype(str).str.rsplit('_', n=1).str[-1], errors='coerce')
+
+    @staticmethod
+    def cycle_labels(seqn):
+        """由seqn解析周期标签，如 '1999-2000'，无法解析时为 'unknown'"""
+        years = ResultDataService.cycle_start_years(seqn).astype('Int64')
+        labels = years.astype(str) + '-' + (years + 1).astype(str)
+        return labels.where(years.notna(), 'unknown')
+
+    @staticmethod
+    def indicator_summary(file_path):
+        """
+        获取结果文件的按周期摘要统计，每个文件版本只计算一次
+
+        Args:
+            file_path: 结果CSV文件路径
+
+        Returns:
+            dict: 见 summarize_frame
+        """
+        fingerprint = file_fingerprint(file_path)
+        with ResultDataService._lock:
+            cached = ResultDataService._summary_cache.get(file_path)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+
+        summary = ResultDataService.summarize_frame(ResultDataService.load_frame(file_path))
+
+        with ResultDataService._lock:
+            ResultDataService._summary_cache[file_path] = (fingerprint, summary)
+        return summary
+
+    @staticmethod
+    def summarize_frame(df):
+        """
+        按周期和数值列计算摘要统计
+
+        每个周期（以及全部数据'all'）的每个数值列包含：计数、缺失数、缺失率、均值、
+        标准差、最小/最大值、固定分位数，以及基于该列全局范围等宽分箱的直方图，
+        因此不同周期的直方图可以直接对比。
+
+        Args:
+            df: 含seqn列的结果DataFrame
+
+        Returns:
+            dict: {"cycles": [...], "columns": [...], "quantiles": [...],
+                   "summary": {周期: {列名: 统计}}}
+        """
+        numeric = df.select_dtypes(include=['number'])
+        quantiles = list(ResultDataService.SUMMARY_QUANTILES)
+        bins = ResultDataService.SUMMARY_HISTOGRAM_BINS
+
+        edges = {}
+        for col in numeric.columns:
+            col_min, col_max = numeric[col].min(), numeric[col].max()
+            if pd.isna(col_min):
+                edges[col] = None
+            elif col_min == col_max:
+                edges[col] = np.linspace(col_min - 0.5, col_max + 0.5, bins + 1)
+            else:
+                edges[col] = np.linspace(col_min, col_max, bins + 1)
+
+        if 'seqn' in df.columns:
+            cycles = ResultDataService.cycle_labels(df['seqn'])
+            groups = [('all', numeric)] + list(numeric.groupby(cycles, sort=True))
+        else:
+            groups = [('all', numeric)]
+
+        summary = {}
+        for label, part in groups:
+            counts = part.count()
+            means = part.mean()
+            stds = part.std()
+            mins = part.min()
+            maxs = part.max()
+            quantile_values = part.quantile(quantiles)
+
+            cycle_stats = {}
+            for col in numeric.columns:
+                count = int(counts[col])
+                missing = int(len(part) - count)
+                histogram = None
+                if edges[col] is not None:
+                    hist_counts, _ = np.histogram(part[col].dropna(), bins=edges[col])
+                    histogram = {
+                        "edges": array_to_list(edges[col]),
+                        "counts": hist_counts.tolist()
+                    }
+                cycle_stats[col] = {
+                    "count": count,
+                    "missing": missing,
+                    "missing_rate": convert_to_serializable(missing / len(part)) if len(part) else None,
+                    "mean": convert_to_serializable(means[col]),
+                    "std": convert_to_serializable(stds[col]),
+                    "min": convert_to_serializable(mins[col]),
+                    "max": convert_to_serializable(maxs[col]),
+                    "quantiles": {
+                        f"p{int(round(q * 100)):02d}": convert_to_serializable(quantile_values.at[q, col])
+                        for q in quantiles
+                    },
+                    "histogram": histogram
+                }
+            summary[str(label)] = cycle_stats
+
+        return {
+            "cycles": [label for label in summary if label != 'all'],
+            "columns": list(numeric.columns),
+            "quantiles": quantiles,
+            "row_count": int(len(df)),
+            "summary": summary
+        }
+
+    @staticmethod
+    def join_with_mortality(indicator_paths, mort_dir, start_year=None, end_year=None,
+                            columns=None, eligible_only=True, how='inner'):
+        """
+        将一个或多个指标结果与关联死亡数据按seqn连接
+
+        Args:
+            indicator_paths: dict，指标名 -> 结果文件路径（保持请求顺序）
+            mort_dir: 死亡数据目录
+            start_year: 周期起始年份下限（含），如 1999
+            end_year: 周期起始年份上限（含），如 2009
+            columns: 需要保留的列（投影），None表示全部列；seqn和cycle始终保留
+            eligible_only: 是否只保留 eligstat == 1 的参与者
+            how: 与死亡数据的连接方式，'inner' 或 'left'
+
+        Returns:
+            pd.DataFrame: 连接后的分析数据
+
+        Raises:
+            ValueError: 参数不合法或投影列不存在
+        """
+        if how not in ('inner', 'left'):
+            raise ValueError(f"不支持的连接方式: {how}")
+
+        wanted = None
+        if columns:
+            wanted = {col.lower() for col in columns}
+
+        # 同一列名出现在多个指标中时，用 指标名_列名 区分（与批量合并的命名规则一致）
+        frames = {name: ResultDataService.load_frame(path) for name, path in indicator_paths.items()}
+        column_usage = defaultdict(set)
+        for name, df in frames.items():
+            for col in df.columns:
+                if col != 'seqn':
+                    column_usage[col].add(name)
+
+        available = {'seqn', 'cycle'}
+        merged = None
+        for name, df in frames.items():
+            rename_map = {}
+            keep = ['seqn']
+            for col in df.columns:
+                if col == 'seqn':
+                    continue
+                out_name = col if len(column_usage[col]) == 1 else f"{name}_{col}"
+                available.update((col.lower(), out_name.lower()))
+                if wanted is not None and out_name.lower() not in wanted and col.lower() not in wanted:
+                    continue
+                keep.append(col)
+                rename_map[col] = out_name
+            part = df[keep].rename(columns=rename_map)
+
+            if start_year is not None or end_year is not None:
+                years = ResultDataService.cycle_start_years(part['seqn'])
+                mask = pd.Series(True, index=part.index)
+                if start_year is not None:
+                    mask &= years >= start_year
+                if end_year is not None:
+                    mask &= years <= end_year
+                part = part[mask]
+
+            merged = part if merged is None else pd.merge(merged, part, on='seqn', how='outer')
+
+        mortality = ResultDataService.mortality_index(mort_dir)
+        available.update(col.lower() for col in mortality.columns)
+        if wanted is not None:
+            missing = sorted(wanted - available)
+            if missing:
+                raise ValueError(f"以下列不存在: {missing}")
+
+        if eligible_only:
+            mortality = mortality[mortality['eligstat'] == 1]
+        mort_columns = [
+            col for col in mortality.columns
+            if col == 'cycle' or wanted is None or col.lower() in wanted
+        ]
+
+        joined = merged.join(mortality[mort_columns], on='seqn', how=how)
+        if how == 'left':
+            # 未关联到死亡数据的参与者，由seqn后缀补全周期
+            joined['cycle'] = joined['cycle'].fillna(ResultDataService.cycle_labels(joined['seqn']))
+
+        ordered = ['seqn', 'cycle'] + [col for col in joined.columns if col not in ('seqn', 'cycle')]
+        return joined[ordered].reset_index(drop=True)
@@ -0,0 +1,352 @@
+"""
+流式CSV画像服务
+按块读取大文件，累积可合并的列统计量，内存占用与文件大小无关
+"""
+import numpy as np
+import pandas as pd
+from config import STREAMING_PROFILE_CHUNK_ROWS, PROFILE_DISTINCT_LIMIT
+from services.column_profiler import ColumnProfiler
+from utils.serialization import convert_to_serializable, frame_to_records
+from utils.sketches import HyperLogLog, KLLSketch, HeavyHitters, hash_values
+
+# 列值类型由窄到宽，跨块取最宽者（与pandas一次性读取的推断结果一致）
+_KIND_ORDER = {'empty': 0, 'int': 1, 'float': 2, 'object': 3}
+
+
+class ColumnAccumulator:
+    """
+    单列的可合并统计量
+
+    计数、最小/最大值、均值与二阶中心矩（Chan并行合并公式）、整数判断，
+    以及取值计数（用于唯一值个数和高频值）。取值个数超过上限后停止精确计数，
+    改用草图：HyperLogLog估计唯一值个数，Misra-Gries给出高频值；
+    数值列另用KLL草图估计分位数。所有草图都可合并，内存有界。
+    """
+
+    # 高频值摘要的计数器个数
+    HEAVY_HITTER_CAPACITY = 64
+
+    def __init__(self, name, distinct_limit=PROFILE_DISTINCT_LIMIT):
+        self.name = name
+        self.distinct_limit = distinct_limit
+        self.kind = 'empty'
+        self.is_bool = None
+        self.rows = 0
+        self.count = 0
+        self.numeric_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.is_integer = True
+        self.value_counts = {}
+        self.distinct_overflow = False
+        self.distinct_lower_bound = 0
+        self.distinct = HyperLogLog()
+        self.quantile_sketch = KLLSketch()
+        self.heavy_hitters = HeavyHitters(self.HEAVY_HITTER_CAPACITY)
+
+    @staticmethod
+    def _series_kind(series):
+        """块内列的值类型"""
+        if series.count() == 0:
+            return 'empty'
+        if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_object_dtype(series.dtype):
+            return 'object'
+        if pd.api.types.is_integer_dtype(series.dtype):
+            return 'int'
+        if pd.api.types.is_float_dtype(series.dtype):
+            return 'float'
+        return 'object'
+
+    def update(self, series):
+        """累积一个数据块中的该列"""
+        other = ColumnAccumulator(self.name, self.distinct_limit)
+        other.rows = int(len(series))
+        other.count = int(series.count())
+        other.kind = self._series_kind(series)
+        other.is_bool = pd.api.types.is_bool_dtype(series.dtype) if other.count else None
+
+        if other.kind in ('int', 'float'):
+            values = series.to_numpy()
+            if other.kind == 'float':
+                values = values[~np.isnan(values)]
+            other.numeric_count = int(len(values))
+            other.min = values.min()
+            other.max = values.max()
+            as_float = values.astype(np.float64)
+            other.mean = float(as_float.mean())
+            other.m2 = float(((as_float - other.mean) ** 2).sum())
+            other.quantile_sketch.update(as_float)
+            if other.kind == 'float':
+                with np.errstate(invalid='ignore'):
+                    other.is_integer = bool(np.all(
+                        (values == np.floor(values)) & (values >= -2.0 ** 63) & (values < 2.0 ** 63)
+                    ))
+
+        if other.count:
+            counts = series.value_counts()
+            # 草图只需处理块内的不同取值
+            other.distinct.update_hashes(hash_values(counts.index))
+            other.heavy_hitters.update_counts(counts)
+            if len(counts) > self.distinct_limit:
+                other.distinct_overflow = True
+                other.distinct_lower_bound = int(len(counts))
+                other.value_counts = None
+            else:
+                other.value_counts = dict(zip(counts.index.tolist(), counts.tolist()))
+
+        self.merge(other)
+
+    def merge(self, other):
+        """合并另一个同列累积器（可来自其他块或其他进程）"""
+        if _KIND_ORDER[other.kind] > _KIND_ORDER[self.kind]:
+            self.kind = other.kind
+        if other.is_bool is not None:
+            self.is_bool = other.is_bool if self.is_bool is None else (self.is_bool and other.is_bool)
+
+        if other.numeric_count:
+            total = self.numeric_count + other.numeric_count
+            delta = other.mean - self.mean
+            self.mean += delta * other.numeric_count / total
+            self.m2 += other.m2 + delta * delta * self.numeric_count * other.numeric_count / total
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+            self.is_integer = self.is_integer and other.is_integer
+            self.numeric_count = total
+
+        self.rows += other.rows
+        self.count += other.count
+        self.distinct.merge(other.distinct)
+        self.quantile_sketch.merge(other.quantile_sketch)
+        self.heavy_hitters.merge(other.heavy_hitters)
+
+        self.distinct_lower_bound = max(self.distinct_lower_bound, other.distinct_lower_bound)
+        if self.distinct_overflow or other.distinct_overflow:
+            self._drop_value_counts()
+        elif other.value_counts:
+            for value, value_count in other.value_counts.items():
+                self.value_counts[value] = self.value_counts.get(value, 0) + value_count
+            if len(self.value_counts) > self.distinct_limit:
+                self._drop_value_counts()
+
+    def _drop_value_counts(self):
+        """取值过多，放弃精确计数，改用草图"""
+        if self.value_counts:
+            self.distinct_lower_bound = max(self.distinct_lower_bound, len(self.value_counts))
+        self.value_counts = None
+        self.distinct_overflow = True
+
+    @property
+    def unique_count(self):
+        """唯一值个数；超过上限时为HyperLogLog估计值"""
+        if self.distinct_overflow:
+            return max(self.distinct_lower_bound, self.distinct.estimate())
+        return len(self.value_counts)
+
+    def is_numeric(self):
+        """列是否为数值类型（任一块出现非数值内容即按对象列处理）"""
+        return self.kind in ('int', 'float') and not self.is_bool
+
+    def to_profile(self):
+        """转换为 ColumnProfiler.classify_column 可用的列画像"""
+        if self.is_numeric():
+            dtype_class = 'numeric'
+            dtype = 'int64' if self.kind == 'int' and self.count == self.rows else 'float64'
+        else:
+            dtype_class = 'categorical'
+            dtype = 'bool' if self.is_bool and self.kind != 'empty' else 'object'
+            if self.kind == 'empty':
+                # 全部为空的列，pandas读取为float64
+                dtype_class, dtype = 'numeric', 'float64'
+
+        numeric_count = self.numeric_count
+        profile = {
+            "dtype": dtype,
+            "dtype_class": dtype_class,
+            "count": self.count,
+            "null_count": self.rows - self.count,
+            "unique_count": self.unique_count,
+            "unique_count_exact": not self.distinct_overflow,
+        }
+        if dtype_class == 'numeric':
+            profile.update({
+                "min": self.min if self.min is not None else np.nan,
+                "max": self.max if self.max is not None else np.nan,
+                "mean": self.mean if numeric_count else np.nan,
+                "std": float(np.sqrt(self.m2 / (numeric_count - 1))) if numeric_count > 1 else np.nan,
+                "is_integer": self.is_integer,
+                "quantiles": dict(zip(
+                    ("p25", "p50", "p75"), self.quantile_sketch.quantiles([0.25, 0.5, 0.75])
+                )),
+            })
+        exact = self.value_counts is not None
+        source_counts = self.value_counts if exact else self.heavy_hitters.counters
+        value_counts = source_counts
+        if dtype == 'object':
+            # 某些块按数值解析、其他块含文本时，完整读取会把整列作为文本，按文本合并计数
+            value_counts = {}
+            for value, value_count in source_counts.items():
+                key = str(value)
+                value_counts[key] = value_counts.get(key, 0) + value_count
+            if exact:
+                profile["unique_count"] = len(value_counts)
+        elif dtype == 'float64':
+            value_counts = {float(value): value_count for value, value_count in value_counts.items()}
+        top = sorted(value_counts.items(), key=lambda item: -item[1])[:ColumnProfiler.TOP_VALUES]
+        profile["top_values"] = top
+        if not exact:
+            # Misra-Gries计数为下界
+            profile["top_values_max_error"] = self.heavy_hitters.max_error
+        return profile
+
+
+class StreamingProfiler:
+    """按块读取CSV并生成与 CSVService.parse_csv_file 相同结构的画像"""
+
+    PREVIEW_ROWS = 100
+    FULL_DATA_ROWS = 1000
+
+    @staticmethod
+    def accumulate(file, chunk_rows=STREAMING_PROFILE_CHUNK_ROWS, approximate=False):
+        """
+        逐块累积列统计量
+
+        Args:
+            file: 文件路径或文件对象
+            chunk_rows: 每块行数
+            approximate: 为True时所有列直接使用草图，不做精确取值计数
+
+        Returns:
+            tuple: (列名 -> ColumnAccumulator 的有序字典, 文件开头的前若干行DataFrame)，
+                   空文件时DataFrame为None
+        """
+        accumulators = {}
+        head = None
+        for chunk in pd.read_csv(file, keep_default_na=True, chunksize=chunk_rows):
+            if head is None:
+                head = chunk.head(StreamingProfiler.FULL_DATA_ROWS)
+                distinct_limit = 0 if approximate else PROFILE_DISTINCT_LIMIT
+                accumulators = {col: ColumnAccumulator(col, distinct_limit) for col in chunk.columns}
+            elif len(head) < StreamingProfiler.FULL_DATA_ROWS:
+                head = pd.concat([head, chunk.head(StreamingProfiler.FULL_DATA_ROWS - len(head))])
+            for col in chunk.columns:
+                accumulators[col].update(chunk[col])
+        return accumulators, head
+
+    @staticmethod
+    def profile_csv(file, file_length, chunk_rows=STREAMING_PROFILE_CHUNK_ROWS, approximate=False):
+        """
+        流式生成CSV画像
+
+        Args:
+            file: Flask FileStorage对象、文件路径或文件对象
+            file_length: 文件大小（字节）
+            chunk_rows: 每块行数
+            approximate: 近似画像模式，唯一值个数和高频值全部由草图给出
+
+        Returns:
+            dict: 同 CSVService.parse_csv_file，另含 profile_mode（streaming/approximate），
+                  使用了草图时另含 approximation（各草图的误差界）
+
+        Raises:
+            ValueError: 文件为空
+        """
+        accumulators, head = StreamingProfiler.accumulate(file, chunk_rows, approximate)
+        if head is None or not accumulators:
+            raise ValueError("CSV文件为空")
+
+        profiles = {col: acc.to_profile() for col, acc in accumulators.items()}
+        total_rows = next(iter(accumulators.values())).rows
+        result = StreamingProfiler.build_result(profiles, head, file_length, total_rows)
+        result["profile_mode"] = "approximate" if approximate else "streaming"
+
+        approximate_columns = [col for col, acc in accumulators.items() if acc.distinct_overflow]
+        if approximate_columns:
+            sample = accumulators[approximate_columns[0]]
+            result["approximation"] = {
+                "approximate_columns": approximate_columns,
+                "distinct_relative_error": convert_to_serializable(sample.distinct.relative_error),
+                "quantile_rank_error": convert_to_serializable(sample.quantile_sketch.rank_error),
+                "top_values": "计数为下界，低估量不超过该列的 top_values_max_error",
+            }
+        return result
+
+    @staticmethod
+    def build_result(profiles, head, file_length, total_rows):
+        """由列画像和文件开头的行组装与 parse_csv_file 相同结构的结果"""
+        numeric_columns, categorical_columns, datetime_columns = [], [], []
+        for col, profile in profiles.items():
+            col_type = ColumnProfiler.classify_column(col, profile)
+            if col_type == 'numeric':
+                numeric_columns.append(col)
+            elif col_type == 'datetime':
+                datetime_columns.append(col)
+            else:
+                categorical_columns.append(col)
+
+        file_stats = {
+            "total_rows": int(total_rows),
+            "total_columns": int(len(profiles)),
+            "numeric_columns_count": int(len(numeric_columns)),
+            "categorical_columns_count": int(len(categorical_columns)),
+            "datetime_columns_count": int(len(datetime_columns)),
+            "missing_values_total": int(sum(profile["null_count"] for profile in profiles.values())),
+            "file_size": int(file_length)
+        }
+
+        columns_info = []
+        numeric_set = set(numeric_columns)
+        for col, profile in profiles.items():
+            col_info = {
+                "name": col,
+                "type": str(profile["dtype"]),
+                "non_null_count": profile["count"],
+                "null_count": profile["null_count"],
+                "unique_count": profile["unique_count"],
+                "unique_count_exact": profile["unique_count_exact"],
+            }
+            if col in numeric_set:
+                col_info.update({
+                    "data_type": "numeric",
+                    "min_value": convert_to_serializable(profile["min"]),
+                    "max_value": convert_to_serializable(profile["max"]),
+                    "mean_value": convert_to_serializable(profile["mean"]),
+                    "std_value": convert_to_serializable(profile["std"]),
+                    "quantiles": {name: convert_to_serializable(value)
+                                  for name, value in profile["quantiles"].items()},
+                })
+            else:
+                top_values = profile.get("top_values") or []
+                col_info.update({
+                    "data_type": "categorical",
+                    "top_values": {str(k): convert_to_serializable(v) for k, v in top_values}
+                })
+                if "top_values_max_error" in profile:
+                    col_info["top_values_max_error"] = convert_to_serializable(profile["top_values_max_error"])
+            columns_info.append(col_info)
+
+        # 文件开头的块可能推断出更窄的类型，按整列的最终类型对齐预览数据
+        head = head.copy()
+        for col, profile in profiles.items():
+            if profile["dtype"] == 'float64' and head[col].dtype != np.float64:
+                head[col] = head[col].astype(np.float64)
+            elif profile["dtype"] == 'object' and head[col].dtype != object:
+                head[col] = head[col].astype(object).where(head[col].isna(), head[col].astype(str))
+
+        full_data = frame_to_records(head)
+
+        return {
+            "file_stats": file_stats,
+            "columns": list(profiles),
+            "columns_info": columns_info,
+            "numeric_columns": numeric_columns,
+            "categorical_columns": categorical_columns,
+            "datetime_columns": datetime_columns,
+            "preview_data": full_data[:StreamingProfiler.PREVIEW_ROWS],
+            "full_data": full_data,
+            "data_truncated": total_rows > len(head),
+            "total_rows": int(total_rows),
+            "total_columns": int(len(profiles)),
+            "profile_mode": "streaming"
+        }
@@ -0,0 +1,295 @@
+"""
+列类型抽样推断服务
+/get_file_columns 先用表头加抽样行快速给出列类型，再在后台读取完整文件校验
+"""
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from config import (
+    TYPE_INFERENCE_SAMPLE_ROWS, TYPE_INFERENCE_HEAD_ROWS, TYPE_INFERENCE_FULL_READ_BYTES,
+    DATASET_TTL_SECONDS
+)
+from services.csv_service import CSVService
+from services.column_profiler import ColumnProfiler, STRONG_CATEGORICAL_KEYWORDS
+from utils.uploads import retain_upload
+
+
+class SampledTypeInference:
+    """
+    抽样列类型推断
+
+    - 抽样：文件开头若干行 + 按随机字节偏移定位的整行（可seek的流），
+      不可seek的流退化为对全部行做蓄水池抽样
+    - 置信规则：判断不会随更多数据改变、或取值集合已经抽全的列视为可信，其余列标记为低置信
+    - 后台校验：完整解析文件后更新缓存的列画像，并记录类型发生变化的列；
+      直接读取接收上传时已保存的临时存储，请求线程不复制文件
+    """
+
+    # 低置信判断所需的最少非空样本数
+    _MIN_CONFIDENT_COUNT = 50
+    # 缓存的推断结果数量上限
+    _MAX_PROFILES = 128
+
+    _lock = threading.Lock()
+    _profiles = OrderedDict()  # profile_token -> {"result", "inference", "updated_at"}
+    _executor = None
+
+    @staticmethod
+    def read_sample(file):
+        """
+        读取表头和抽样行
+
+        Args:
+            file: Flask FileStorage对象或二进制文件对象
+
+        Returns:
+            tuple: (抽样DataFrame, 是否已包含全部行)
+        """
+        stream = getattr(file, 'stream', file)
+        try:
+            stream.seek(0, os.SEEK_END)
+            size = stream.tell()
+            stream.seek(0)
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return SampledTypeInference._reservoir_sample(stream)
+
+        if size <= TYPE_INFERENCE_FULL_READ_BYTES:
+            return CSVService.read_csv_file(stream), True
+
+        header = stream.readline()
+        lines = []
+        for _ in range(TYPE_INFERENCE_HEAD_ROWS):
+            line = stream.readline()
+            if not line:
+                return SampledTypeInference._parse_lines(header, lines), True
+            lines.append(line)
+
+        # 随机字节偏移：丢弃偏移所在的半行，取下一整行；偏移排序后只向前seek
+        data_start = stream.tell()
+        rng = random.Random(size)
+        offsets = sorted(
+            rng.randrange(data_start, size)
+            for _ in range(TYPE_INFERENCE_SAMPLE_ROWS - len(lines))
+        )
+        taken = set()
+        for offset in offsets:
+            stream.seek(offset)
+            stream.readline()
+            start = stream.tell()
+            if start >= size or start in taken:
+                continue
+            taken.add(start)
+            lines.append(stream.readline())
+
+        stream.seek(0)
+        return SampledTypeInference._parse_lines(header, lines), False
+
+    @staticmethod
+    def _reservoir_sample(stream):
+        """对不可seek的流做蓄水池抽样（Algorithm R），保留表头"""
+        header = stream.readline()
+        rng = random.Random(0)
+        reservoir = []
+        seen = 0
+        for line in iter(stream.readline, b''):
+            if seen < TYPE_INFERENCE_SAMPLE_ROWS:
+                reservoir.append(line)
+            else:
+                slot = rng.randint(0, seen)
+                if slot < TYPE_INFERENCE_SAMPLE_ROWS:
+                    reservoir[slot] = line
+            seen += 1
+        return SampledTypeInference._parse_lines(header, reservoir), seen <= TYPE_INFERENCE_SAMPLE_ROWS
+
+    @staticmethod
+    def _parse_lines(header, lines):
+        """把表头和抽样行拼回CSV后解析；跨行引号等导致列数不符的抽样行直接跳过"""
+        lines = [line if line.endswith(b'\n') else line + b'\n' for line in lines]
+        buffer = io.BytesIO(header + b''.join(lines))
+        return pd.read_csv(buffer, keep_default_na=True, on_bad_lines='skip')
+
+    @staticmethod
+    def is_confident(name, profile):
+        """
+        判断抽样得到的列类型是否可信
+
+        - 抽样中已是非数值类型：完整文件中同样是非数值，可信
+        - 唯一值个数已超过所有分类阈值：唯一值只会随数据增加而增多，判断不会再变
+        - 名称含'id'的列、11-50个唯一值的整数列：判断依赖唯一值占比，随总行数变化，不可信
+        - 其余低基数列：每个取值都至少出现两次（Good-Turing估计的未见值概率为0）才可信
+
+        Args:
+            name: 列名
+            profile: 抽样数据上的列画像，需包含 singletons（只出现一次的取值个数）
+
+        Returns:
+            bool
+        """
+        if profile["dtype_class"] != 'numeric':
+            return True
+        if profile["count"] < SampledTypeInference._MIN_CONFIDENT_COUNT:
+            return False
+
+        col_lower = name.lower()
+        has_keyword = any(keyword in col_lower for keyword in STRONG_CATEGORICAL_KEYWORDS)
+        unique_count = profile["unique_count"]
+        if not has_keyword and 'id' in col_lower:
+            return False
+        if unique_count > (100 if has_keyword else 50):
+            return True
+        if not has_keyword and profile["is_integer"] and unique_count > 10:
+            return False
+        return profile["singletons"] == 0
+
+    @staticmethod
+    def infer_columns(file):
+        """
+        抽样推断列类型，未读完整个文件时提交后台完整校验
+
+        Args:
+            file: Flask FileStorage对象
+
+        Returns:
+            dict: 格式同 CSVService.get_file_columns，另含 inference 字段：
+                  mode、sample_rows、status（verified/pending/failed）、
+                  low_confidence_columns、changed_columns、profile_token
+        """
+        sample_df, complete = SampledTypeInference.read_sample(file)
+        profiles = ColumnProfiler.profile(sample_df)
+        result = CSVService.get_dataframe_columns(sample_df, profiles)
+
+        low_confidence = []
+        if not complete:
+            for col in sample_df.columns:
+                profile = profiles[col]
+                if profile["dtype_class"] == 'numeric':
+                    counts = sample_df[col].value_counts()
+                    profile = {**profile, "singletons": int((counts == 1).sum())}
+                if not SampledTypeInference.is_confident(col, profile):
+                    low_confidence.append(col)
+
+        token = uuid.uuid4().hex
+        inference = {
+            "mode": "full" if complete else "sample",
+            "sample_rows": int(len(sample_df)),
+            "status": "verified" if complete else "pending",
+            "low_confidence_columns": low_confidence,
+            "changed_columns": [],
+            "profile_token": token,
+        }
+        SampledTypeInference._store(token, result, inference)
+
+        if not complete:
+            # 保留上传文件供后台校验读取；不是由 UploadRequest 接收的文件流随请求关闭，只能先复制
+            source = retain_upload(file)
+            if source is None:
+                stream = getattr(file, 'stream', file)
+                stream.seek(0)
+                with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp_file:
+                    shutil.copyfileobj(stream, tmp_file)
+                    source = tmp_file.name
+            SampledTypeInference._get_executor().submit(SampledTypeInference._verify, token, source)
+
+        return {**result, "inference": dict(inference)}
+
+    @staticmethod
+    def get_profile(token):
+        """
+        获取缓存的推断结果（后台校验完成后为完整文件上的结果）
+
+        Returns:
+            dict 或 None
+        """
+        with SampledTypeInference._lock:
+            SampledTypeInference._evict_locked(time.time())
+            entry = SampledTypeInference._profiles.get(token)
+            if entry is None:
+                return None
+            return {**entry["result"], "inference": dict(entry["inference"])}
+
+    @staticmethod
+    def _get_executor():
+        """后台校验线程池（单线程，避免多个大文件同时完整解析）"""
+        with SampledTypeInference._lock:
+            if SampledTypeInference._executor is None:
+                SampledTypeInference._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='column-type-verify'
+                )
+            return SampledTypeInference._executor
+
+    @staticmethod
+    def _store(token, result, inference):
+        """保存推断结果"""
+        now = time.time()
+        with SampledTypeInference._lock:
+            SampledTypeInference._profiles[token] = {
+                "result": result,
+                "inference": inference,
+                "updated_at": now,
+            }
+            SampledTypeInference._profiles.move_to_end(token)
+            SampledTypeInference._evict_locked(now)
+
+    @staticmethod
+    def _evict_locked(now):
+        """清理过期和超出数量上限的推断结果（调用方需持有锁）"""
+        profiles = SampledTypeInference._profiles
+        for token in [key for key, entry in profiles.items()
+                      if now - entry["updated_at"] > DATASET_TTL_SECONDS]:
+            del profiles[token]
+        while len(profiles) > SampledTypeInference._MAX_PROFILES:
+            profiles.popitem(last=False)
+
+    @staticmethod
+    def _verify(token, source):
+        """
+        后台完整解析文件，更新缓存的列画像
+
+        Args:
+            token: 推断结果的profile_token
+            source: 保留的上传文件（校验后释放）或临时文件路径（校验后删除）
+        """
+        try:
+            with SampledTypeInference._lock:
+                entry = SampledTypeInference._profiles.get(token)
+            if entry is None:
+                return
+
+            if not isinstance(source, str):
+                source.seek(0)
+            full_result = CSVService.get_dataframe_columns(CSVService.read_csv_file(source))
+            sample_types = {option["value"]: option["type"] for option in entry["result"]["column_options"]}
+            changed = [
+                option["value"] for option in full_result["column_options"]
+                if sample_types.get(option["value"]) != option["type"]
+            ]
+            inference = {
+                **entry["inference"],
+                "mode": "full",
+                "status": "verified",
+                "low_confidence_columns": [],
+                "changed_columns": changed,
+            }
+            SampledTypeInference._store(token, full_result, inference)
+        except Exception as e:
+            print(f"列类型完整校验失败: {e}")
+            with SampledTypeInference._lock:
+                entry = SampledTypeInference._profiles.get(token)
+                if entry is not None:
+                    entry["inference"] = {**entry["inference"], "status": "failed", "error": str(e)}
+        finally:
+            if isinstance(source, str):
+                try:
+                    os.unlink(source)
+                except OSError:
+                    pass
+            else:
+                source.release()
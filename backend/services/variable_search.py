@@ -0,0 +1,303 @@
+"""
+变量检索服务
+将varLabel.json加载为内存索引，提供分级排序的变量搜索
+"""
+import bisect
+import heapq
+import json
+import os
+import re
+import threading
+from array import array
+from utils.http_cache import file_fingerprint
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_SEPARATOR = '\x00'
+
+
+def _tokens(text):
+    """将文本切分为小写字母数字词元"""
+    return _TOKEN_RE.findall(text)
+
+
+def _ngrams(text, n):
+    """返回文本中所有不重复的n元组"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class _Haystack:
+    """把同一字段的所有取值用分隔符拼成一个字符串，用str.find做C级别的子串扫描"""
+
+    def __init__(self, values):
+        self.text = _SEPARATOR.join(values)
+        self.offsets = []
+        position = 0
+        for value in values:
+            self.offsets.append(position)
+            position += len(value) + 1
+
+    def iter_matches(self, query):
+        """按条目顺序依次产出包含query的条目编号（不重复）"""
+        last_id = -1
+        start = self.text.find(query)
+        while start != -1:
+            entry_id = bisect.bisect_right(self.offsets, start) - 1
+            if entry_id != last_id:
+                yield entry_id
+                last_id = entry_id
+            # 跳到下一个条目，避免同一条目重复命中
+            next_entry = entry_id + 1
+            start = self.offsets[next_entry] if next_entry < len(self.offsets) else len(self.text)
+            start = self.text.find(query, start)
+
+
+class VariableSearchIndex:
+    """
+    varLabel.json的内存检索索引
+
+    - 变量名排序数组：精确匹配与前缀匹配（二分查找）
+    - 词元倒排索引：label和description的整词匹配
+    - 二元/三元组索引：variable和label的任意子串匹配
+    - description的任意子串匹配作为最低等级，用整段字符串扫描补足
+
+    排序：变量名精确匹配 > 变量名前缀 > label整词 > variable/label子串
+          > description整词 > description子串；前缀按字母顺序，其余同级按原始顺序。
+    各等级按顺序求值，名额填满即停止，热查询只触及少量候选。
+    """
+
+    _lock = threading.Lock()
+    _cache = {}  # json_path -> (fingerprint, VariableSearchIndex)
+
+    def __init__(self, entries):
+        self.entries = entries
+        self._variables = [(item.get('variable') or '').lower() for item in entries]
+        self._labels = [(item.get('label') or '').lower() for item in entries]
+        self._descriptions = [(item.get('description') or '').lower() for item in entries]
+
+        order = sorted(range(len(entries)), key=lambda i: (self._variables[i], i))
+        self._sorted_variable_keys = [self._variables[i] for i in order]
+        self._sorted_variable_ids = order
+
+        self._label_tokens = self._build_postings(_tokens(label) for label in self._labels)
+        self._description_tokens = self._build_postings(_tokens(desc) for desc in self._descriptions)
+        self._ngrams = self._build_postings(
+            _ngrams(variable, 2) | _ngrams(variable, 3) | _ngrams(label, 2) | _ngrams(label, 3)
+            for variable, label in zip(self._variables, self._labels)
+        )
+        # description中所有词元的n元组，用于快速排除不可能命中description子串的查询
+        description_grams = set()
+        for token in self._description_tokens:
+            description_grams.update(_ngrams(token, 2))
+            description_grams.update(_ngrams(token, 3))
+        self._description_grams = frozenset(description_grams)
+        self._description_haystack = _Haystack(self._descriptions)
+        self._variable_haystack = _Haystack(self._variables)
+        self._label_haystack = _Haystack(self._labels)
+
+        self._completions = {
+            'variable': self._build_completions(entries, 'variable'),
+            'file': self._build_completions(entries, 'file'),
+        }
+
+    @staticmethod
+    def _build_postings(keys_per_entry):
+        """构建倒排表：键 -> 按条目编号升序的紧凑整数数组"""
+        index = {}
+        for entry_id, keys in enumerate(keys_per_entry):
+            for key in set(keys):
+                postings = index.get(key)
+                if postings is None:
+                    postings = index[key] = array('i')
+                postings.append(entry_id)
+        return index
+
+    @staticmethod
+    def _build_completions(entries, field):
+        """
+        构建补全用的排序数组：小写键 -> 显示值、可用周期、关联文件/变量数量、标签
+
+        Returns:
+            tuple: (排序后的小写键列表, 与之对齐的补全条目列表)
+        """
+        grouped = {}
+        for item in entries:
+            value = (item.get(field) or '').strip()
+            if not value:
+                continue
+            key = value.lower()
+            info = grouped.get(key)
+            if info is None:
+                info = grouped[key] = {
+                    'value': value,
+                    'type': field,
+                    'cycles': set(),
+                    'related': set(),
+                    'label': item.get('label') or '',
+                }
+            if item.get('year'):
+                info['cycles'].add(str(item['year']))
+            related = item.get('variable' if field == 'file' else 'file')
+            if related:
+                info['related'].add(related)
+
+        keys = sorted(grouped)
+        completions = []
+        for key in keys:
+            info = grouped[key]
+            completion = {
+                'value': info['value'],
+                'type': field,
+                'cycles': sorted(info['cycles']),
+            }
+            if field == 'variable':
+                completion['label'] = info['label']
+                completion['files'] = sorted(info['related'])
+            else:
+                completion['variable_count'] = len(info['related'])
+            completions.append(completion)
+        return keys, completions
+
+    @classmethod
+    def load(cls, json_path):
+        """
+        加载（或从缓存获取）指定varLabel.json的索引，文件变化时自动重建
+
+        Args:
+            json_path: varLabel.json路径
+
+        Returns:
+            VariableSearchIndex
+
+        Raises:
+            OSError / ValueError: 文件读取或JSON解析失败
+        """
+        fingerprint = file_fingerprint(json_path)
+        with cls._lock:
+            cached = cls._cache.get(json_path)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+
+            with open(json_path, 'r', encoding='utf-8') as f:
+                index = cls(json.load(f))
+            cls._cache[json_path] = (fingerprint, index)
+            return index
+
+    @classmethod
+    def warm_up(cls, json_path):
+        """在后台线程中预先构建索引，避免首个搜索请求承担构建耗时"""
+        def _load():
+            try:
+                cls.load(json_path)
+            except Exception as e:
+                print(f"变量检索索引预加载失败: {e}")
+
+        if os.path.exists(json_path):
+            threading.Thread(target=_load, name='variable-index-warmup', daemon=True).start()
+
+    @staticmethod
+    def _rarest(postings_index, keys):
+        """返回各键倒排表中最短的一个；任一键不存在时返回空"""
+        shortest = None
+        for key in keys:
+            postings = postings_index.get(key)
+            if postings is None:
+                return ()
+            if shortest is None or len(postings) < len(shortest):
+                shortest = postings
+        return shortest or ()
+
+    def _iter_tiers(self, query):
+        """按等级从高到低依次产出候选条目编号，同级内按原始顺序"""
+        # 变量名精确/前缀匹配：排序数组中精确匹配总在前缀区间的最前面，前缀按字母顺序
+        keys = self._sorted_variable_keys
+        position = bisect.bisect_left(keys, query)
+        while position < len(keys) and keys[position].startswith(query):
+            yield self._sorted_variable_ids[position]
+            position += 1
+
+        # label整词：以最稀有的查询词元的倒排表为候选，再校验整个短语
+        query_tokens = _tokens(query)
+        if query_tokens:
+            for entry_id in self._rarest(self._label_tokens, query_tokens):
+                if query in self._labels[entry_id]:
+                    yield entry_id
+
+        # variable/label任意子串：以最稀有的n元组倒排表为候选
+        if len(query) >= 2:
+            grams = _ngrams(query, 3 if len(query) >= 3 else 2)
+            for entry_id in self._rarest(self._ngrams, grams):
+                if query in self._variables[entry_id] or query in self._labels[entry_id]:
+                    yield entry_id
+        else:
+            yield from heapq.merge(
+                self._variable_haystack.iter_matches(query),
+                self._label_haystack.iter_matches(query)
+            )
+
+        # description整词
+        if query_tokens:
+            for entry_id in self._rarest(self._description_tokens, query_tokens):
+                if query in self._descriptions[entry_id]:
+                    yield entry_id
+
+        # description任意子串：查询中每个词元内部的n元组都在description词元中出现过才需要扫描
+        # （只索引了二元/三元组，单字符词元不参与判断）
+        query_grams = set()
+        for token in query_tokens:
+            if len(token) >= 2:
+                query_grams.update(_ngrams(token, min(len(token), 3)))
+        if query_grams <= self._description_grams:
+            yield from self._description_haystack.iter_matches(query)
+
+    def search(self, query, limit=100):
+        """
+        搜索变量
+
+        Args:
+            query: 查询字符串（不区分大小写）
+            limit: 最多返回条数
+
+        Returns:
+            list: 按相关性排序的varLabel条目
+        """
+        query = (query or '').strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        seen = set()
+        results = []
+        for entry_id in self._iter_tiers(query):
+            if entry_id in seen:
+                continue
+            seen.add(entry_id)
+            results.append(self.entries[entry_id])
+            if len(results) >= limit:
+                break
+        return results
+
+    def complete(self, prefix, kind='all', limit=10):
+        """
+        变量名/文件名前缀补全（排序数组上二分查找，O(log n + k)）
+
+        Args:
+            prefix: 输入前缀（不区分大小写）
+            kind: 'variable'、'file' 或 'all'
+            limit: 每种类型最多返回条数
+
+        Returns:
+            list: 补全条目，包含 value、type、cycles 等字段
+        """
+        prefix = (prefix or '').strip().lower()
+        if not prefix or limit <= 0:
+            return []
+
+        kinds = ('variable', 'file') if kind == 'all' else (kind,)
+        results = []
+        for current in kinds:
+            keys, completions = self._completions[current]
+            position = bisect.bisect_left(keys, prefix)
+            end = min(position + limit, len(keys))
+            while position < end and keys[position].startswith(prefix):
+                results.append(completions[position])
+                position += 1
+        return results
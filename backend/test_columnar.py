@@ -0,0 +1,104 @@
+"""
+测试Feather/Parquet列式格式
+上传列式文件 → 画像 → 以列式格式返回，验证列类型与列类型划分往返不变
+（需要pyarrow，未安装时跳过）
+"""
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+# 添加路径以导入模块
+sys.path.insert(0, os.path.dirname(__file__))
+
+from werkzeug.datastructures import FileStorage
+from get import create_app
+from routes.data_extraction import _parse_response_mode, _extraction_file_response
+from utils.columnar import read_columnar, write_columnar
+from utils.data_loader import read_dataframe
+
+FORMATS = ('feather', 'parquet')
+
+
+def create_test_frame():
+    """创建包含整数、浮点（含缺失）、分类列的测试数据"""
+    rng = np.random.default_rng(5)
+    rows = 200
+    df = pd.DataFrame({
+        'seqn': np.arange(rows, dtype=np.int64),
+        'bmi': np.round(rng.normal(27, 5, rows), 1),
+        'riagendr': rng.integers(1, 3, rows),
+        'department': rng.choice(['Engineering', 'Marketing', 'Sales'], rows),
+    })
+    df.loc[3, 'bmi'] = np.nan
+    return df
+
+
+def _upload(client, data, filename):
+    response = client.post('/get_csvfile', data={'file': (io.BytesIO(data), filename)},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_columnar_round_trip(fmt):
+    """上传 → 画像 → response_mode=feather/parquet 往返后数据与列类型划分不变"""
+    print("=" * 70)
+    print(f"{fmt} 往返测试")
+    print("=" * 70)
+
+    df = create_test_frame()
+    app = create_app()
+    client = app.test_client()
+
+    # 上传时按CSV画像得到的列类型划分作为参照
+    csv_result = _upload(client, df.to_csv(index=False).encode('utf-8'), 'columnar_test.csv')
+    roles = {key: csv_result[key] for key in ('numeric_columns', 'categorical_columns', 'datetime_columns')}
+
+    result = _upload(client, write_columnar(df, fmt), f'columnar_test.{fmt}')
+    assert result['total_rows'] == len(df)
+    for key, columns in roles.items():
+        assert result[key] == columns, key
+
+    # 数据集会话按列式格式下载：数据和列类型划分都保留
+    response = client.get(f"/datasets/{result['dataset_id']}/{fmt}")
+    assert response.status_code == 200
+    assert response.headers['X-Total-Rows'] == str(len(df))
+    downloaded, downloaded_roles = read_columnar(io.BytesIO(response.data), fmt)
+    pd.testing.assert_frame_equal(downloaded, df)
+    assert downloaded_roles == roles
+
+    # 提取接口的 response_mode=feather/parquet
+    assert _parse_response_mode({'response_mode': fmt.upper()}) == fmt
+    with app.test_request_context():
+        response = _extraction_file_response(df, fmt, 'nhanes_data.csv')
+    assert response.headers['X-Suggested-Filename'] == f'nhanes_data.{fmt}'
+    extracted, _ = read_columnar(io.BytesIO(response.get_data()), fmt)
+    pd.testing.assert_frame_equal(extracted, df)
+    print(f"  列类型: {dict(extracted.dtypes.astype(str))}")
+    print(f"  ✅ {fmt} 往返后数据与列类型划分一致")
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_read_dataframe_columnar(fmt, tmp_path):
+    """read_dataframe 按扩展名读取列式文件路径和上传文件对象"""
+    df = create_test_frame()
+    data = write_columnar(df, fmt)
+    path = tmp_path / f'columnar_test.{fmt}'
+    path.write_bytes(data)
+
+    pd.testing.assert_frame_equal(read_dataframe(str(path)), df)
+    upload = FileStorage(stream=io.BytesIO(data), filename=f'columnar_test.{fmt}')
+    pd.testing.assert_frame_equal(read_dataframe(upload), df)
+    print(f"  ✅ read_dataframe 读取 {fmt} 路径和上传文件一致")
+
+
+if __name__ == "__main__":
+    for fmt in FORMATS:
+        test_columnar_round_trip(fmt)
@@ -0,0 +1,155 @@
+"""
+只读数据接口测试脚本
+测试指标/死亡数据接口的ETag条件请求等功能
+"""
+import requests
+
+BASE_URL = "http://127.0.0.1:5000"
+
+
+def print_section(title):
+    """打印分节标题"""
+    print(f"\n{'='*60}")
+    print(f"  {title}")
+    print('='*60)
+
+
+def test_indicator_etag():
+    """测试指标数据的ETag条件请求"""
+    print("\n测试指标数据ETag (GET /api/indicators/<name>)")
+    try:
+        url = f"{BASE_URL}/api/indicators/BMI?page=1&limit=5"
+        first = requests.get(url)
+        etag = first.headers.get('ETag')
+        second = requests.get(url, headers={'If-None-Match': etag})
+        other_page = requests.get(f"{BASE_URL}/api/indicators/BMI?page=2&limit=5",
+                                  headers={'If-None-Match': etag})
+
+        success = (
+            first.status_code == 200 and bool(etag)
+            and second.status_code == 304 and not second.content
+            and other_page.status_code == 200
+        )
+        print(f"  首次请求: {first.status_code}, ETag={etag}")
+        print(f"  Cache-Control: {first.headers.get('Cache-Control')}")
+        print(f"  条件请求: {second.status_code}")
+        print(f"  不同分页: {other_page.status_code}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_mortality_etag():
+    """测试死亡数据的ETag条件请求"""
+    print("\n测试死亡数据ETag (GET /api/mortality/<year>)")
+    try:
+        url = f"{BASE_URL}/api/mortality/1999-2000"
+        first = requests.get(url)
+        etag = first.headers.get('ETag')
+        second = requests.get(url, headers={'If-None-Match': etag})
+
+        success = first.status_code == 200 and bool(etag) and second.status_code == 304
+        print(f"  首次请求: {first.status_code}, ETag={etag}")
+        print(f"  条件请求: {second.status_code}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_indicator_mortality_join():
+    """测试指标与死亡数据的服务端连接"""
+    print("\n测试指标与死亡数据连接 (GET /api/indicators/join)")
+    try:
+        params = {
+            'indicators': 'AIP,BMI',
+            'start_year': '1999',
+            'end_year': '2003-2004',
+            'columns': 'AIP,BMI,mortstat,permth_exm',
+            'limit': 5
+        }
+        response = requests.get(f"{BASE_URL}/api/indicators/join", params=params)
+        result = response.json()
+        fields = [col['field'] for col in result.get('columns', [])]
+        cycles = {record['cycle'] for record in result.get('records', [])}
+
+        success = (
+            response.status_code == 200 and result.get('success') == True
+            and fields == ['seqn', 'cycle', 'AIP', 'BMI', 'mortstat', 'permth_exm']
+            and cycles <= {'1999-2000', '2001-2002', '2003-2004'}
+        )
+        print(f"  状态码: {response.status_code}")
+        print(f"  列: {fields}")
+        print(f"  总行数: {result.get('pagination', {}).get('total')}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_indicator_summary():
+    """测试指标按周期摘要统计"""
+    print("\n测试指标摘要统计 (GET /api/indicators/<name>/summary)")
+    try:
+        response = requests.get(f"{BASE_URL}/api/indicators/AIP/summary")
+        result = response.json()
+        aip_all = result.get('summary', {}).get('all', {}).get('AIP', {})
+
+        success = (
+            response.status_code == 200 and result.get('success') == True
+            and '1999-2000' in result.get('cycles', [])
+            and aip_all.get('count', 0) > 0
+            and 'p50' in aip_all.get('quantiles', {})
+            and sum(aip_all.get('histogram', {}).get('counts', [])) == aip_all.get('count')
+        )
+        print(f"  状态码: {response.status_code}")
+        print(f"  周期: {result.get('cycles')}")
+        print(f"  AIP计数: {aip_all.get('count')}, 均值: {aip_all.get('mean')}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print_section("开始只读数据接口测试")
+
+    tests = [
+        ("指标数据ETag", test_indicator_etag),
+        ("死亡数据ETag", test_mortality_etag),
+        ("指标与死亡数据连接", test_indicator_mortality_join),
+        ("指标摘要统计", test_indicator_summary),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n  ❌ {test_name} 测试异常: {e}")
+            results[test_name] = False
+
+    print_section("测试总结")
+
+    passed = sum(1 for v in results.values() if v)
+    total = len(results)
+
+    for test_name, result in results.items():
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name:20s}: {status}")
+
+    print(f"\n  总计: {passed}/{total} 测试通过 ({passed/total*100:.1f}%)")
+    print('='*60)
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
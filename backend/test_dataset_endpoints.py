@@ -0,0 +1,558 @@
+"""
+数据集接口测试脚本
+测试上传一次、按dataset_id复用数据的图表/分析接口，以及列信息推断
+"""
+import hashlib
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import requests
+
+BASE_URL = "http://127.0.0.1:5000"
+
+TEST_CSV = """age,salary,score,department
+25,50000,1,Engineering
+30,60000,0,Marketing
+35,70000,1,Engineering
+28,55000,0,Sales
+42,80000,1,Engineering
+39,72000,1,Marketing
+23,45000,0,Sales
+31,61000,0,Sales"""
+
+
+def print_section(title):
+    """打印分节标题"""
+    print(f"\n{'='*60}")
+    print(f"  {title}")
+    print('='*60)
+
+
+def upload_dataset(csv_text=TEST_CSV, filename="test_dataset.csv"):
+    """上传CSV并返回 /get_csvfile 的响应"""
+    files = {'file': (filename, io.BytesIO(csv_text.encode('utf-8')), 'text/csv')}
+    return requests.post(f"{BASE_URL}/get_csvfile", files=files)
+
+
+def test_dataset_session():
+    """测试数据集会话：上传一次，图表和分析接口按dataset_id复用"""
+    print("\n测试数据集会话 (dataset_id)")
+    try:
+        upload = upload_dataset().json()
+        dataset_id = upload.get('dataset_id')
+
+        info = requests.get(f"{BASE_URL}/datasets/{dataset_id}")
+        download = requests.get(f"{BASE_URL}/datasets/{dataset_id}/csv")
+        columns = requests.post(f"{BASE_URL}/get_file_columns", data={'dataset_id': dataset_id})
+        chart = requests.post(f"{BASE_URL}/generate_visualization", data={
+            'dataset_id': dataset_id,
+            'chart_type': 'histogram',
+            'x_var': 'age'
+        })
+        model = requests.post(f"{BASE_URL}/linearRegression", data={
+            'dataset_id': dataset_id,
+            'x_var': 'age',
+            'y_var': 'salary'
+        })
+        deleted = requests.delete(f"{BASE_URL}/datasets/{dataset_id}")
+        expired = requests.post(f"{BASE_URL}/generate_visualization", data={
+            'dataset_id': dataset_id,
+            'chart_type': 'histogram',
+            'x_var': 'age'
+        })
+
+        success = (
+            bool(dataset_id)
+            and info.status_code == 200 and info.json().get('total_rows') == 8
+            and download.status_code == 200
+            and pd.read_csv(io.StringIO(download.text)).equals(pd.read_csv(io.StringIO(TEST_CSV)))
+            and columns.status_code == 200 and 'age' in columns.json().get('numeric_columns', [])
+            and chart.status_code == 200 and chart.json().get('filename') == 'test_dataset.csv'
+            and model.status_code == 200 and model.json().get('success')
+            and deleted.status_code == 200
+            and expired.status_code == 404 and expired.json().get('error_code') == 'DATASET_NOT_FOUND'
+        )
+        print(f"  dataset_id: {dataset_id}")
+        print(f"  数据集信息: {info.status_code}, CSV下载: {download.status_code}, 列信息: {columns.status_code}")
+        print(f"  图表: {chart.status_code}, 线性回归: {model.status_code}")
+        print(f"  删除: {deleted.status_code}, 删除后访问: {expired.status_code}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_sampled_file_columns():
+    """测试列类型抽样推断与后台完整校验"""
+    print("\n测试列类型抽样推断 (POST /get_file_columns, GET /get_file_columns/<token>)")
+    try:
+        rng = np.random.default_rng(0)
+        rows = 100000
+        df = pd.DataFrame({
+            'seqn': np.arange(rows),
+            'gender': rng.integers(1, 3, rows),
+            'bmi': np.round(rng.normal(27, 5, rows), 1),
+            'education': rng.integers(1, 6, rows),
+        })
+        files = {'file': ('large.csv', io.BytesIO(df.to_csv(index=False).encode('utf-8')), 'text/csv')}
+        sampled = requests.post(f"{BASE_URL}/get_file_columns", files=files).json()
+        inference = sampled.get('inference', {})
+
+        verified = {}
+        for _ in range(20):
+            verified = requests.get(f"{BASE_URL}/get_file_columns/{inference.get('profile_token')}").json()
+            if verified.get('inference', {}).get('status') != 'pending':
+                break
+            time.sleep(0.5)
+
+        success = (
+            inference.get('mode') == 'sample'
+            and inference.get('sample_rows', rows) < rows
+            and set(sampled.get('numeric_columns', [])) == {'seqn', 'bmi'}
+            and verified.get('inference', {}).get('status') == 'verified'
+            and verified.get('numeric_columns') == sampled.get('numeric_columns')
+        )
+        print(f"  抽样行数: {inference.get('sample_rows')}, 低置信列: {inference.get('low_confidence_columns')}")
+        print(f"  抽样数值列: {sampled.get('numeric_columns')}")
+        print(f"  校验状态: {verified.get('inference', {}).get('status')}, "
+              f"变化列: {verified.get('inference', {}).get('changed_columns')}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_sampled_id_column():
+    """测试ID列在抽样中全部唯一、完整文件中有重复时，后台校验会纠正其类型"""
+    print("\n测试抽样推断的ID列校验 (POST /get_file_columns)")
+    try:
+        rows = 100000
+        df = pd.DataFrame({
+            'seqn': np.arange(rows),
+            'visit_id': np.arange(rows) % 40000,
+        })
+        files = {'file': ('visits.csv', io.BytesIO(df.to_csv(index=False).encode('utf-8')), 'text/csv')}
+        sampled = requests.post(f"{BASE_URL}/get_file_columns", files=files).json()
+        inference = sampled.get('inference', {})
+
+        verified = {}
+        for _ in range(20):
+            verified = requests.get(f"{BASE_URL}/get_file_columns/{inference.get('profile_token')}").json()
+            if verified.get('inference', {}).get('status') != 'pending':
+                break
+            time.sleep(0.5)
+
+        success = (
+            inference.get('mode') == 'sample'
+            and 'visit_id' in sampled.get('categorical_columns', [])
+            and 'visit_id' in inference.get('low_confidence_columns', [])
+            and verified.get('inference', {}).get('status') == 'verified'
+            and 'visit_id' in verified.get('numeric_columns', [])
+            and 'visit_id' in verified.get('inference', {}).get('changed_columns', [])
+        )
+        print(f"  低置信列: {inference.get('low_confidence_columns')}")
+        print(f"  抽样分类列: {sampled.get('categorical_columns')}, 校验后数值列: {verified.get('numeric_columns')}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_profile_cache():
+    """测试按内容哈希缓存画像：同一文件再次上传直接返回缓存结果"""
+    print("\n测试画像缓存 (POST /get_csvfile 重复上传)")
+    try:
+        # 追加一行随时间变化的数据，保证首次上传不会命中之前运行留下的缓存
+        csv_text = TEST_CSV + f"\n{time.time_ns()},99999,1,Research"
+        first = upload_dataset(csv_text, "cache_first.csv").json()
+        second = upload_dataset(csv_text, "cache_second.csv").json()
+        # 数据集会话释放后再次上传：画像命中缓存，数据集在首次使用时才解析
+        for body in (first, second):
+            requests.delete(f"{BASE_URL}/datasets/{body.get('dataset_id')}")
+        third = upload_dataset(csv_text, "cache_third.csv").json()
+        described = requests.get(f"{BASE_URL}/datasets/{third.get('dataset_id')}").json()
+        chart = requests.post(f"{BASE_URL}/chart_data", data={
+            'dataset_id': third.get('dataset_id'), 'chart_type': 'histogram', 'x_var': 'age'
+        }).json()
+
+        success = (
+            first.get('success') and second.get('success')
+            and first.get('profile_cached') is False
+            and second.get('profile_cached') is True
+            and first.get('content_hash') == second.get('content_hash')
+            and second.get('filename') == 'cache_second.csv'
+            and second.get('dataset_id') and second.get('dataset_id') != first.get('dataset_id')
+            and first.get('columns_info') == second.get('columns_info')
+            and first.get('preview_data') == second.get('preview_data')
+            and first.get('content_hash') == hashlib.blake2b(csv_text.encode('utf-8'), digest_size=20).hexdigest()
+            and third.get('profile_cached') is True
+            and described.get('total_rows') == 9
+            and chart.get('success')
+        )
+        print(f"  内容哈希: {second.get('content_hash')}")
+        print(f"  首次命中: {first.get('profile_cached')}, 再次命中: {second.get('profile_cached')}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_concurrent_charts():
+    """测试并发图表请求：渲染进程池中同时生成多种图表"""
+    print("\n测试并发图表渲染 (POST /generate_visualization 并发)")
+    try:
+        dataset_id = upload_dataset().json().get('dataset_id')
+        charts = [
+            {'chart_type': 'histogram', 'x_var': 'age'},
+            {'chart_type': 'scatter', 'x_var': 'age', 'y_var': 'salary'},
+            {'chart_type': 'boxplot', 'y_var': 'salary', 'x_var': 'department'},
+            {'chart_type': 'jointplot', 'x_var': 'age', 'y_var': 'salary'},
+            {'chart_type': 'qqplot', 'x_var': 'salary'},
+            {'chart_type': 'barplot', 'x_var': 'department'},
+        ]
+
+        def render(form):
+            response = requests.post(f"{BASE_URL}/generate_visualization", data={'dataset_id': dataset_id, **form})
+            return form['chart_type'], response.status_code, response.json()
+
+        with ThreadPoolExecutor(max_workers=len(charts)) as executor:
+            results = list(executor.map(render, charts))
+
+        for chart_type, status, body in results:
+            print(f"  {chart_type}: {status} {'' if body.get('success') else body.get('error')}")
+        success = all(
+            status == 200 and body.get('plot', '').startswith('data:image/png;base64,')
+            for _, status, body in results
+        )
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_chart_cache():
+    """测试图表缓存：相同数据和参数的图表直接返回缓存，参数变化时重新渲染"""
+    print("\n测试图表缓存 (POST /generate_visualization 重复请求)")
+    try:
+        # 追加随时间变化的一行，保证首次请求不会命中之前运行留下的缓存
+        csv_text = TEST_CSV + f"\n{time.time_ns()},99999,1,Research"
+        dataset_id = upload_dataset(csv_text, "chart_cache.csv").json().get('dataset_id')
+        form = {'dataset_id': dataset_id, 'chart_type': 'violinplot', 'y_var': 'salary', 'color': '#0062FF'}
+
+        first = requests.post(f"{BASE_URL}/generate_visualization", data=form).json()
+        second = requests.post(f"{BASE_URL}/generate_visualization", data={**form, 'color': '#0062ff '}).json()
+        recolored = requests.post(f"{BASE_URL}/generate_visualization", data={**form, 'color': '#ff0000'}).json()
+        # 重新上传同一内容得到新的dataset_id，按内容哈希仍然命中
+        reuploaded_id = upload_dataset(csv_text, "chart_cache_again.csv").json().get('dataset_id')
+        reuploaded = requests.post(f"{BASE_URL}/generate_visualization", data={**form, 'dataset_id': reuploaded_id}).json()
+
+        success = (
+            first.get('success') and first.get('chart_cached') is False
+            and second.get('chart_cached') is True and second.get('plot') == first.get('plot')
+            and recolored.get('chart_cached') is False and recolored.get('plot') != first.get('plot')
+            and reuploaded.get('chart_cached') is True
+        )
+        print(f"  首次: {first.get('chart_cached')}, 重复: {second.get('chart_cached')}, "
+              f"换颜色: {recolored.get('chart_cached')}, 重新上传: {reuploaded.get('chart_cached')}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_aggregated_charts():
+    """测试大数据量散点图/联合分布图：超过阈值时分箱聚合后绘制"""
+    print("\n测试大数据量聚合绘图 (POST /generate_visualization scatter/jointplot)")
+    try:
+        rng = np.random.default_rng(int(time.time()))
+        x = rng.normal(50, 10, 30000)
+        frame = pd.DataFrame({'x': x.round(3), 'y': (2 * x + rng.normal(0, 15, x.size)).round(3)})
+        dataset_id = upload_dataset(frame.to_csv(index=False), "large_scatter.csv").json().get('dataset_id')
+
+        results = {}
+        for chart_type in ('scatter', 'jointplot'):
+            body = requests.post(f"{BASE_URL}/generate_visualization", data={
+                'dataset_id': dataset_id, 'chart_type': chart_type, 'x_var': 'x', 'y_var': 'y'
+            }).json()
+            info = body.get('chart_info', {})
+            results[chart_type] = (body.get('success'), info.get('render_mode'), info.get('n_points'))
+            print(f"  {chart_type}: {results[chart_type]}")
+
+        success = all(result == (True, 'aggregated', 30000) for result in results.values())
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_chart_data():
+    """测试图表数据接口：返回聚合数据而不是PNG"""
+    print("\n测试图表数据接口 (POST /chart_data)")
+    try:
+        dataset_id = upload_dataset().json().get('dataset_id')
+
+        def chart_data(**form):
+            return requests.post(f"{BASE_URL}/chart_data", data={'dataset_id': dataset_id, **form}).json()
+
+        histogram = chart_data(chart_type='histogram', x_var='age')
+        boxplot = chart_data(chart_type='boxplot', y_var='salary', x_var='department')
+        correlation = chart_data(chart_type='correlation_heatmap', columns='age,salary,score')
+        barplot = chart_data(chart_type='barplot', x_var='department')
+        missing = chart_data(chart_type='qqplot')
+
+        series = histogram.get('data', {}).get('series', [{}])[0]
+        groups = {group['group']: group for group in boxplot.get('data', {}).get('groups', [])}
+        matrix = correlation.get('data', {}).get('matrix', [])
+        success = (
+            histogram.get('success') and sum(series.get('counts', [])) == 8
+            and len(series.get('bin_edges', [])) == 31
+            and groups.get('Engineering', {}).get('median') == 70000
+            and len(matrix) == 3 and all(abs(matrix[i][i] - 1) < 1e-12 for i in range(3))
+            and dict(zip(barplot['data']['categories'], barplot['data']['counts'])) == {
+                'Engineering': 3, 'Marketing': 2, 'Sales': 3
+            }
+            and missing.get('error_code') == 'MISSING_X_VAR'
+        )
+        print(f"  直方图频数合计: {sum(series.get('counts', []))}, Engineering中位数: "
+              f"{groups.get('Engineering', {}).get('median')}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_kde_bandwidth():
+    """测试KDE带宽规则：scott/silverman曲线不同，未知规则返回400"""
+    print("\n测试KDE带宽规则 (bandwidth)")
+    try:
+        dataset_id = upload_dataset().json().get('dataset_id')
+
+        def chart_data(**form):
+            return requests.post(f"{BASE_URL}/chart_data", data={'dataset_id': dataset_id, **form}).json()
+
+        scott = chart_data(chart_type='violinplot', y_var='salary', x_var='department')
+        silverman = chart_data(chart_type='violinplot', y_var='salary', x_var='department', bandwidth='silverman')
+        invalid = chart_data(chart_type='histogram', x_var='age', bandwidth='unknown')
+        plot = requests.post(f"{BASE_URL}/generate_visualization", data={
+            'dataset_id': dataset_id, 'chart_type': 'violinplot', 'y_var': 'salary',
+            'x_var': 'department', 'bandwidth': 'silverman'
+        }).json()
+
+        scott_groups = scott.get('data', {}).get('groups', [])
+        silverman_groups = silverman.get('data', {}).get('groups', [])
+        success = (
+            scott.get('success') and silverman.get('success')
+            and [g['group'] for g in scott_groups] == ['Engineering', 'Marketing', 'Sales']
+            and all(g['density'] is not None and min(g['density']) >= 0 for g in scott_groups)
+            and scott_groups[0]['density'] != silverman_groups[0]['density']
+            and invalid.get('error_code') == 'VALIDATION_ERROR'
+            and plot.get('success') and bool(plot.get('plot'))
+        )
+        print(f"  分组数: {len(scott_groups)}, 未知规则错误码: {invalid.get('error_code')}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_qq_thinning():
+    """测试大样本QQ图：按秩抽取固定点数，返回拟合的形状参数和逐点置信带"""
+    print("\n测试大样本QQ图 (POST /chart_data qqplot)")
+    try:
+        rng = np.random.default_rng(int(time.time()))
+        frame = pd.DataFrame({'value': rng.gamma(3.0, 2.0, 20000).round(4)})
+        dataset_id = upload_dataset(frame.to_csv(index=False), "large_qq.csv").json().get('dataset_id')
+
+        body = requests.post(f"{BASE_URL}/chart_data", data={
+            'dataset_id': dataset_id, 'chart_type': 'qqplot', 'x_var': 'value', 'distribution': 'gamma'
+        }).json()
+        data = body.get('data', {})
+        band = data.get('band', {})
+        points = len(data.get('sample', []))
+        alpha = (data.get('shape_params') or [0])[0]
+        success = (
+            body.get('success') and data.get('count') == 20000 and points == 1000
+            and data['sample'][0] == frame['value'].min() and data['sample'][-1] == frame['value'].max()
+            and 2.5 < alpha < 3.5
+            and all(low <= high for low, high in zip(band.get('lower', []), band.get('upper', [])))
+        )
+        print(f"  点数: {points}, α={alpha:.3f}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_correlation_matrix():
+    """测试相关系数矩阵接口：含缺失值时与 DataFrame.corr 的成对完整观测结果一致"""
+    print("\n测试相关系数矩阵接口 (POST /correlation_matrix)")
+    try:
+        rng = np.random.default_rng(int(time.time()))
+        frame = pd.DataFrame(rng.integers(0, 20, (500, 4)), columns=['a', 'b', 'c', 'd']).astype(float)
+        frame.loc[rng.choice(500, 60, replace=False), 'b'] = np.nan
+        frame.loc[rng.choice(500, 40, replace=False), 'c'] = np.nan
+        dataset_id = upload_dataset(frame.to_csv(index=False), "correlation.csv").json().get('dataset_id')
+
+        success = True
+        for method in ('pearson', 'spearman', 'kendall'):
+            body = requests.post(f"{BASE_URL}/correlation_matrix", data={
+                'dataset_id': dataset_id, 'method': method
+            }).json()
+            diff = np.abs(np.array(body.get('matrix')) - frame.corr(method).to_numpy()).max()
+            counts_ok = body.get('counts', [[0]])[1][2] == int((frame['b'].notna() & frame['c'].notna()).sum())
+            print(f"  {method}: 最大误差 {diff:.2e}, 成对观测数{'正确' if counts_ok else '错误'}")
+            success = success and body.get('success') and diff < 1e-10 and counts_ok
+
+        invalid = requests.post(f"{BASE_URL}/correlation_matrix", data={
+            'dataset_id': dataset_id, 'method': 'unknown'
+        }).json()
+        success = success and invalid.get('error_code') == 'VALIDATION_ERROR'
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_batch_visualization():
+    """测试批量图表接口：一次上传生成多个图表，相同配置只渲染一次，单个图表出错不影响其他图表"""
+    print("\n测试批量图表接口 (POST /batch_visualization)")
+    try:
+        title = f"批量测试 {time.time_ns()}"
+        charts = [
+            {'chart_type': 'histogram', 'x_var': 'age', 'title': title},
+            {'chart_type': 'boxplot', 'y_var': 'salary', 'x_var': 'department', 'title': title},
+            {'chart_type': 'correlation_heatmap', 'columns': ['age', 'salary', 'score'], 'title': title},
+            {'chart_type': 'histogram', 'x_var': 'age', 'title': title},
+            {'chart_type': 'scatter', 'x_var': 'age'},
+            {'chart_type': 'qqplot', 'x_var': 'missing_column', 'title': title},
+            {'chart_type': 'scatter', 'x_var': 'age', 'y_var': 'missing_column', 'title': title},
+        ]
+        files = {'file': ("batch.csv", io.BytesIO(TEST_CSV.encode('utf-8')), 'text/csv')}
+        body = requests.post(f"{BASE_URL}/batch_visualization", files=files, data={
+            'charts': json.dumps(charts)
+        }).json()
+        results = body.get('results', [])
+        dataset_id = upload_dataset().json().get('dataset_id')
+        invalid = requests.post(f"{BASE_URL}/batch_visualization", data={
+            'dataset_id': dataset_id, 'charts': '{}'
+        }).json()
+
+        success = (
+            body.get('success') and len(results) == 7
+            and all(results[i]['success'] and results[i]['plot'] for i in (0, 1, 2, 3))
+            and results[4].get('error_code') == 'MISSING_VARS'
+            and results[5].get('error_code') == 'VALIDATION_ERROR'
+            and all("列 'missing_column' 在CSV中不存在" in results[i].get('error', '') for i in (5, 6))
+            and body.get('summary', {}).get('rendered') == 5
+            and invalid.get('error_code') == 'INVALID_CHARTS'
+        )
+        print(f"  汇总: {body.get('summary')}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def test_faceted_charts():
+    """测试分面图：按department分面渲染网格图，图表数据接口返回每个分面的数据"""
+    print("\n测试分面图 (facet)")
+    try:
+        dataset_id = upload_dataset().json().get('dataset_id')
+
+        def post(endpoint, **form):
+            return requests.post(f"{BASE_URL}/{endpoint}", data={'dataset_id': dataset_id, **form}).json()
+
+        plots = [
+            post('generate_visualization', chart_type=chart_type, facet='department', **variables)
+            for chart_type, variables in [
+                ('histogram', {'x_var': 'age'}),
+                ('boxplot', {'y_var': 'salary', 'x_var': 'score'}),
+                ('violinplot', {'y_var': 'salary'}),
+                ('scatter', {'x_var': 'age', 'y_var': 'salary'}),
+            ]
+        ]
+        histogram = post('chart_data', chart_type='histogram', x_var='age', facet='department').get('data', {})
+        scatter = post('chart_data', chart_type='scatter', x_var='age', y_var='salary',
+                       facet='department').get('data', {})
+        missing = post('chart_data', chart_type='boxplot', y_var='salary', facet='missing_column')
+
+        departments = ['Engineering', 'Marketing', 'Sales']
+        series = [panel['series'][0] for panel in histogram.get('panels', [])]
+        success = (
+            all(plot.get('success') and plot['chart_info'].get('facets') == departments for plot in plots)
+            and [panel['facet'] for panel in histogram['panels']] == departments
+            and [sum(s['counts']) for s in series] == [3, 2, 3]
+            and all(s['bin_edges'] == series[0]['bin_edges'] for s in series)
+            and scatter.get('mode') == 'points'
+            and [len(panel['x']) for panel in scatter.get('panels', [])] == [3, 2, 3]
+            and missing.get('error_code') == 'VALIDATION_ERROR'
+        )
+        print(f"  直方图各分面频数: {[sum(s['counts']) for s in series]}, 缺失分面列错误码: {missing.get('error_code')}")
+        print(f"  结果: {'✅ 通过' if success else '❌ 失败'}")
+        return success
+    except Exception as e:
+        print(f"  ❌ 错误: {e}")
+        return False
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print_section("开始数据集接口测试")
+
+    tests = [
+        ("数据集会话", test_dataset_session),
+        ("列类型抽样推断", test_sampled_file_columns),
+        ("抽样推断ID列校验", test_sampled_id_column),
+        ("画像缓存", test_profile_cache),
+        ("并发图表渲染", test_concurrent_charts),
+        ("图表缓存", test_chart_cache),
+        ("大数据量聚合绘图", test_aggregated_charts),
+        ("图表数据接口", test_chart_data),
+        ("KDE带宽规则", test_kde_bandwidth),
+        ("大样本QQ图", test_qq_thinning),
+        ("相关系数矩阵", test_correlation_matrix),
+        ("批量图表", test_batch_visualization),
+        ("分面图", test_faceted_charts),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n  ❌ {test_name} 测试异常: {e}")
+            results[test_name] = False
+
+    print_section("测试总结")
+
+    passed = sum(1 for v in results.values() if v)
+    total = len(results)
+
+    for test_name, result in results.items():
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name:20s}: {status}")
+
+    print(f"\n  总计: {passed}/{total} 测试通过 ({passed/total*100:.1f}%)")
+    print('='*60)
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
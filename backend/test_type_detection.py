@@ -4,6 +4,7 @@
 """
 import pandas as pd
 import numpy as np
+import io
 import os
 import sys
 
@@ -11,6 +12,9 @@ import sys
 sys.path.insert(0, os.path.dirname(__file__))
 
 from services.csv_service import CSVService
+from services.column_profiler import ColumnProfiler
+from services.streaming_profiler import StreamingProfiler
+from utils import data_loader
 
 def create_test_csv():
     """创建包含各种类型列的测试CSV文件"""
@@ -130,5 +134,183 @@ def test_type_detection():
             os.remove(test_file)
             print(f"\n已清理测试文件: {test_file}")
 
+def test_profile_consistency():
+    """验证向量化列画像与逐列pandas统计结果一致"""
+    print("=" * 70)
+    print("列画像一致性测试")
+    print("=" * 70)
+    
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        'code': rng.integers(1, 6, 500).astype(float),
+        'weight': rng.normal(70, 12, 500),
+        'count': rng.integers(0, 5000, 500),
+        'big_id': rng.integers(-2**62, 2**62, 500),
+        'empty': np.full(500, np.nan),
+        'label': rng.choice(['a', 'b', None], 500),
+    })
+    df.loc[rng.random(500) < 0.2, ['code', 'weight']] = np.nan
+    
+    profiles = ColumnProfiler.profile(df)
+    for col in df.columns:
+        profile = profiles[col]
+        assert profile['count'] == df[col].count(), col
+        assert profile['null_count'] == df[col].isnull().sum(), col
+        assert profile['unique_count'] == df[col].nunique(), col
+        if profile['dtype_class'] == 'numeric' and profile['count']:
+            assert profile['min'] == df[col].min(), col
+            assert profile['max'] == df[col].max(), col
+            assert np.isclose(profile['mean'], df[col].mean()), col
+            assert np.isclose(profile['std'], df[col].std()), col
+        print(f"  ✓ {col}: unique={profile['unique_count']}, "
+              f"type={ColumnProfiler.classify_column(col, profile)}")
+    print("  ✅ 列画像与pandas统计一致")
+
+
+def test_streaming_profile():
+    """验证按块流式画像与一次性读取的类型判断和统计量一致"""
+    print("=" * 70)
+    print("流式画像一致性测试")
+    print("=" * 70)
+    
+    rng = np.random.default_rng(7)
+    rows = 5000
+    df = pd.DataFrame({
+        'seqn': np.arange(rows),
+        'gender': rng.integers(1, 3, rows),
+        'bmi': np.round(rng.normal(27, 5, rows), 1),
+        'education': rng.integers(1, 6, rows).astype(float),
+        'department': rng.choice(['Engineering', 'Marketing', 'Sales'], rows),
+        'late_missing': rng.integers(0, 100, rows).astype(float),
+    })
+    df.loc[rng.random(rows) < 0.1, 'education'] = np.nan
+    df.loc[rows - 1, 'late_missing'] = np.nan
+    data = df.to_csv(index=False).encode('utf-8')
+    
+    expected = CSVService.profile_dataframe(pd.read_csv(io.BytesIO(data)), len(data))
+    streamed = StreamingProfiler.profile_csv(io.BytesIO(data), len(data), chunk_rows=700)
+    
+    assert streamed['numeric_columns'] == expected['numeric_columns']
+    assert streamed['categorical_columns'] == expected['categorical_columns']
+    assert streamed['file_stats'] == expected['file_stats']
+    assert streamed['full_data'] == expected['full_data']
+    for exp_info, got_info in zip(expected['columns_info'], streamed['columns_info']):
+        assert got_info['unique_count'] == exp_info['unique_count'], exp_info['name']
+        if exp_info['data_type'] == 'numeric':
+            assert np.isclose(got_info['mean_value'], exp_info['mean_value']), exp_info['name']
+            assert np.isclose(got_info['std_value'], exp_info['std_value']), exp_info['name']
+            assert got_info['min_value'] == exp_info['min_value'], exp_info['name']
+            assert got_info['max_value'] == exp_info['max_value'], exp_info['name']
+        else:
+            assert got_info['top_values'] == exp_info['top_values'], exp_info['name']
+    print(f"  数值型列: {streamed['numeric_columns']}")
+    print(f"  分类型列: {streamed['categorical_columns']}")
+    print("  ✅ 流式画像与一次性读取结果一致")
+
+
+
+def test_approximate_profile():
+    """验证近似画像的唯一值个数、分位数和高频值落在草图误差界内"""
+    print("=" * 70)
+    print("近似画像（草图）测试")
+    print("=" * 70)
+    
+    rng = np.random.default_rng(11)
+    rows = 60000
+    df = pd.DataFrame({
+        'respondent_code': rng.integers(0, 40000, rows),
+        'income': np.round(rng.lognormal(10, 0.5, rows), 2),
+        'department': rng.choice(['Engineering', 'Marketing', 'Sales'], rows, p=[0.6, 0.3, 0.1]),
+    })
+    data = df.to_csv(index=False).encode('utf-8')
+    result = StreamingProfiler.profile_csv(io.BytesIO(data), len(data), chunk_rows=7000, approximate=True)
+    info = {col['name']: col for col in result['columns_info']}
+    approximation = result['approximation']
+    
+    for col in ['respondent_code', 'income']:
+        exact = df[col].nunique()
+        error = abs(info[col]['unique_count'] - exact) / exact
+        assert not info[col]['unique_count_exact'], col
+        assert error < 4 * approximation['distinct_relative_error'], (col, error)
+    
+    median = info['income']['quantiles']['p50']
+    rank = (df['income'] < median).mean()
+    assert abs(rank - 0.5) < approximation['quantile_rank_error'], rank
+    
+    top = info['department']['top_values']
+    expected = df['department'].value_counts()
+    assert list(top) == expected.index.tolist()
+    for value, lower_bound in top.items():
+        assert expected[value] - info['department']['top_values_max_error'] <= lower_bound <= expected[value]
+    print(f"  唯一值个数: respondent_code={info['respondent_code']['unique_count']}, "
+          f"income={info['income']['unique_count']}")
+    print(f"  income中位数估计: {median}（秩 {rank:.4f}）")
+    print("  ✅ 近似画像误差在草图误差界内")
+
+
+
+def test_mixed_chunk_sketches():
+    """验证同一取值在不同块中被推断为数值或文本时，草图只计一次"""
+    print("=" * 70)
+    print("混合类型块草图测试")
+    print("=" * 70)
+    
+    rows = 3000
+    codes = [str(1 + i % 2) for i in range(rows)]
+    codes[-1] = 'unknown'
+    df = pd.DataFrame({'riagendr': codes})
+    data = df.to_csv(index=False).encode('utf-8')
+    result = StreamingProfiler.profile_csv(io.BytesIO(data), len(data), chunk_rows=500, approximate=True)
+    info = result['columns_info'][0]
+    expected = pd.read_csv(io.BytesIO(data))['riagendr']
+    
+    assert info['unique_count'] == expected.nunique(), info['unique_count']
+    assert info['top_values'] == expected.value_counts().to_dict(), info['top_values']
+    print(f"  唯一值个数: {info['unique_count']}（精确值 {expected.nunique()}）")
+    print("  ✅ 数值块与文本块的相同取值合并计数")
+
+
+
+def test_parallel_csv_read():
+    """验证分段并行解析与一次性读取的列类型和数据一致"""
+    print("=" * 70)
+    print("并行CSV解析一致性测试")
+    print("=" * 70)
+    
+    rng = np.random.default_rng(3)
+    rows = 20000
+    df = pd.DataFrame({
+        'seqn': np.arange(rows),
+        'bmi': np.round(rng.normal(27, 5, rows), 1),
+        'late_missing': rng.integers(0, 5, rows).astype(float),
+        'late_text': rng.integers(0, 5, rows).astype(object),
+        'code': [f"{i % 100:02d}" for i in range(rows)],
+        'flag': rng.choice([True, False], rows).astype(object),
+        'empty': np.nan,
+    })
+    df.loc[rows - 5, 'late_missing'] = np.nan
+    df.loc[rows - 3, 'late_text'] = 'unknown'
+    df.loc[rows - 2, 'flag'] = None
+    data = df.to_csv(index=False).encode('utf-8')
+    
+    saved = data_loader.PARALLEL_CSV_MIN_BYTES, data_loader.PARALLEL_CSV_WORKERS
+    data_loader.PARALLEL_CSV_MIN_BYTES, data_loader.PARALLEL_CSV_WORKERS = 0, 4
+    try:
+        parallel = data_loader.read_csv_fast(io.BytesIO(data))
+    finally:
+        data_loader.PARALLEL_CSV_MIN_BYTES, data_loader.PARALLEL_CSV_WORKERS = saved
+    expected = pd.read_csv(io.BytesIO(data))
+    
+    assert parallel.dtypes.equals(expected.dtypes)
+    assert parallel.equals(expected)
+    print(f"  列类型: {dict(parallel.dtypes.astype(str))}")
+    print("  ✅ 并行解析与一次性读取结果一致")
+
+
 if __name__ == "__main__":
     test_type_detection()
+    test_profile_consistency()
+    test_streaming_profile()
+    test_approximate_profile()
+    test_mixed_chunk_sketches()
+    test_parallel_csv_read()
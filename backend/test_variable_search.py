@@ -0,0 +1,129 @@
+"""
+测试变量检索索引
+构造小型varLabel.json，验证排序规则与原有子串匹配结果一致
+"""
+import json
+import os
+import sys
+
+# 添加路径以导入模块
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.variable_search import VariableSearchIndex
+
+
+def create_test_json():
+    """创建测试用的变量定义文件"""
+    entries = [
+        {"year": "2005-2006", "file": "biopro_d", "variable": "LBXSGL", "label": "Glucose, refrigerated serum (mg/dL)", "description": "Serum glucose"},
+        {"year": "2005-2006", "file": "glu_d", "variable": "LBXGLU", "label": "Fasting Glucose (mg/dL)", "description": "Plasma glucose after fasting"},
+        {"year": "2007-2008", "file": "glu_e", "variable": "LBXGLUSI", "label": "Fasting Glucose (mmol/L)", "description": "SI units"},
+        {"year": "2007-2008", "file": "hdl_e", "variable": "LBDHDD", "label": "Direct HDL-Cholesterol (mg/dL)", "description": "High density lipoprotein"},
+        {"year": "2007-2008", "file": "bmx_e", "variable": "BMXBMI", "label": "Body Mass Index (kg/m**2)", "description": "Computed from weight and height"},
+        {"year": "2007-2008", "file": "demo_e", "variable": "RIAGENDR", "label": "Gender", "description": "Gender of the participant, glucose unrelated"},
+    ]
+    test_file = 'test_varLabel.json'
+    with open(test_file, 'w', encoding='utf-8') as f:
+        json.dump(entries, f)
+    return test_file, entries
+
+
+def legacy_search(entries, query):
+    """原有的线性子串匹配"""
+    return [
+        item for item in entries
+        if query in item['variable'].lower()
+        or query in item['label'].lower()
+        or query in item['description'].lower()
+    ]
+
+
+def test_variable_search():
+    """测试变量检索"""
+    print("=" * 70)
+    print("变量检索索引测试")
+    print("=" * 70)
+
+    test_file, entries = create_test_json()
+    try:
+        index = VariableSearchIndex.load(test_file)
+        all_correct = True
+
+        expectations = {
+            "lbxglu": ["LBXGLU", "LBXGLUSI"],  # 精确 > 前缀
+            "glucose": ["LBXSGL", "LBXGLU", "LBXGLUSI", "RIAGENDR"],  # label整词 > description
+            "hdl": ["LBDHDD"],
+            "mg/dl": ["LBXSGL", "LBXGLU", "LBDHDD"],
+        }
+        for query, expected in expectations.items():
+            actual = [item['variable'] for item in index.search(query)]
+            same_set = sorted(map(str, index.search(query))) == sorted(map(str, legacy_search(entries, query)))
+            correct = actual == expected and same_set
+            all_correct = all_correct and correct
+            print(f"  {query!r:12} -> {actual} {'✅' if correct else '❌'}")
+
+        print("\n" + "=" * 70)
+        print(f"总体结果: {'✅ 所有检索结果正确!' if all_correct else '❌ 检索结果有误'}")
+        print("=" * 70)
+        assert all_correct
+    finally:
+        if os.path.exists(test_file):
+            os.remove(test_file)
+            print(f"\n已清理测试文件: {test_file}")
+
+
+def test_short_token_substring():
+    """测试单字符词元及跨词元边界的description子串与原有线性匹配一致"""
+    print("=" * 70)
+    print("单字符词元子串检索测试")
+    print("=" * 70)
+
+    entries = [
+        {"year": "2001-2002", "file": "vid_b", "variable": "LBXVIDMS", "label": "25OHD", "description": "Vitamin D level"},
+        {"year": "2007-2008", "file": "vid_e", "variable": "LBXVD2MS", "label": "25OHD2", "description": "vitamin d2 total"},
+        {"year": "2007-2008", "file": "demo_e", "variable": "RIAGENDR", "label": "Gender", "description": "Gender of the participant"},
+    ]
+    index = VariableSearchIndex(entries)
+    all_correct = True
+    for query in ["vitamin d", "in d", "d", "n d2", "r o"]:
+        actual = index.search(query)
+        correct = sorted(map(str, actual)) == sorted(map(str, legacy_search(entries, query)))
+        all_correct = all_correct and correct
+        print(f"  {query!r:12} -> {[item['variable'] for item in actual]} {'✅' if correct else '❌'}")
+    assert all_correct
+
+
+def test_variable_autocomplete():
+    """测试变量名/文件名前缀补全"""
+    print("=" * 70)
+    print("变量补全测试")
+    print("=" * 70)
+
+    test_file, _ = create_test_json()
+    try:
+        index = VariableSearchIndex.load(test_file)
+
+        variables = index.complete("lbxg", kind="variable")
+        files = index.complete("glu", kind="file")
+        mixed = index.complete("bmx", kind="all")
+
+        correct = (
+            [item['value'] for item in variables] == ["LBXGLU", "LBXGLUSI"]
+            and variables[0]['cycles'] == ["2005-2006"]
+            and [item['value'] for item in files] == ["glu_d", "glu_e"]
+            and [(item['type'], item['value']) for item in mixed] == [("variable", "BMXBMI"), ("file", "bmx_e")]
+        )
+        print(f"  变量补全: {[item['value'] for item in variables]}")
+        print(f"  文件补全: {[item['value'] for item in files]}")
+        print(f"  混合补全: {[(item['type'], item['value']) for item in mixed]}")
+        print(f"\n总体结果: {'✅ 补全结果正确!' if correct else '❌ 补全结果有误'}")
+        assert correct
+    finally:
+        if os.path.exists(test_file):
+            os.remove(test_file)
+
+
+if __name__ == "__main__":
+    test_variable_search()
+    test_short_token_substring()
+    test_variable_autocomplete()
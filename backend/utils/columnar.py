@@ -0,0 +1,119 @@
+"""
+列式二进制数据格式（Arrow IPC/Feather、Parquet）读写
+
+与CSV相比保留列类型（整数/浮点/分类/日期），读取无需文本解析；
+列的数值/分类/日期划分写入schema元数据，读取时可跳过类型检测。
+依赖可选的 pyarrow，未安装时只支持CSV。
+"""
+import io
+import json
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # 可选依赖
+    pa = None
+
+# 扩展名 -> 格式
+COLUMNAR_EXTENSIONS = {'feather': 'feather', 'arrow': 'feather', 'parquet': 'parquet'}
+COLUMNAR_MIMETYPES = {
+    'feather': 'application/vnd.apache.arrow.file',
+    'parquet': 'application/vnd.apache.parquet',
+}
+# schema元数据中保存列类型划分的键
+_ROLES_METADATA_KEY = b'nhanes_cloud.column_roles'
+_ROLE_KEYS = ('numeric_columns', 'categorical_columns', 'datetime_columns')
+
+
+def columnar_available():
+    """是否安装了 pyarrow"""
+    return pa is not None
+
+
+def columnar_format(filename):
+    """
+    根据文件名判断列式格式
+
+    Returns:
+        str: 'feather' / 'parquet'，不是列式格式时返回None
+    """
+    if not filename or '.' not in filename:
+        return None
+    return COLUMNAR_EXTENSIONS.get(filename.rsplit('.', 1)[1].lower())
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ValueError("服务器未安装pyarrow，暂不支持Feather/Parquet格式，请上传CSV文件")
+
+
+def read_columnar(source, fmt):
+    """
+    读取列式格式文件
+
+    文件路径使用内存映射；上传流读入一次后直接在内存缓冲区上构建Arrow表。
+    转换为DataFrame时按列拆分数据块，无缺失值的数值列不复制内存。
+
+    Args:
+        source: 文件路径、Flask FileStorage对象或二进制文件对象
+        fmt: 'feather' 或 'parquet'
+
+    Returns:
+        tuple: (pd.DataFrame, 列类型划分字典或None)
+    """
+    _require_pyarrow()
+    if isinstance(source, (str, os.PathLike)):
+        data = pa.memory_map(os.fspath(source), 'r')
+    else:
+        stream = getattr(source, 'stream', source)
+        stream.seek(0)
+        data = pa.BufferReader(stream.read())
+        stream.seek(0)
+
+    if fmt == 'parquet':
+        table = pq.read_table(data)
+    else:
+        table = feather.read_table(data, memory_map=False)
+
+    roles = None
+    metadata = table.schema.metadata or {}
+    if _ROLES_METADATA_KEY in metadata:
+        try:
+            stored = json.loads(metadata[_ROLES_METADATA_KEY])
+            columns = set(table.column_names)
+            if all(set(stored.get(key, [])) <= columns for key in _ROLE_KEYS):
+                roles = {key: list(stored.get(key, [])) for key in _ROLE_KEYS}
+        except ValueError:
+            roles = None
+
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    return df, roles
+
+
+def write_columnar(df, fmt, column_roles=None):
+    """
+    把DataFrame写为列式格式
+
+    Args:
+        df: pd.DataFrame
+        fmt: 'feather' 或 'parquet'
+        column_roles: 列类型划分（numeric_columns/categorical_columns/datetime_columns），写入schema元数据
+
+    Returns:
+        bytes
+    """
+    _require_pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if column_roles:
+        roles = {key: [str(col) for col in column_roles.get(key, [])] for key in _ROLE_KEYS}
+        metadata = {**(table.schema.metadata or {}), _ROLES_METADATA_KEY: json.dumps(roles).encode('utf-8')}
+        table = table.replace_schema_metadata(metadata)
+
+    sink = io.BytesIO()
+    if fmt == 'parquet':
+        pq.write_table(table, sink)
+    else:
+        feather.write_feather(table, sink)
+    return sink.getvalue()
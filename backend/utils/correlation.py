@@ -0,0 +1,165 @@
+"""
+相关系数矩阵计算工具函数
+每列只排秩一次，缺失值按成对完整观测处理，结果与 DataFrame.corr 一致：
+- pearson：缺失值置0后用矩阵乘积一次得到所有列对的观测数、和、平方和与交叉积
+- spearman：平均秩上的pearson；缺失位置相同的列对共用各列的秩，其余列对在共同观测上重新排秩
+- kendall：tau-b，各列先转为整数秩，逐列对用 scipy.stats.kendalltau（Knight归并排序算法，O(n log n)）
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+from config import CORRELATION_WORKERS
+
+CORRELATION_METHODS = ('pearson', 'spearman', 'kendall')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """列对计算线程池（排序和归并计数在C代码中执行）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CORRELATION_WORKERS, thread_name_prefix='corr')
+        return _executor
+
+
+def _map(func, items):
+    if CORRELATION_WORKERS <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    return list(_get_executor().map(func, items))
+
+
+def _pearson(values, mask):
+    """
+    成对完整观测的pearson相关系数
+
+    共同观测上的方差相对平方和过小（如某列在这些行上为常数）时，一次公式的舍入误差不可忽略，
+    这些列对改为在共同观测上直接计算
+
+    Args:
+        values: n×p 数值矩阵，缺失位置为0
+        mask: n×p 布尔矩阵，True表示有观测值
+
+    Returns:
+        tuple: (相关系数矩阵, 成对观测数矩阵)
+    """
+    weights = mask.astype(float)
+    counts = weights.T @ weights
+    # 先减去各列均值，减少平方和相减时的舍入误差
+    column_means = values.sum(axis=0) / np.maximum(weights.sum(axis=0), 1)
+    values = np.where(mask, values - column_means, 0.0)
+
+    # sums[i, j]：第i列在第j列也有观测的行上的和
+    sums = values.T @ weights
+    squares = (values ** 2).T @ weights
+    cross = values.T @ values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = cross - sums * sums.T / counts
+        variance = squares - sums ** 2 / counts
+        corr = covariance / np.sqrt(variance * variance.T)
+    corr = np.clip(corr, -1, 1)
+
+    unstable = variance <= squares * 1e-8
+    pairs = [(i, j) for i, j in zip(*np.nonzero(unstable | unstable.T)) if i <= j and counts[i, j] > 0]
+
+    def exact(pair):
+        i, j = pair
+        rows = mask[:, i] & mask[:, j]
+        return _pearson_pair(values[rows, i], values[rows, j])
+
+    for (i, j), value in zip(pairs, _map(exact, pairs)):
+        corr[i, j] = corr[j, i] = value
+    return corr, counts
+
+
+def _pearson_pair(x, y):
+    x = x - x.mean()
+    y = y - y.mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.clip((x @ y) / np.sqrt((x @ x) * (y @ y)), -1, 1))
+
+
+def _spearman(values, mask):
+    p = values.shape[1]
+    ranks = np.zeros_like(values)
+    for j, column_ranks in enumerate(_map(lambda j: stats.rankdata(values[mask[:, j], j]), range(p))):
+        ranks[mask[:, j], j] = column_ranks
+    corr, counts = _pearson(ranks, mask)
+
+    # 缺失位置不同的列对：秩须在共同观测上重新计算
+    patterns = [mask[:, j].tobytes() for j in range(p)]
+    pairs = [(i, j) for i in range(p) for j in range(i + 1, p)
+             if patterns[i] != patterns[j] and counts[i, j] > 0]
+
+    def rerank(pair):
+        i, j = pair
+        rows = mask[:, i] & mask[:, j]
+        return _pearson_pair(stats.rankdata(values[rows, i]), stats.rankdata(values[rows, j]))
+
+    for (i, j), value in zip(pairs, _map(rerank, pairs)):
+        corr[i, j] = corr[j, i] = value
+    return corr, counts
+
+
+def _kendall(values, mask):
+    p = values.shape[1]
+    # kendall只与大小顺序有关，各列在自身观测上的整数秩在任意子集上仍然有效
+    ranks = np.zeros(values.shape, dtype=np.int64)
+    for j in range(p):
+        ranks[mask[:, j], j] = stats.rankdata(values[mask[:, j], j], method='dense')
+    weights = mask.astype(float)
+    counts = weights.T @ weights
+
+    def tau(pair):
+        i, j = pair
+        rows = mask[:, i] & mask[:, j]
+        if rows.sum() < 2:
+            return np.nan
+        x, y = (ranks[:, i], ranks[:, j]) if rows.all() else (ranks[rows, i], ranks[rows, j])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return stats.kendalltau(x, y)[0]
+
+    pairs = [(i, j) for i in range(p) for j in range(i + 1, p)]
+    corr = np.full((p, p), np.nan)
+    for (i, j), value in zip(pairs, _map(tau, pairs)):
+        corr[i, j] = corr[j, i] = value
+    # 与 DataFrame.corr 一致：有观测的列与自身的kendall系数为1
+    np.fill_diagonal(corr, np.where(np.diag(counts) > 0, 1.0, np.nan))
+    return corr, counts
+
+
+def correlation_matrix(df, method='pearson'):
+    """
+    计算相关系数矩阵（等价于 DataFrame.corr(method)，非数值列忽略）
+
+    Args:
+        df: DataFrame
+        method: 'pearson' / 'spearman' / 'kendall'
+
+    Returns:
+        tuple: (相关系数矩阵DataFrame, 成对完整观测数DataFrame)
+
+    Raises:
+        ValueError: 不支持的相关性方法
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"不支持的相关性方法: {method}，可选: {', '.join(CORRELATION_METHODS)}")
+    numeric = df.select_dtypes(include=['number', 'bool'])
+    values = numeric.astype(float).to_numpy()
+    mask = ~np.isnan(values)
+    values = np.where(mask, values, 0.0)
+
+    if method == 'spearman':
+        corr, counts = _spearman(values, mask)
+    elif method == 'kendall':
+        corr, counts = _kendall(values, mask)
+    else:
+        corr, counts = _pearson(values, mask)
+
+    columns = numeric.columns
+    return (pd.DataFrame(corr, index=columns, columns=columns),
+            pd.DataFrame(counts.astype(np.int64), index=columns, columns=columns))
@@ -0,0 +1,185 @@
+"""
+数据读取工具函数
+"""
+import io
+import os
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from config import PARALLEL_CSV_MIN_BYTES, PARALLEL_CSV_WORKERS
+from utils.columnar import columnar_format, read_columnar
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """CSV分段解析线程池（pandas C解析器分词时释放GIL，多线程可并行）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PARALLEL_CSV_WORKERS, thread_name_prefix='csv-parse')
+        return _executor
+
+
+def _read_bytes(source):
+    """
+    读取CSV原始字节并把流复位，无法整体读取（如不可seek的流）时返回None
+
+    Args:
+        source: 文件路径、Flask FileStorage对象或二进制文件对象
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if os.path.getsize(source) < PARALLEL_CSV_MIN_BYTES:
+            return None
+        with open(source, 'rb') as f:
+            return f.read()
+
+    stream = getattr(source, 'stream', source)
+    try:
+        start = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell() - start
+        stream.seek(start)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+    if size < PARALLEL_CSV_MIN_BYTES:
+        return None
+    data = stream.read()
+    stream.seek(start)
+    return data if isinstance(data, bytes) else None
+
+
+def _split_rows(data, pieces):
+    """
+    按行边界把CSV数据切分为若干段
+
+    Returns:
+        tuple: (表头行字节, [(起始偏移, 结束偏移), ...])
+    """
+    header_end = data.find(b'\n') + 1
+    if header_end == 0:
+        return data, []
+    body_size = len(data) - header_end
+    bounds = [header_end]
+    for i in range(1, pieces):
+        target = header_end + body_size * i // pieces
+        newline = data.find(b'\n', max(target, bounds[-1]))
+        if newline == -1:
+            break
+        if newline + 1 > bounds[-1]:
+            bounds.append(newline + 1)
+    bounds.append(len(data))
+    return data[:header_end], [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _parse_piece(header, data, start, end, kwargs):
+    """解析一段数据行（补上表头）"""
+    buffer = io.BytesIO(header + data[start:end])
+    return pd.read_csv(buffer, **kwargs)
+
+
+def _reconcile_dtypes(frames, header, data, ranges, kwargs):
+    """
+    统一各段的列类型，使结果与一次性读取一致
+
+    - 任一段解析为文本：该列在其余数值段中按文本重新解析，保留原始写法（如"01"）
+    - 整数段与浮点段混合，或整数列在某段中有缺失值：转为float64
+    - 布尔列出现缺失值或与其他类型混合：转为object
+    - 某段中全部为空的列不参与类型判断
+    """
+    columns = frames[0].columns
+    has_values = {col: [frame[col].notna().any() for frame in frames] for col in columns}
+
+    dtype_arg = kwargs.get('dtype')
+    if dtype_arg is None or isinstance(dtype_arg, dict):
+        text_columns = []
+        for col in columns:
+            dtypes = [frame[col].dtype for frame, filled in zip(frames, has_values[col]) if filled]
+            if any(dtype == object for dtype in dtypes) and any(dtype.kind in 'iuf' for dtype in dtypes):
+                text_columns.append(col)
+        if text_columns:
+            text_kwargs = {**kwargs, 'dtype': {**(dtype_arg or {}), **{col: str for col in text_columns}}}
+            frames = [
+                _parse_piece(header, data, start, end, text_kwargs)
+                if any(frame[col].dtype.kind in 'iuf' for col in text_columns) else frame
+                for frame, (start, end) in zip(frames, ranges)
+            ]
+
+    for col in columns:
+        dtypes = {frame[col].dtype for frame, filled in zip(frames, has_values[col]) if filled}
+        has_missing = any(frame[col].isna().any() for frame in frames)
+        if not dtypes:
+            # 整列为空，pandas一次性读取时推断为float64
+            target = np.dtype('float64')
+        elif all(pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+            target = object if has_missing else np.dtype(bool)
+        elif all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+            target = np.result_type(*dtypes)
+            if target.kind in 'iu' and has_missing:
+                target = np.dtype('float64')
+        else:
+            target = object
+        for frame in frames:
+            if frame[col].dtype != target:
+                frame[col] = frame[col].astype(target)
+    return frames
+
+
+def read_csv_fast(source, **kwargs):
+    """
+    读取CSV，大文件按行边界切分后多线程并行解析
+
+    以下情况退回 pd.read_csv 单线程解析：文件小于 PARALLEL_CSV_MIN_BYTES、
+    只配置了一个线程、数据中含引号（引号内可能有换行，无法安全按行切分）、
+    指定了 pd.read_csv 的分块/行数等参数。
+
+    Args:
+        source: 文件路径、Flask FileStorage对象或二进制文件对象
+        **kwargs: 传给 pd.read_csv 的参数
+
+    Returns:
+        pd.DataFrame
+    """
+    unsupported = {'chunksize', 'iterator', 'nrows', 'skiprows', 'skipfooter', 'header', 'names', 'index_col'}
+    if PARALLEL_CSV_WORKERS <= 1 or unsupported & set(kwargs):
+        return pd.read_csv(source, **kwargs)
+
+    data = _read_bytes(source)
+    if data is None or b'"' in data:
+        return pd.read_csv(source if data is None else io.BytesIO(data), **kwargs)
+
+    header, ranges = _split_rows(data, PARALLEL_CSV_WORKERS)
+    if len(ranges) <= 1:
+        return pd.read_csv(io.BytesIO(data), **kwargs)
+
+    executor = _get_executor()
+    frames = list(executor.map(lambda bounds: _parse_piece(header, data, *bounds, kwargs), ranges))
+    frames = _reconcile_dtypes(frames, header, data, ranges, kwargs)
+    with warnings.catch_warnings():
+        # 含缺失值的布尔列按object合并时pandas会给出与结果无关的FutureWarning
+        warnings.simplefilter('ignore', category=FutureWarning)
+        return pd.concat(frames, ignore_index=True)
+
+
+def read_dataframe(source, **kwargs):
+    """
+    读取图表/分析模块的输入数据
+
+    Args:
+        source: 已解析的DataFrame（来自数据集会话），或CSV/Feather/Parquet文件路径、上传的文件对象
+        **kwargs: 传给 pd.read_csv 的参数
+
+    Returns:
+        pd.DataFrame: DataFrame输入返回浅拷贝，避免修改共享的缓存数据
+    """
+    if isinstance(source, pd.DataFrame):
+        return source.copy(deep=False)
+    filename = os.fspath(source) if isinstance(source, (str, os.PathLike)) else getattr(source, 'filename', None)
+    fmt = columnar_format(filename)
+    if fmt:
+        # 列式格式自带列类型，无需文本解析
+        return read_columnar(source, fmt)[0]
+    return read_csv_fast(source, **kwargs)
@@ -0,0 +1,103 @@
+"""
+分面（小多图）工具函数
+按分面列（如调查周期、性别、种族）一次groupby拆分数据，各分面画在同一张网格图中
+"""
+import math
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from config import FACET_MAX_COLUMNS, FACET_MAX_PANELS
+
+# 每个分面子图的尺寸（英寸）
+FACET_PANEL_SIZE = (5, 4)
+
+
+def facet_groups(df, facet_column):
+    """
+    按分面列拆分数据（一次groupby，分面列缺失的行不参与，分面按取值排序）
+
+    Args:
+        df: DataFrame
+        facet_column: 分面列名
+
+    Returns:
+        list: [(分面取值, 子DataFrame), ...]
+
+    Raises:
+        ValueError: 分面列不存在、没有有效取值或取值个数超过 FACET_MAX_PANELS
+    """
+    if facet_column not in df.columns:
+        raise ValueError(f"分面列 '{facet_column}' 在CSV中不存在")
+    groups = list(df.groupby(facet_column, sort=True))
+    if not groups:
+        raise ValueError(f"分面列 '{facet_column}' 没有有效数据")
+    if len(groups) > FACET_MAX_PANELS:
+        raise ValueError(
+            f"分面列 '{facet_column}' 有 {len(groups)} 个取值，最多支持 {FACET_MAX_PANELS} 个分面"
+        )
+    return [(facet_value(value), group) for value, group in groups]
+
+
+def facet_value(value):
+    """分面取值转换为Python原生类型（整数值的浮点数如调查编码 1.0 转为 1）"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def facet_title(facet_column, value):
+    return f"{facet_column} = {value}"
+
+
+def category_order(series):
+    """
+    分组列的类别顺序（各分面共用，保证同一类别在每个子图中的位置相同）：
+    数值列按大小排序，其余按出现顺序
+    """
+    values = series.dropna()
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return [value for value in values.cat.categories if value in set(values)]
+    unique = pd.unique(values)
+    return sorted(unique) if pd.api.types.is_numeric_dtype(values) else list(unique)
+
+
+def facet_figure(n_panels, dpi, sharex=True, sharey=True):
+    """
+    创建分面网格图（每行最多 FACET_MAX_COLUMNS 个子图，多余的子图位置隐藏）
+
+    Returns:
+        tuple: (Figure, 前n_panels个子图坐标轴的列表)
+    """
+    n_cols = min(n_panels, FACET_MAX_COLUMNS)
+    n_rows = math.ceil(n_panels / n_cols)
+    fig = Figure(figsize=(FACET_PANEL_SIZE[0] * n_cols, FACET_PANEL_SIZE[1] * n_rows), dpi=dpi)
+    axes = fig.subplots(n_rows, n_cols, sharex=sharex, sharey=sharey, squeeze=False).ravel()
+    for ax in axes[n_panels:]:
+        ax.set_visible(False)
+    return fig, list(axes[:n_panels])
+
+
+def finish_facet_axes(axes, x_label, y_label, rotate_x_labels=False):
+    """
+    设置坐标轴标签：只在每列最下方的子图显示X轴标签和刻度（下方位置为空时也显示），
+    只在每行最左侧的子图显示Y轴标签
+
+    Args:
+        rotate_x_labels: 分组类别名旋转45度以避免重叠（共享X轴时须在所有子图绘制完成后设置）
+    """
+    n_cols = min(len(axes), FACET_MAX_COLUMNS)
+    for index, ax in enumerate(axes):
+        bottom = index + n_cols >= len(axes)
+        left = index % n_cols == 0
+        ax.set_xlabel(x_label if bottom else '', fontsize=11)
+        ax.set_ylabel(y_label if left else '', fontsize=11)
+        # 共享坐标轴创建时非外侧子图的标签被隐藏，这里按位置重新设置
+        ax.xaxis.label.set_visible(bottom)
+        ax.yaxis.label.set_visible(left)
+        if bottom:
+            ax.tick_params(axis='x', labelbottom=True)
+        if rotate_x_labels:
+            for label in ax.get_xticklabels():
+                label.set(rotation=45, ha='right')
@@ -4,12 +4,23 @@
 import os
 from flask import Response, abort
 from config import ALLOWED_EXTENSIONS
+from utils.columnar import (
+    COLUMNAR_EXTENSIONS, COLUMNAR_MIMETYPES, columnar_available, write_columnar
+)
+
+
+def supported_formats():
+    """当前可上传的文件格式（列式格式需要安装pyarrow）"""
+    return sorted(
+        ext for ext in ALLOWED_EXTENSIONS
+        if ext not in COLUMNAR_EXTENSIONS or columnar_available()
+    )
 
 
 def allowed_file(filename):
     """检查文件扩展名是否允许"""
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+           filename.rsplit('.', 1)[1].lower() in supported_formats()
 
 
 def download_file(directory, file_name, file_suffix=""):
@@ -44,3 +55,61 @@ def download_file(directory, file_name, file_suffix=""):
     except Exception as e:
         print(f"Error: {str(e)}")
         return str(e), 500
+
+
+# 流式输出CSV时每段的行数
+CSV_STREAM_ROWS = 50000
+
+
+def iter_dataframe_csv(df, rows_per_chunk=CSV_STREAM_ROWS):
+    """
+    按行块逐段生成DataFrame的CSV文本（首段含表头），不在内存中拼接完整CSV字符串
+
+    Args:
+        df: pd.DataFrame
+        rows_per_chunk: 每段行数
+
+    Yields:
+        str: CSV文本片段
+    """
+    for start in range(0, max(len(df), 1), rows_per_chunk):
+        yield df.iloc[start:start + rows_per_chunk].to_csv(index=False, header=start == 0)
+
+
+def dataframe_csv_response(df, filename):
+    """
+    以流式 text/csv 响应下载DataFrame
+
+    Args:
+        df: pd.DataFrame
+        filename: 下载文件名
+
+    Returns:
+        Flask Response对象，附带 X-Suggested-Filename、X-Total-Rows 头
+    """
+    response = Response(iter_dataframe_csv(df), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['X-Suggested-Filename'] = filename
+    response.headers['X-Total-Rows'] = str(len(df))
+    return response
+
+
+def dataframe_columnar_response(df, fmt, filename, column_roles=None):
+    """
+    以列式格式（Feather/Parquet）下载DataFrame，列类型随文件保留
+
+    Args:
+        df: pd.DataFrame
+        fmt: 'feather' 或 'parquet'
+        filename: 下载文件名（扩展名会替换为对应格式）
+        column_roles: 列类型划分，写入schema元数据
+
+    Returns:
+        Flask Response对象
+    """
+    filename = f"{os.path.splitext(filename)[0]}.{fmt}"
+    response = Response(write_columnar(df, fmt, column_roles), mimetype=COLUMNAR_MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['X-Suggested-Filename'] = filename
+    response.headers['X-Total-Rows'] = str(len(df))
+    return response
@@ -0,0 +1,79 @@
+"""
+HTTP条件请求（ETag / 304）辅助函数
+"""
+import hashlib
+import os
+from flask import request, make_response
+from config import DATA_CACHE_MAX_AGE, DATA_CACHE_STALE_WHILE_REVALIDATE
+
+
+def file_fingerprint(path):
+    """
+    基于文件名、大小和修改时间生成文件指纹（不读取文件内容）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        str: 文件指纹
+    """
+    stat = os.stat(path)
+    return f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def directory_fingerprint(directory, suffix):
+    """
+    生成目录下指定后缀文件集合的指纹，文件增删或更新都会改变指纹
+
+    Args:
+        directory: 目录路径
+        suffix: 文件后缀，如 '_results.csv'
+
+    Returns:
+        str: 目录指纹，目录不存在时返回空字符串
+    """
+    if not os.path.isdir(directory):
+        return ''
+    return '|'.join(
+        file_fingerprint(os.path.join(directory, filename))
+        for filename in sorted(os.listdir(directory))
+        if filename.endswith(suffix)
+    )
+
+
+def make_etag(*parts):
+    """由文件指纹和查询参数等组成部分生成强ETag值"""
+    payload = '\x1f'.join(str(part) for part in parts)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def conditional_response(etag, build_response, max_age=DATA_CACHE_MAX_AGE):
+    """
+    处理条件GET请求
+
+    If-None-Match命中时直接返回304，不调用build_response；否则调用build_response
+    构建响应，并在成功(200)时附加ETag和适合CDN/nginx缓存的Cache-Control头。
+
+    Args:
+        etag: 由make_etag生成的ETag值
+        build_response: 无参回调，返回Flask响应（或视图函数可返回的值）
+        max_age: 共享缓存可直接复用的秒数
+
+    Returns:
+        Flask Response对象
+    """
+    # nginx开启gzip时会把强ETag降级为弱ETag，这里按RFC 7232对If-None-Match使用弱比较
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(build_response())
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = (
+        f"public, max-age={max_age}, "
+        f"stale-while-revalidate={DATA_CACHE_STALE_WHILE_REVALIDATE}"
+    )
+    response.vary.add('Accept-Encoding')
+    return response
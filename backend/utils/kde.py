@@ -0,0 +1,108 @@
+"""
+核密度估计工具函数
+线性分箱 + FFT卷积：先把数据按线性插值权重分配到等距网格节点，再用FFT与高斯核卷积，
+计算量为 O(n + g·log g)（g为网格节点数），不随 数据量 × 曲线点数 增长
+"""
+import numpy as np
+
+# 支持的带宽规则（与 scipy.stats.gaussian_kde / seaborn 的 bw_method 一致）
+BANDWIDTH_METHODS = ('scott', 'silverman')
+# 分箱网格节点数（FFT长度取不小于 节点数+核宽 的2的幂）
+KDE_BINS = 2048
+# 高斯核截断宽度（带宽倍数）
+KERNEL_RADIUS = 4
+
+
+def bandwidth(values, method='scott'):
+    """
+    高斯核带宽
+
+    - scott: σ · n^(-1/5)
+    - silverman: σ · (3n/4)^(-1/5)
+
+    Args:
+        values: 一维数值数组（不含NaN）
+        method: 带宽规则，见 BANDWIDTH_METHODS
+
+    Returns:
+        float 或 None: 数据少于2个或标准差为0时返回None
+
+    Raises:
+        ValueError: 不支持的带宽规则
+    """
+    if method not in BANDWIDTH_METHODS:
+        raise ValueError(f"不支持的带宽规则: {method}，可选: {', '.join(BANDWIDTH_METHODS)}")
+    n = len(values)
+    if n < 2:
+        return None
+    std = float(np.std(values, ddof=1))
+    if not np.isfinite(std) or std == 0:
+        return None
+    if method == 'silverman':
+        return std * (n * 3 / 4) ** (-1 / 5)
+    return std * n ** (-1 / 5)
+
+
+def linear_binning(values, start, step, bins):
+    """
+    线性分箱：每个数据点按与相邻两个网格节点的距离把权重分给这两个节点
+
+    与简单分箱（整个点计入所在箱）相比，同样的节点数下密度估计误差更小。
+
+    Args:
+        values: 一维数值数组，须落在 [start, start + (bins-1)·step] 内
+        start: 第一个节点的坐标
+        step: 节点间距
+        bins: 节点数
+
+    Returns:
+        np.ndarray: 各节点的权重，总和等于数据量
+    """
+    position = (values - start) / step
+    left = np.clip(np.floor(position), 0, bins - 2).astype(np.intp)
+    right_weight = position - left
+    return (np.bincount(left, weights=1 - right_weight, minlength=bins)
+            + np.bincount(left + 1, weights=right_weight, minlength=bins))
+
+
+def kde_fft(values, grid_size=200, cut=0, bw_method='scott', bins=KDE_BINS):
+    """
+    高斯核密度估计（线性分箱 + FFT卷积）
+
+    Args:
+        values: 一维数值数组（不含NaN）
+        grid_size: 返回的密度曲线点数
+        cut: 曲线向数据范围两侧延伸的带宽倍数（0表示只覆盖数据范围）
+        bw_method: 带宽规则，见 BANDWIDTH_METHODS
+        bins: 分箱网格节点数
+
+    Returns:
+        tuple: (曲线x坐标, 概率密度)；数据少于2个或标准差为0时返回 (None, None)
+
+    Raises:
+        ValueError: 不支持的带宽规则
+    """
+    values = np.asarray(values, dtype=float)
+    bw = bandwidth(values, bw_method)
+    if bw is None:
+        return None, None
+
+    low = values.min() - cut * bw
+    high = values.max() + cut * bw
+    # 网格两侧各留出核的截断宽度，边界附近的密度不会被截断
+    start = low - KERNEL_RADIUS * bw
+    step = (high - low + 2 * KERNEL_RADIUS * bw) / (bins - 1)
+    weights = linear_binning(values, start, step, bins)
+
+    half_width = min(int(np.ceil(KERNEL_RADIUS * bw / step)), bins - 1)
+    offsets = np.arange(-half_width, half_width + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bw) ** 2) / (bw * np.sqrt(2 * np.pi))
+
+    # 补零到不小于线性卷积长度的2的幂，避免循环卷积首尾混叠
+    size = 1 << int(np.ceil(np.log2(bins + 2 * half_width)))
+    convolved = np.fft.irfft(np.fft.rfft(weights, size) * np.fft.rfft(kernel, size), size)
+    density = np.clip(convolved[half_width:half_width + bins], 0, None) / len(values)
+
+    nodes = start + np.arange(bins) * step
+    grid = np.linspace(low, high, grid_size)
+    return grid, np.interp(grid, nodes, density)
@@ -1,8 +1,21 @@
 """
 JSON序列化辅助函数
+
+- convert_to_serializable: 单个标量转换为Python原生类型
+- array_to_list / frame_to_records: 整列/整块转换，NaN、Inf、NaT统一为None
+- FastJSONProvider: Flask JSON provider，直接编码numpy/pandas对象，NaN和Inf编码为null；
+  安装了orjson时使用orjson，否则退回标准库json
 """
+import json
+import math
 import numpy as np
 import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
 
 
 def convert_to_serializable(obj):
@@ -18,9 +31,161 @@ def convert_to_serializable(obj):
             return None
         return val
     elif isinstance(obj, np.ndarray):
-        return [convert_to_serializable(item) for item in obj.tolist()]
+        return array_to_list(obj)
     elif pd.isna(obj) or obj != obj:  # 检查NaN
         return None
     elif obj == float('inf') or obj == float('-inf'):
         return None  # 处理Python的无穷大
     return obj
+
+
+def array_to_list(values):
+    """
+    将numpy数组/pandas Series整体转换为（嵌套）列表，NaN、Inf、NaT转为None
+
+    数值数组用一次向量化掩码处理缺失值，不逐元素判断类型。
+
+    Args:
+        values: np.ndarray、pd.Series、pd.Index 或类数组对象
+
+    Returns:
+        list
+    """
+    if isinstance(values, (pd.Series, pd.Index)):
+        if pd.api.types.is_datetime64_any_dtype(values.dtype):
+            # 保留Timestamp，由JSON provider按Flask默认方式编码
+            return values.astype(object).where(values.notna(), None).tolist()
+        values = values.to_numpy()
+    values = np.asarray(values)
+
+    kind = values.dtype.kind
+    if kind in 'iub':
+        return values.tolist()
+    if kind in 'fc':
+        finite = np.isfinite(values)
+        if finite.all():
+            return values.tolist()
+        converted = values.astype(object)
+        converted[~finite] = None
+        return converted.tolist()
+    if kind in 'mM':
+        converted = values.astype(object)
+        converted[np.isnat(values)] = None
+        return converted.tolist()
+
+    converted = values.astype(object, copy=True)
+    flat = converted.reshape(-1)
+    missing = pd.isna(flat)
+    for i in np.flatnonzero(~missing):
+        item = flat[i]
+        if isinstance(item, float) and math.isinf(item):
+            missing[i] = True
+        elif isinstance(item, np.generic):
+            flat[i] = convert_to_serializable(item)
+    flat[missing] = None
+    return converted.tolist()
+
+
+def frame_to_records(df):
+    """
+    将DataFrame转换为记录列表（等价于 replace([nan, NaT], None).to_dict('records')）
+
+    按列整体转换缺失值后再按行组装，避免逐元素替换。
+
+    Args:
+        df: pd.DataFrame
+
+    Returns:
+        list[dict]
+    """
+    columns = df.columns.tolist()
+    column_values = [array_to_list(df.iloc[:, i]) for i in range(len(columns))]
+    return [dict(zip(columns, row)) for row in zip(*column_values)]
+
+
+def _default(obj):
+    """numpy/pandas对象的编码规则（其余类型沿用Flask默认规则）"""
+    if isinstance(obj, np.datetime64):
+        return None if np.isnat(obj) else pd.Timestamp(obj)
+    if isinstance(obj, np.generic):
+        return convert_to_serializable(obj)
+    if isinstance(obj, (np.ndarray, pd.Series, pd.Index)):
+        return array_to_list(obj)
+    if isinstance(obj, pd.DataFrame):
+        return frame_to_records(obj)
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    return DefaultJSONProvider.default(obj)
+
+
+def _sanitize(obj):
+    """标准库json退路：递归把NaN/Inf替换为None，numpy/pandas对象转换为原生类型"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _sanitize(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_sanitize(value) for value in obj]
+    if isinstance(obj, (np.generic, np.ndarray, pd.Series, pd.Index, pd.DataFrame)):
+        return _sanitize(_default(obj))
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    return obj
+
+
+def dumps_bytes(obj, sort_keys=False, indent=False):
+    """
+    编码为UTF-8 JSON字节串（NaN/Inf为null，支持numpy/pandas对象）
+
+    Args:
+        obj: 待编码对象
+        sort_keys: 是否按键排序
+        indent: 是否缩进
+
+    Returns:
+        bytes
+    """
+    if orjson is not None:
+        options = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                   | orjson.OPT_PASSTHROUGH_DATETIME)
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=options)
+    return json.dumps(
+        _sanitize(obj), default=_default, ensure_ascii=False,
+        sort_keys=sort_keys, indent=2 if indent else None
+    ).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    直接编码numpy/pandas对象的Flask JSON provider
+
+    - numpy数组与标量、Series/Index/DataFrame无需路由预先转换
+    - NaN、Inf、NaT编码为null，输出始终是合法JSON
+    - 日期时间与Flask默认行为一致（HTTP日期格式）
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and set(kwargs) <= {'sort_keys'}:
+            return dumps_bytes(obj, kwargs.get('sort_keys', self.sort_keys)).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(_sanitize(obj), **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is None:
+            return super().response(obj)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            dumps_bytes(obj, self.sort_keys, indent), mimetype=self.mimetype
+        )
@@ -0,0 +1,81 @@
+"""
+上传文件接收工具
+werkzeug 接收上传文件时边写入临时存储边计算内容哈希，无需再整体读一遍；
+请求结束后仍需使用的上传文件（如延迟解析的数据集）可以保留，不随请求关闭
+"""
+import hashlib
+import tempfile
+from flask import Request
+
+# 与werkzeug默认一致：超过该大小的上传文件写入磁盘临时文件
+UPLOAD_SPOOL_MAX_MEMORY = 500 * 1024
+
+
+class HashingUploadFile(tempfile.SpooledTemporaryFile):
+    """
+    写入时同步计算内容哈希的上传文件临时存储
+
+    哈希算法与 ProfileCache.hash_upload 相同，content_hash 可直接作为画像/图表缓存的键
+    """
+
+    def __init__(self):
+        super().__init__(max_size=UPLOAD_SPOOL_MAX_MEMORY, mode='w+b')
+        self._digest = hashlib.blake2b(digest_size=20)
+        self._retained = False
+
+    def write(self, data):
+        self._digest.update(data)
+        return super().write(data)
+
+    @property
+    def content_hash(self):
+        """已写入内容的哈希（十六进制）"""
+        return self._digest.hexdigest()
+
+    def retain(self):
+        """请求结束时不关闭（由调用方在不再需要时调用 release）"""
+        self._retained = True
+        return self
+
+    def release(self):
+        self._retained = False
+        self.close()
+
+    def close(self):
+        if not self._retained:
+            super().close()
+
+
+class UploadRequest(Request):
+    """上传文件写入 HashingUploadFile 的请求类"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingUploadFile()
+
+
+def upload_content_hash(file):
+    """
+    接收上传时已计算的内容哈希
+
+    Args:
+        file: Flask FileStorage对象
+
+    Returns:
+        str 或 None：上传文件不是由 UploadRequest 接收时返回None
+    """
+    stream = getattr(file, 'stream', file)
+    return stream.content_hash if isinstance(stream, HashingUploadFile) else None
+
+
+def retain_upload(file):
+    """
+    保留上传文件的临时存储，请求结束后仍可读取
+
+    Args:
+        file: Flask FileStorage对象
+
+    Returns:
+        HashingUploadFile 或 None：无法保留时返回None
+    """
+    stream = getattr(file, 'stream', file)
+    return stream.retain() if isinstance(stream, HashingUploadFile) else None
@@ -214,7 +214,7 @@ export const zhTranslations = {
             numeric: '数值型',
             categorical: '分类型',
             fileSize: '文件大小：',
-            supportFormat: '支持格式：CSV文件，最大50MB',
+            supportFormat: '支持格式：CSV文件，最大4GB',
             success: '文件上传成功！{{message}}',
             error: '文件上传失败：{{error}}',
             networkError: '文件上传失败，请检查网络连接'
@@ -360,7 +360,7 @@ export const zhTranslations = {
             title: '数据上传',
             button: '上传CSV文件',
             reupload: '重新上传CSV文件',
-            supportFormat: '支持格式：CSV文件，最大50MB',
+            supportFormat: '支持格式：CSV文件，最大4GB',
             fileInfo: '文件信息：',
             fileName: '文件名：',
             rowCount: '数据行数：',
@@ -829,7 +829,7 @@ export const enTranslations = {
             numeric: 'Numeric',
             categorical: 'Categorical',
             fileSize: 'File Size:',
-            supportFormat: 'Supported Format: CSV file, max 50MB',
+            supportFormat: 'Supported Format: CSV file, max 4GB',
             success: 'File uploaded successfully! {{message}}',
             error: 'File upload failed: {{error}}',
             networkError: 'File upload failed, please check network connection'
@@ -975,7 +975,7 @@ export const enTranslations = {
             title: 'Data Upload',
             button: 'Upload CSV File',
             reupload: 'Re-upload CSV File',
-            supportFormat: 'Supported Format: CSV file, max 50MB',
+            supportFormat: 'Supported Format: CSV file, max 4GB',
             fileInfo: 'File Information:',
             fileName: 'File Name:',
             rowCount: 'Row Count:',
@@ -1009,7 +1009,7 @@ const DataAnalysis: React.FC = () => {
                             <Row gutter={24}>
                                 <Col span={12}>
                                     <Upload
-                                        accept=".csv"
+                                        accept=".csv,.parquet,.feather,.arrow"
                                         showUploadList={false}
                                         beforeUpload={handleFileUpload}
                                         disabled={uploadLoading}
@@ -1139,24 +1139,24 @@ const DataExtraction: React.FC = () => {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ items })
+                // csv模式：后端直接返回CSV正文，不再把CSV内嵌到JSON中
+                body: JSON.stringify({ items, response_mode: 'csv' })
             });
 
             if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
+                const result = await response.json().catch(() => null);
+                throw new Error((result && result.error) || `HTTP error! status: ${response.status}`);
             }
 
-            const result = await response.json();
-
-            if (result.success && result.csv_data) {
+            if ((response.headers.get('Content-Type') || '').includes('text/csv')) {
                 // 创建CSV文件下载
-                const blob = new Blob(['\uFEFF' + result.csv_data], {
+                const blob = new Blob(['\uFEFF', await response.blob()], {
                     type: 'text/csv;charset=utf-8;'
                 });
                 const link = document.createElement('a');
                 const url = URL.createObjectURL(blob);
                 link.setAttribute('href', url);
-                const suggested = (result && result.suggested_filename) ? String(result.suggested_filename) : `${record.fileName}.csv`;
+                const suggested = response.headers.get('X-Suggested-Filename') || `${record.fileName}.csv`;
                 link.setAttribute('download', suggested);
                 link.style.visibility = 'hidden';
                 document.body.appendChild(link);
@@ -1172,6 +1172,7 @@ const DataExtraction: React.FC = () => {
                     content: t('dataExtraction.messages.downloadSuccessContent')
                 });
             } else {
+                const result = await response.json();
                 throw new Error(result.error || '数据处理失败');
             }
         } catch (error) {
@@ -1305,24 +1306,23 @@ const DataExtraction: React.FC = () => {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ items: allItems })
+                body: JSON.stringify({ items: allItems, response_mode: 'csv' })
             });
 
             if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
+                const result = await response.json().catch(() => null);
+                throw new Error((result && result.error) || `HTTP error! status: ${response.status}`);
             }
 
-            const result = await response.json();
-
-            if (result.success && result.csv_data) {
+            if ((response.headers.get('Content-Type') || '').includes('text/csv')) {
                 // 创建合并后的CSV文件下载
-                const blob = new Blob(['\uFEFF' + result.csv_data], {
+                const blob = new Blob(['\uFEFF', await response.blob()], {
                     type: 'text/csv;charset=utf-8;'
                 });
                 const link = document.createElement('a');
                 const url = URL.createObjectURL(blob);
                 link.setAttribute('href', url);
-                const suggested = (result && result.suggested_filename) ? String(result.suggested_filename) : `batch_custom_extraction_${new Date().toISOString().split('T')[0]}.csv`;
+                const suggested = response.headers.get('X-Suggested-Filename') || `batch_custom_extraction_${new Date().toISOString().split('T')[0]}.csv`;
                 link.setAttribute('download', suggested);
                 link.style.visibility = 'hidden';
                 document.body.appendChild(link);
@@ -1338,6 +1338,7 @@ const DataExtraction: React.FC = () => {
                     content: t('dataExtraction.messages.batchDownloadSuccessContent', { count: customExtractions.length })
                 });
             } else {
+                const result = await response.json();
                 throw new Error(result.error || '批量数据处理失败');
             }
         } catch (error) {
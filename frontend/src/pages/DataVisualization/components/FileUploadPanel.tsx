@@ -29,7 +29,7 @@ const FileUploadPanel: React.FC<FileUploadPanelProps> = ({
             <Card title={t('dataVisualization.upload.title')} size="small" style={{ marginBottom: 16 }}>
                 <Space direction="vertical" style={{ width: '100%' }}>
                     <Upload
-                        accept=".csv"
+                        accept=".csv,.parquet,.feather,.arrow"
                         showUploadList={false}
                         beforeUpload={handleUpload}
                         disabled={uploadLoading}
@@ -36,12 +36,17 @@ export const API_ENDPOINTS = {
     GET_CSV_FILE: '/get_csvfile',
     GET_CSV_INFO: '/get_csv_info',
     GET_FILE_COLUMNS: '/get_file_columns',
+    DATASETS: '/datasets',
 
     // 变量搜索
     SEARCH_VARIABLES: '/search_variables',
+    AUTOCOMPLETE_VARIABLES: '/autocomplete_variables',
 
     // 数据可视化
     GENERATE_VISUALIZATION: '/generate_visualization',
+    BATCH_VISUALIZATION: '/batch_visualization',
+    CHART_DATA: '/chart_data',
+    CORRELATION_MATRIX: '/correlation_matrix',
     DRAW_BOXPLOT: '/draw_boxplot',
     DRAW_HISTOGRAM: '/draw_histogram',
     DRAW_HEATMAP: '/draw_heatmap',